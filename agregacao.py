@@ -0,0 +1,292 @@
+"""Motor de agregação: todas as tabelas por dimensão de uma página em uma passada."""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Uma tabela pedida: agrupa por `dimensao` e aplica `funcao` sobre `medida`
+# ('contagem' dispensa medida e gera a coluna 'Quantidade')
+Agregacao = namedtuple('Agregacao', ['dimensao', 'medida', 'funcao'])
+
+FUNCOES = ('contagem', 'soma', 'media')
+
+def _codigos(serie: pd.Series):
+    """Códigos por linha (-1 para ausentes) e os valores de cada código."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(), serie.cat.categories
+    return pd.factorize(serie, sort=True)
+
+def contar_valores(serie: pd.Series) -> pd.Series:
+    """value_counts sem as categorias que não aparecem nos dados."""
+    contagem = serie.value_counts()
+    return contagem[contagem > 0]
+
+def serie_contagem(tabela: pd.DataFrame) -> pd.Series:
+    """Tabela de contagem do motor de agregação no formato de value_counts."""
+    return tabela.set_index(tabela.columns[0])['Quantidade'].sort_values(ascending=False)
+
+def agregar(df: pd.DataFrame, especificacoes: dict) -> dict:
+    """Calcula as tabelas {nome: Agregacao} lendo cada coluna uma única vez.
+
+    Os códigos de cada dimensão e os valores de cada medida são extraídos
+    uma vez e compartilhados entre as especificações; cada tabela sai de um
+    np.bincount sobre esses arrays. Como no groupby(observed=True), só
+    aparecem grupos com linhas; em 'media', só grupos com algum valor
+    válido. Especificações com colunas ausentes no DataFrame são ignoradas.
+    """
+    dimensoes = {}
+    medidas = {}
+    tabelas = {}
+    for nome, (dim, medida, funcao) in especificacoes.items():
+        if funcao not in FUNCOES:
+            raise ValueError(f"Função de agregação desconhecida: {funcao}")
+        if dim not in df.columns or (medida is not None and medida not in df.columns):
+            continue
+
+        if dim not in dimensoes:
+            codigos, valores_dim = _codigos(df[dim])
+            linhas = codigos >= 0
+            codigos = codigos[linhas]
+            contagem = np.bincount(codigos, minlength=len(valores_dim))
+            dimensoes[dim] = (codigos, valores_dim, linhas, contagem)
+        codigos, valores_dim, linhas, contagem = dimensoes[dim]
+        grupos = contagem > 0
+
+        if funcao == 'contagem':
+            coluna, resultado = 'Quantidade', contagem
+        else:
+            if medida not in medidas:
+                valores = df[medida].to_numpy(dtype='float64', na_value=np.nan)
+                validos = ~np.isnan(valores)
+                medidas[medida] = (np.where(validos, valores, 0.0), validos)
+            valores, validos = medidas[medida]
+            coluna = medida
+            resultado = np.bincount(codigos, weights=valores[linhas], minlength=len(valores_dim))
+            if funcao == 'media':
+                n = np.bincount(codigos, weights=validos[linhas], minlength=len(valores_dim))
+                grupos = n > 0
+                resultado = resultado / np.where(grupos, n, 1)
+
+        tabelas[nome] = pd.DataFrame({
+            dim: np.asarray(valores_dim)[grupos],
+            coluna: resultado[grupos],
+        })
+    return tabelas
+
+def _passo_redondo(amplitude: float, bins: int) -> float:
+    """Menor passo 1, 2 ou 5 × 10^k que cobre a amplitude com até `bins` faixas."""
+    if amplitude <= 0:
+        return 1.0
+    bruto = amplitude / bins
+    base = 10.0 ** np.floor(np.log10(bruto))
+    for multiplo in (1, 2, 5, 10):
+        if base * multiplo >= bruto:
+            return base * multiplo
+
+def histograma(valores: pd.Series, bins: int = 30, faixa: tuple = None,
+               pesos: pd.Series = None) -> pd.DataFrame:
+    """Contagens por faixa (colunas inicio, fim, quantidade) calculadas no servidor.
+
+    As arestas seguem passos redondos, como o binning do Vega-Lite com
+    maxbins=bins. Valores ausentes ou infinitos são ignorados; faixa=(min, max)
+    descarta os valores fora do intervalo antes do cálculo. Com pesos, cada
+    valor conta como sua quantidade (ex.: uma tabela de 'contagem').
+    """
+    x = pd.to_numeric(valores, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    w = None if pesos is None else np.asarray(pesos, dtype='float64')
+    manter = np.isfinite(x)
+    if faixa is not None:
+        manter &= (x >= faixa[0]) & (x <= faixa[1])
+    x = x[manter]
+    if w is not None:
+        w = w[manter]
+    if not len(x):
+        return pd.DataFrame({'inicio': [], 'fim': [], 'quantidade': []})
+
+    minimo, maximo = x.min(), x.max()
+    passo = _passo_redondo(maximo - minimo, bins)
+    inicio = np.floor(minimo / passo) * passo
+    n = max(int(np.ceil((maximo - inicio) / passo)), 1)
+    if inicio + n * passo <= maximo:
+        n += 1
+    arestas = inicio + passo * np.arange(n + 1)
+    quantidade, _ = np.histogram(x, bins=arestas, weights=w)
+    if w is not None:
+        quantidade = quantidade.astype(np.int64)
+    return pd.DataFrame({'inicio': arestas[:-1], 'fim': arestas[1:], 'quantidade': quantidade})
+
+def media_e_mediana(valores: pd.Series, quantidades: pd.Series) -> tuple:
+    """Média e mediana de uma tabela de 'contagem', sem expandir as linhas.
+
+    `valores` deve estar em ordem crescente, como nas tabelas de agregar.
+    """
+    v = np.asarray(valores, dtype='float64')
+    q = np.asarray(quantidades, dtype=np.int64)
+    total = q.sum()
+    if not total:
+        return np.nan, np.nan
+    acumulado = np.cumsum(q)
+    centrais = np.searchsorted(acumulado, [(total - 1) // 2, total // 2], side='right')
+    return (v * q).sum() / total, v[centrais].mean()
+
+class SketchQuantis:
+    """Sketch de quantis com erro relativo limitado, no estilo do DDSketch.
+
+    Cada valor não nulo cai na faixa ceil(log_gamma |x|), com
+    gamma = (1 + precisao) / (1 - precisao), e só a contagem de cada faixa
+    é guardada; zeros têm faixa própria. Todo quantil estimado fica a menos
+    de `precisao` (relativa) de um valor real da amostra. Sketches com a
+    mesma precisão se mesclam somando as contagens, de modo que blocos,
+    processos e dados acrescentados depois podem ser resumidos separadamente.
+    """
+
+    def __init__(self, precisao: float = 0.01):
+        if not 0 < precisao < 1:
+            raise ValueError(f"Precisão deve estar entre 0 e 1: {precisao}")
+        self.precisao = precisao
+        self._log_gamma = np.log((1 + precisao) / (1 - precisao))
+        self.faixas = {}  # (sinal, faixa) -> quantidade
+        self.contagem = 0
+        self.minimo = np.inf
+        self.maximo = -np.inf
+
+    def faixas_dos_valores(self, valores) -> tuple:
+        """(sinal, faixa) de cada valor finito, na ordem em que aparecem."""
+        x = np.asarray(valores, dtype='float64')
+        x = x[np.isfinite(x)]
+        sinal = np.sign(x).astype(np.int8)
+        faixa = np.zeros(len(x), dtype=np.int64)
+        nao_nulos = sinal != 0
+        faixa[nao_nulos] = np.ceil(np.log(np.abs(x[nao_nulos])) / self._log_gamma)
+        return sinal, faixa
+
+    def _somar(self, sinal, faixa, quantidade) -> None:
+        for s, f, q in zip(sinal.tolist(), faixa.tolist(), quantidade.tolist()):
+            self.faixas[(s, f)] = self.faixas.get((s, f), 0) + q
+
+    def atualizar(self, valores) -> 'SketchQuantis':
+        """Acrescenta os valores finitos ao sketch."""
+        x = pd.to_numeric(pd.Series(valores), errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        x = x[np.isfinite(x)]
+        if not len(x):
+            return self
+        sinal, faixa = self.faixas_dos_valores(x)
+        # sinal em {-1, 0, 1} cabe nos dois bits baixos da chave combinada
+        chaves, quantidade = np.unique(faixa * 4 + (sinal + 1), return_counts=True)
+        self._somar((chaves & 3) - 1, chaves >> 2, quantidade)
+        self.contagem += len(x)
+        self.minimo = min(self.minimo, x.min())
+        self.maximo = max(self.maximo, x.max())
+        return self
+
+    def mesclar(self, outro: 'SketchQuantis') -> 'SketchQuantis':
+        """Soma ao sketch as contagens de outro, de mesma precisão."""
+        if outro.precisao != self.precisao:
+            raise ValueError("Só é possível mesclar sketches de mesma precisão")
+        for chave, quantidade in outro.faixas.items():
+            self.faixas[chave] = self.faixas.get(chave, 0) + quantidade
+        self.contagem += outro.contagem
+        self.minimo = min(self.minimo, outro.minimo)
+        self.maximo = max(self.maximo, outro.maximo)
+        return self
+
+    def _valor(self, sinal: int, faixa: int) -> float:
+        """Ponto da faixa com erro relativo de no máximo `precisao`."""
+        gamma = np.exp(self._log_gamma)
+        return sinal * 2 * gamma ** faixa / (gamma + 1)
+
+    def quantis(self, qs) -> list:
+        """Quantis estimados (qs entre 0 e 1); NaN se o sketch estiver vazio."""
+        if not self.contagem:
+            return [np.nan for _ in qs]
+        chaves = sorted(self.faixas, key=lambda chave: self._valor(*chave))
+        acumulado = np.cumsum([self.faixas[chave] for chave in chaves])
+        resultado = []
+        for q in qs:
+            posicao = int(np.searchsorted(acumulado, q * (self.contagem - 1), side='right'))
+            valor = self._valor(*chaves[min(posicao, len(chaves) - 1)])
+            resultado.append(float(np.clip(valor, self.minimo, self.maximo)))
+        return resultado
+
+    def quantil(self, q: float) -> float:
+        """Quantil estimado; NaN se o sketch estiver vazio."""
+        return self.quantis([q])[0]
+
+    def para_tabela(self) -> pd.DataFrame:
+        """Contagens por faixa, com colunas sinal, faixa e quantidade."""
+        chaves = list(self.faixas)
+        return pd.DataFrame({
+            'sinal': np.array([c[0] for c in chaves], dtype=np.int8),
+            'faixa': np.array([c[1] for c in chaves], dtype=np.int64),
+            'quantidade': np.array([self.faixas[c] for c in chaves], dtype=np.int64),
+        })
+
+    @classmethod
+    def de_tabela(cls, tabela: pd.DataFrame, precisao: float = 0.01) -> 'SketchQuantis':
+        """Sketch a partir de uma tabela de contagens (ex.: soma de várias)."""
+        sketch = cls(precisao)
+        sketch._somar(
+            tabela['sinal'].to_numpy(), tabela['faixa'].to_numpy(), tabela['quantidade'].to_numpy()
+        )
+        sketch.contagem = int(tabela['quantidade'].sum())
+        # extremos desconhecidos: não limitam os quantis, nem depois de mesclar
+        sketch.minimo, sketch.maximo = -np.inf, np.inf
+        return sketch
+
+    def para_dict(self) -> dict:
+        """Representação serializável em JSON."""
+        return {
+            'precisao': self.precisao,
+            'contagem': self.contagem,
+            'minimo': None if not self.contagem else float(self.minimo),
+            'maximo': None if not self.contagem else float(self.maximo),
+            'faixas': [[s, f, q] for (s, f), q in self.faixas.items()],
+        }
+
+    @classmethod
+    def de_dict(cls, dados: dict) -> 'SketchQuantis':
+        sketch = cls(dados['precisao'])
+        for s, f, q in dados['faixas']:
+            sketch.faixas[(s, f)] = q
+        sketch.contagem = dados['contagem']
+        if dados['contagem']:
+            sketch.minimo, sketch.maximo = dados['minimo'], dados['maximo']
+        return sketch
+
+def amostra_estratificada(df: pd.DataFrame, colunas: list, estrato: str = None,
+                          limite: int = 5000, semente: int = 0) -> pd.DataFrame:
+    """Até `limite` linhas de df, preservando outliers e a proporção dos estratos.
+
+    Outliers (fora de 1,5 × IQR em alguma das colunas) entram primeiro, até
+    metade do limite; o restante é sorteado dentro de cada valor de
+    `estrato`, proporcionalmente ao tamanho e com ao menos uma linha cada.
+    A amostra é determinística para a mesma semente.
+    """
+    if len(df) <= limite:
+        return df
+    gerador = np.random.default_rng(semente)
+
+    fora = np.zeros(len(df), dtype=bool)
+    for col in colunas:
+        valores = df[col].to_numpy(dtype='float64', na_value=np.nan)
+        q1, q3 = np.nanpercentile(valores, [25, 75])
+        margem = 1.5 * (q3 - q1)
+        fora |= (valores < q1 - margem) | (valores > q3 + margem)
+    outliers = np.flatnonzero(fora)
+    if len(outliers) > limite // 2:
+        outliers = gerador.choice(outliers, limite // 2, replace=False)
+
+    demais = np.flatnonzero(~fora)
+    vagas = limite - len(outliers)
+    if estrato is None or estrato not in df.columns:
+        sorteadas = gerador.choice(demais, min(vagas, len(demais)), replace=False)
+    else:
+        codigos = _codigos(df[estrato])[0][demais]
+        grupos, posicao = np.unique(codigos, return_inverse=True)
+        tamanhos = np.bincount(posicao, minlength=len(grupos))
+        cotas = np.maximum((vagas * tamanhos) // len(demais), 1)
+        sorteadas = np.concatenate([
+            gerador.choice(demais[posicao == g], min(cotas[g], tamanhos[g]), replace=False)
+            for g in range(len(grupos))
+        ])
+    return df.iloc[np.sort(np.concatenate([outliers, sorteadas]))]
@@ -0,0 +1,462 @@
+"""Benchmark das etapas do dashboard sobre exportações sintéticas.
+
+Uso:
+
+    python benchmark.py [--tamanhos 10k,100k,1M] [--dados .benchmark]
+                        [--saida resultados.json] [--base base.json]
+                        [--salvar-base] [--tolerancia 0.2] [--repeticoes 1]
+                        [--sem-memoria] [--motor pandas|arrow]
+
+Para cada tamanho, gera (uma vez, em --dados) um CSV com os cabeçalhos do
+COLUMN_MAPPING: clientes com frequência enviesada, datas ausentes,
+marcadores '-' e flags Sim/Não. Depois mede, etapa a etapa, o mesmo
+caminho percorrido pelo dashboard:
+
+    leitura                 load_uploaded_file
+    preparo                 preparar_dados
+    colunas_analise         adicionar_colunas_analise
+    leitura_em_blocos       carregar_csv_em_blocos (as três acima, em CSVs grandes)
+    indice_filtros          IndiceFiltros
+    indice_datas            IndiceDatas
+    filtros                 posições e take de FILTROS_BENCHMARK
+    metricas                calcular_metricas
+    dados_graficos          tabelas_pagina
+    serializacao_graficos   especificações Vega-Lite dos gráficos da página
+
+O tempo é o melhor de --repeticoes execuções; o pico de memória vem de
+uma execução extra sob tracemalloc, que enxerga os arrays numpy mas não
+os buffers do Arrow (estes aparecem em arrow_mb, o que a etapa deixou
+alocado no pool do Arrow). Com --base, o resultado é comparado ao
+baseline salvo e etapas mais lentas que a tolerância contam como
+regressão (código de saída 1); --salvar-base grava o resultado como novo
+baseline. --motor escolhe o parser de CSV (padrão: DASHBOARD_MOTOR), para
+comparar os dois motores com os mesmos dados. 10M linhas passa pela
+ingestão em blocos e pede alguns GB de disco e memória: só roda quando
+pedido em --tamanhos.
+"""
+import argparse
+import io
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+from agregacao import serie_contagem
+from graficos import (
+    CacheGraficos,
+    criar_grafico_categorias,
+    criar_grafico_colunas,
+    criar_grafico_faixas,
+    criar_grafico_pizza,
+    criar_grafico_ranking,
+    criar_grafico_rosca,
+    criar_histograma,
+    tabelas_pagina,
+)
+from indices import IndiceDatas, IndiceFiltros, intersecao
+from pipeline import (
+    COLUMN_MAPPING,
+    MOTOR_PADRAO,
+    MOTORES,
+    adicionar_colunas_analise,
+    calcular_metricas,
+    carregar_csv_em_blocos,
+    load_uploaded_file,
+    preparar_dados,
+    usar_ingestao_em_blocos,
+)
+
+TAMANHOS_PADRAO = '10k,100k,1M'
+
+# Sufixos aceitos em --tamanhos
+_MULTIPLICADORES = {'k': 1_000, 'm': 1_000_000}
+
+# Linhas geradas por vez, para que 10M não precise caber em memória
+LINHAS_POR_BLOCO_GERADO = 500_000
+
+# Variação tolerada em relação ao baseline antes de acusar regressão
+TOLERANCIA_PADRAO = 0.2
+
+# Diferenças absolutas menores que estas são ruído, não regressão
+RUIDO_SEGUNDOS = 0.05
+RUIDO_MB = 5.0
+
+# -------------------------------------------------
+# Gerador de exportações sintéticas
+# -------------------------------------------------
+CLIENTES = [f'Cliente {i:03d}' for i in range(1, 201)]
+TIPOS_TAREFA = ['Bug', 'Melhoria', 'Suporte', 'Projeto', 'Consultoria', 'Treinamento']
+EQUIPES = ['Desenvolvimento', 'Infraestrutura', 'BI', 'Sucesso do Cliente', 'Qualidade']
+PRIORIDADES = ['Baixa', 'Média', 'Alta', 'Urgente', '-']
+ETAPAS = ['A fazer', 'Fazendo', 'Em validação', 'Feito']
+RESPONSAVEIS = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Fábio', 'Gabriela', 'Hugo']
+
+# Fração de valores ausentes ('-') por coluna de data
+AUSENTES_DATA = {
+    'Criada em': 0.005,
+    'Entrega desejada': 0.2,
+    'Entrega estimada': 0.5,
+    'Fechada em': 0.3,
+}
+
+_FORMATO_DATA = '%d/%m/%Y %H:%M'
+_INICIO = np.datetime64('2021-01-01T00:00', 's')
+
+def _pesos_zipf(n: int, expoente: float = 1.1) -> np.ndarray:
+    """Frequências enviesadas: poucos clientes concentram a maioria das tarefas."""
+    pesos = 1.0 / np.arange(1, n + 1) ** expoente
+    return pesos / pesos.sum()
+
+def _com_ausentes(valores: pa.Array, rng, fracao: float) -> pa.Array:
+    """Troca uma fração dos valores pelo marcador '-' da exportação."""
+    return pc.if_else(pa.array(rng.random(len(valores)) < fracao), '-', valores)
+
+def _datas(segundos: np.ndarray, rng, fracao: float) -> pa.Array:
+    datas = pa.array(_INICIO + segundos.astype('timedelta64[s]'))
+    return _com_ausentes(pc.strftime(datas, format=_FORMATO_DATA), rng, fracao)
+
+def _escolher(rng, valores: list, n: int, p=None) -> pa.Array:
+    codigos = rng.choice(len(valores), n, p=p)
+    return pa.DictionaryArray.from_arrays(pa.array(codigos, pa.int32()), pa.array(valores)).cast(pa.string())
+
+def gerar_bloco(linhas: int, semente: int = 0, primeiro_id: int = 1) -> pa.Table:
+    """Bloco de uma exportação sintética, com os cabeçalhos do COLUMN_MAPPING."""
+    rng = np.random.default_rng(semente)
+    ids = np.arange(primeiro_id, primeiro_id + linhas)
+
+    criada = rng.integers(0, 1500 * 86400, linhas)
+    desejada = criada + rng.integers(1, 45, linhas) * 86400
+    estimada = desejada + rng.integers(-5, 15, linhas) * 86400
+    # lead time com cauda longa, como o de tarefas reais
+    fechada = criada + (rng.lognormal(1.8, 1.0, linhas) * 86400).astype(np.int64)
+
+    esforco = np.round(rng.gamma(2.0, 5.0, linhas) + 0.1, 1)
+    registradas = np.round(esforco * rng.lognormal(0.0, 0.4, linhas), 1)
+
+    colunas = {
+        'Quadro': _escolher(rng, ['Operação', 'Projetos'], linhas),
+        'Cliente': _escolher(rng, CLIENTES, linhas, p=_pesos_zipf(len(CLIENTES))),
+        'Grupo': _escolher(rng, ['Grupo A', 'Grupo B', 'Grupo C'], linhas),
+        'Projeto': _escolher(rng, [f'Projeto {i}' for i in range(1, 51)], linhas),
+        'ID da tarefa principal': pa.array(ids // 3 + 1),
+        'Título da tarefa principal': pc.binary_join_element_wise(
+            'Ajuste no relatório ', pa.array(ids // 3 + 1).cast(pa.string()), ''),
+        'Tipo de tarefa': _escolher(rng, TIPOS_TAREFA, linhas, p=_pesos_zipf(len(TIPOS_TAREFA), 0.8)),
+        'Equipe': _escolher(rng, EQUIPES, linhas),
+        'Centro de custo': _escolher(rng, ['CC-100', 'CC-200', 'CC-300'], linhas),
+        'Para': _escolher(rng, RESPONSAVEIS, linhas),
+        'ID da Tarefa': pa.array(ids),
+        'Tarefa': pc.binary_join_element_wise('Tarefa ', pa.array(ids).cast(pa.string()), ''),
+        'Urgente': _escolher(rng, ['Sim', 'Não', '-'], linhas, p=[0.1, 0.8, 0.1]),
+        'Prioridade': _escolher(rng, PRIORIDADES, linhas, p=[0.35, 0.35, 0.15, 0.1, 0.05]),
+        'Aberta por': _escolher(rng, RESPONSAVEIS, linhas),
+        'Criada em': _datas(criada, rng, AUSENTES_DATA['Criada em']),
+        'Entrega desejada': _datas(desejada, rng, AUSENTES_DATA['Entrega desejada']),
+        'Entrega estimada': _datas(estimada, rng, AUSENTES_DATA['Entrega estimada']),
+        'Fechada em': _datas(fechada, rng, AUSENTES_DATA['Fechada em']),
+        'Esforço estimado h': pa.array(esforco),
+        'Primeiro esforço estimado h': pa.array(esforco),
+        'Já registradas h': _com_ausentes(pa.array(registradas).cast(pa.string()), rng, 0.05),
+        'Já registradas em subtarefas': pa.array(np.zeros(linhas)),
+        '%': pa.array(np.round(registradas / esforco * 100, 1)),
+        'Etapa': _escolher(rng, ETAPAS, linhas),
+        'Fase': _escolher(rng, ['Planejamento', 'Execução', 'Encerramento'], linhas),
+        'Reaberta?': _escolher(rng, ['Sim', 'Não'], linhas, p=[0.07, 0.93]),
+        'Tags': _escolher(rng, ['-', 'cliente-chave', 'bi,infra', 'retrabalho'], linhas),
+        'Código customizado de cliente': pa.array(np.full(linhas, '-')),
+        'Horas restantes h': pa.array(np.round(rng.gamma(1.0, 3.0, linhas), 1)),
+    }
+    assert list(colunas) == list(COLUMN_MAPPING)
+    return pa.table(colunas)
+
+def gerar_exportacao(linhas: int, destino, semente: int = 0) -> Path:
+    """Grava em destino um CSV sintético de `linhas` tarefas, bloco a bloco."""
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporario = destino.with_name(destino.name + '.tmp')
+    opcoes = pa_csv.WriteOptions(quoting_style='needed')
+    escritor = None
+    try:
+        for inicio in range(0, linhas, LINHAS_POR_BLOCO_GERADO):
+            bloco = gerar_bloco(min(LINHAS_POR_BLOCO_GERADO, linhas - inicio),
+                                semente=(semente, inicio), primeiro_id=inicio + 1)
+            if escritor is None:
+                escritor = pa_csv.CSVWriter(temporario, bloco.schema, write_options=opcoes)
+            escritor.write_table(bloco)
+    finally:
+        if escritor is not None:
+            escritor.close()
+    temporario.replace(destino)
+    return destino
+
+def ler_tamanho(texto: str) -> int:
+    """'10k' -> 10000, '1M' -> 1000000."""
+    texto = texto.strip()
+    sufixo = texto[-1:].lower()
+    if sufixo in _MULTIPLICADORES:
+        return int(float(texto[:-1]) * _MULTIPLICADORES[sufixo])
+    return int(texto)
+
+def exportacao_sintetica(rotulo: str, dados, semente: int = 0) -> Path:
+    """CSV sintético do tamanho pedido, gerado só na primeira vez."""
+    caminho = Path(dados) / f'tarefas_{rotulo}_s{semente}.csv'
+    if not caminho.exists():
+        gerar_exportacao(ler_tamanho(rotulo), caminho, semente)
+    return caminho
+
+# -------------------------------------------------
+# Etapas medidas
+# -------------------------------------------------
+# Combinações de filtro da barra lateral, como (filtros, períodos): cliente
+# mais frequente, o mesmo cliente com uma prioridade, um tipo de tarefa,
+# três clientes e os últimos 30 dias de criação dos dados gerados
+FILTROS_BENCHMARK = [
+    ({'Cliente': [CLIENTES[0]]}, {}),
+    ({'Cliente': [CLIENTES[0]], 'Prioridade': ['Alta']}, {}),
+    ({'Tipo_Tarefa': [TIPOS_TAREFA[1]]}, {}),
+    ({'Cliente': CLIENTES[:3]}, {}),
+    ({}, {'Tarefa_Criada': ('2025-01-10', None)}),
+]
+
+# Cores padrão da página e faixa inicial do histograma de SLA
+_COR_PRIMARIA, _COR_SECUNDARIA = '#2196F3', '#4CAF50'
+_PALETA = ['#4CAF50', '#2196F3', '#FF9800', '#9C27B0', '#F44336', '#00BCD4']
+_FAIXA_SLA = (-30, 60)
+
+def graficos_pagina(tabelas: dict) -> list:
+    """(construtor, tabela, parâmetros) dos gráficos da página sem filtros."""
+    graficos = []
+    if 'reabertas' in tabelas:
+        graficos.append((criar_grafico_pizza,
+                         serie_contagem(tabelas['reabertas']).rename({False: 'Não Reabertas', True: 'Reabertas'}),
+                         dict(title='Distribuição de Tarefas Reabertas',
+                              colors=[_COR_PRIMARIA, _COR_SECUNDARIA])))
+    if 'horas_cliente' in tabelas:
+        graficos.append((criar_grafico_ranking,
+                         tabelas['horas_cliente'].nlargest(10, 'Tarefa_Esforco_Registradas'),
+                         dict(x_col='Tarefa_Esforco_Registradas', y_col='Cliente',
+                              titulo_x='Horas Registradas', titulo_y='Cliente', color=_COR_PRIMARIA)))
+    if 'horas_equipe' in tabelas:
+        graficos.append((criar_grafico_colunas, tabelas['horas_equipe'],
+                         dict(x_col='Equipe', y_col='Tarefa_Esforco_Registradas',
+                              titulo_x='Equipe', titulo_y='Horas Registradas', color=_COR_SECUNDARIA)))
+    if 'prioridade' in tabelas:
+        prioridade = serie_contagem(tabelas['prioridade']).reset_index()
+        prioridade.columns = ['Prioridade', 'Quantidade']
+        graficos.append((criar_grafico_categorias, prioridade,
+                         dict(col='Prioridade', titulo_x='Prioridade',
+                              dominio=prioridade['Prioridade'].tolist(),
+                              cores=_PALETA[:len(prioridade)],
+                              title='Quantidade por Prioridade', angulo_rotulo=0)))
+    if 'sla_status' in tabelas:
+        sla = serie_contagem(tabelas['sla_status']).reset_index()
+        sla.columns = ['Status', 'Quantidade']
+        graficos.append((criar_grafico_rosca, sla,
+                         dict(col='Status', dominio=['No prazo', 'Atrasada', 'Sem data'],
+                              cores=[_COR_SECUNDARIA, '#F44336', '#FF9800'])))
+    if 'sla_dias' in tabelas:
+        graficos.append((criar_histograma, tabelas['sla_dias'],
+                         dict(col='SLA_Dias', title='Distribuição do SLA', bins=30,
+                              color=_COR_PRIMARIA, faixa=_FAIXA_SLA, pesos='Quantidade')))
+    if 'eficiencia_categoria' in tabelas:
+        eficiencia = serie_contagem(tabelas['eficiencia_categoria']).reset_index()
+        eficiencia.columns = ['Categoria', 'Quantidade']
+        graficos.append((criar_grafico_categorias, eficiencia,
+                         dict(col='Categoria', titulo_x='Categoria', dominio=['Baixa', 'Normal', 'Alta'],
+                              cores=[_COR_SECUNDARIA, _COR_PRIMARIA, '#FF5722'], legenda=False)))
+    if 'faixas_eficiencia' in tabelas:
+        graficos.append((criar_grafico_faixas, tabelas['faixas_eficiencia'],
+                         dict(col='Eficiencia', title='Distribuição da Eficiência (%)', color=_COR_PRIMARIA)))
+    for nome, y_col, titulo_y, cor in (('tempo_tipo', 'Tipo_Tarefa', 'Tipo de Tarefa', '#9C27B0'),
+                                       ('tempo_cliente', 'Cliente', 'Cliente', _COR_SECUNDARIA)):
+        if nome in tabelas:
+            tempo = (tabelas[nome].rename(columns={'Lead_Time_Dias': 'Dias'})
+                     .sort_values('Dias', ascending=False).head(10))
+            graficos.append((criar_grafico_ranking, tempo,
+                             dict(x_col='Dias', y_col=y_col, titulo_x='Dias Médios',
+                                  titulo_y=titulo_y, color=cor)))
+    return graficos
+
+def serializar_graficos(tabelas: dict) -> list:
+    """Especificações Vega-Lite dos gráficos, sem aproveitar cache."""
+    cache = CacheGraficos()
+    return [cache.obter(construtor, tabela, **parametros)
+            for construtor, tabela, parametros in graficos_pagina(tabelas)]
+
+def aplicar_filtros(df: pd.DataFrame, indice: IndiceFiltros, indice_datas: IndiceDatas) -> list:
+    """Recortes de FILTROS_BENCHMARK, resolvidos como na página."""
+    recortes = []
+    for filtros, datas in FILTROS_BENCHMARK:
+        posicoes = intersecao(indice.posicoes(filtros), indice_datas.posicoes(datas))
+        recortes.append(df if posicoes is None else df.take(posicoes))
+    return recortes
+
+def _arquivo_em_memoria(caminho: Path) -> io.BytesIO:
+    """Conteúdo do arquivo como no upload do Streamlit."""
+    arquivo = io.BytesIO(caminho.read_bytes())
+    arquivo.name = caminho.name
+    return arquivo
+
+class Medidor:
+    """Mede tempo e pico de memória das etapas, guardando os resultados."""
+
+    def __init__(self, repeticoes: int = 1, memoria: bool = True):
+        self.repeticoes = max(1, repeticoes)
+        self.memoria = memoria
+        self.etapas = {}
+
+    def medir(self, etapa: str, funcao, *args, **kwargs):
+        """Executa funcao(*args, **kwargs) e retorna o resultado da última execução."""
+        tempos = []
+        for _ in range(self.repeticoes):
+            inicio = time.perf_counter()
+            resultado = funcao(*args, **kwargs)
+            tempos.append(time.perf_counter() - inicio)
+        medida = {'segundos': round(min(tempos), 4)}
+
+        if self.memoria:
+            del resultado
+            arrow_antes = pa.total_allocated_bytes()
+            tracemalloc.start()
+            try:
+                resultado = funcao(*args, **kwargs)
+                _, pico = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            medida['pico_mb'] = round(pico / 1024 ** 2, 2)
+            medida['arrow_mb'] = round((pa.total_allocated_bytes() - arrow_antes) / 1024 ** 2, 2)
+
+        self.etapas[etapa] = medida
+        return resultado
+
+def medir_exportacao(caminho: Path, repeticoes: int = 1, memoria: bool = True,
+                     motor: str = None) -> dict:
+    """Mede as etapas do dashboard sobre uma exportação CSV."""
+    motor = motor or MOTOR_PADRAO
+    medidor = Medidor(repeticoes, memoria)
+    if usar_ingestao_em_blocos(caminho.name, caminho.stat().st_size):
+        df = medidor.medir('leitura_em_blocos', lambda: carregar_csv_em_blocos(str(caminho), motor=motor))
+    else:
+        bronze = medidor.medir('leitura', lambda: load_uploaded_file(_arquivo_em_memoria(caminho), motor=motor))
+        prata = medidor.medir('preparo', preparar_dados, bronze)
+        del bronze
+        df = medidor.medir('colunas_analise', adicionar_colunas_analise, prata)
+        del prata
+
+    indice = medidor.medir('indice_filtros', IndiceFiltros, df)
+    indice_datas = medidor.medir('indice_datas', IndiceDatas, df)
+    medidor.medir('filtros', aplicar_filtros, df, indice, indice_datas)
+    medidor.medir('metricas', calcular_metricas, df)
+    tabelas = medidor.medir('dados_graficos', tabelas_pagina, df)
+    specs = medidor.medir('serializacao_graficos', serializar_graficos, tabelas)
+
+    return {
+        'motor': motor,
+        'linhas': len(df),
+        'bytes_arquivo': caminho.stat().st_size,
+        'bytes_graficos': sum(len(json.dumps(spec)) for spec in specs if spec is not None),
+        'etapas': medidor.etapas,
+    }
+
+def executar(tamanhos: list, dados, repeticoes: int = 1, memoria: bool = True,
+             semente: int = 0, motor: str = None, ao_medir=None) -> dict:
+    """Resultados {rótulo do tamanho: medidas} para cada tamanho pedido."""
+    resultados = {}
+    for rotulo in tamanhos:
+        caminho = exportacao_sintetica(rotulo, dados, semente)
+        resultados[rotulo] = medir_exportacao(caminho, repeticoes, memoria, motor)
+        if ao_medir:
+            ao_medir(rotulo, resultados[rotulo])
+    return resultados
+
+# -------------------------------------------------
+# Baseline
+# -------------------------------------------------
+def comparar(resultados: dict, base: dict, tolerancia: float = TOLERANCIA_PADRAO) -> list:
+    """Diferenças em relação ao baseline, etapa a etapa.
+
+    Cada item traz tamanho, etapa, medida, valor do baseline, valor atual,
+    variação relativa e se passou da tolerância (regressão).
+    """
+    diferencas = []
+    for rotulo, atual in resultados.items():
+        anterior = base.get(rotulo)
+        if not anterior:
+            continue
+        for etapa, medidas in atual['etapas'].items():
+            medidas_base = anterior['etapas'].get(etapa, {})
+            for medida, ruido in (('segundos', RUIDO_SEGUNDOS), ('pico_mb', RUIDO_MB)):
+                if medida not in medidas or medida not in medidas_base:
+                    continue
+                valor, valor_base = medidas[medida], medidas_base[medida]
+                variacao = (valor - valor_base) / valor_base if valor_base else 0.0
+                diferencas.append({
+                    'tamanho': rotulo,
+                    'etapa': etapa,
+                    'medida': medida,
+                    'base': valor_base,
+                    'atual': valor,
+                    'variacao': round(variacao, 4),
+                    'regressao': variacao > tolerancia and valor - valor_base > ruido,
+                })
+    return diferencas
+
+def _mostrar_medidas(rotulo: str, resultado: dict) -> None:
+    print(f"\n{rotulo} ({resultado['motor']}): {resultado['linhas']:,} linhas, "
+          f"{resultado['bytes_arquivo'] / 1024 ** 2:.1f} MB em CSV, "
+          f"{resultado['bytes_graficos'] / 1024:.1f} KB de gráficos")
+    for etapa, medidas in resultado['etapas'].items():
+        memoria = (f"  pico {medidas['pico_mb']:9.1f} MB  arrow {medidas['arrow_mb']:8.1f} MB"
+                   if 'pico_mb' in medidas else '')
+        print(f"  {etapa:<24}{medidas['segundos']:9.3f} s{memoria}", flush=True)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Mede as etapas do dashboard em exportações sintéticas.")
+    parser.add_argument('--tamanhos', default=TAMANHOS_PADRAO,
+                        help=f"tamanhos separados por vírgula, ex.: 10k,100k,1M,10M (padrão: {TAMANHOS_PADRAO})")
+    parser.add_argument('--dados', default='.benchmark', help="diretório das exportações geradas")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--repeticoes', type=int, default=1, help="execuções por etapa (vale a mais rápida)")
+    parser.add_argument('--sem-memoria', action='store_true', help="não mede o pico de memória")
+    parser.add_argument('--motor', choices=MOTORES, default=None,
+                        help=f"parser de CSV (padrão: {MOTOR_PADRAO})")
+    parser.add_argument('--saida', help="grava os resultados neste JSON")
+    parser.add_argument('--base', help="baseline JSON para comparação")
+    parser.add_argument('--salvar-base', action='store_true', help="grava os resultados como baseline em --base")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_PADRAO,
+                        help="variação relativa aceita antes de acusar regressão")
+    args = parser.parse_args(argv)
+
+    tamanhos = [t.strip() for t in args.tamanhos.split(',') if t.strip()]
+    resultados = executar(tamanhos, args.dados, args.repeticoes, not args.sem_memoria,
+                          args.semente, args.motor, _mostrar_medidas)
+    relatorio = {'tolerancia': args.tolerancia, 'resultados': resultados}
+
+    regressoes = []
+    if args.base and args.salvar_base:
+        Path(args.base).write_text(json.dumps(resultados, indent=1), encoding='utf-8')
+        print(f"\nBaseline gravado em {args.base}")
+    elif args.base:
+        base = json.loads(Path(args.base).read_text(encoding='utf-8'))
+        diferencas = comparar(resultados, base, args.tolerancia)
+        relatorio['comparacao'] = diferencas
+        regressoes = [d for d in diferencas if d['regressao']]
+        print(f"\nComparação com {args.base} (tolerância {args.tolerancia:.0%}):")
+        for d in diferencas:
+            marca = '  REGRESSÃO' if d['regressao'] else ''
+            print(f"  {d['tamanho']:>5} {d['etapa']:<24}{d['medida']:<9}"
+                  f"{d['base']:10.3f} -> {d['atual']:10.3f} ({d['variacao']:+.0%}){marca}")
+
+    if args.saida:
+        Path(args.saida).write_text(json.dumps(relatorio, indent=1), encoding='utf-8')
+    return 1 if regressoes else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""Consultas à prata particionada, com filtros empurrados para a leitura.
+
+Além de prata.parquet, o dataset pode ser gravado como um dataset Parquet
+particionado pelo ano de criação da tarefa (layout hive):
+
+    <versao>/prata_particionada/Ano_Criacao=2023/part-0.parquet
+    <versao>/prata_particionada/_esquema.json
+
+Dentro de cada partição as linhas ficam ordenadas por Cliente e data de
+criação, em grupos de LINHAS_POR_GRUPO linhas, de modo que as estatísticas
+de cada grupo descartam a maior parte deles nos filtros por cliente ou
+período. Uma consulta lê só as partições, os grupos e as colunas que
+precisa, sem carregar o dataset inteiro em memória.
+
+_esquema.json guarda o que o Parquet não devolve como o pandas espera: a
+ordem das colunas, as categorias de cada categórica, as datas mínima e
+máxima e os attrs da prata.
+"""
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+import medalhao
+
+# Consulta em disco por padrão nas novas sessões, em vez do dataset em memória
+CONSULTA_PADRAO = os.environ.get('DASHBOARD_CONSULTA', '').strip().lower() not in ('', '0')
+
+COLUNA_PARTICAO = 'Ano_Criacao'
+COLUNA_DATA_PARTICAO = 'Tarefa_Criada'
+
+# Posição da linha na prata, para devolver as linhas na ordem original
+COLUNA_LINHA = '_linha'
+
+# Ordem das linhas dentro de cada partição
+ORDEM_LINHAS = ['Cliente', 'Tarefa_Criada']
+
+# Linhas por grupo: unidade mínima de leitura quando as estatísticas descartam
+LINHAS_POR_GRUPO = 64 * 1024
+
+_PARTICIONAMENTO = ds.partitioning(pa.schema([(COLUNA_PARTICAO, pa.int32())]), flavor='hive')
+
+def _esquema_do_df(df: pd.DataFrame) -> dict:
+    categorias = {
+        col: {'categorias': df[col].cat.categories.tolist(), 'ordenada': bool(df[col].cat.ordered),
+              'presentes': df[col].cat.remove_unused_categories().cat.categories.tolist()}
+        for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)
+    }
+    faixas = {
+        col: [None if pd.isna(df[col].min()) else df[col].min().isoformat(),
+              None if pd.isna(df[col].max()) else df[col].max().isoformat()]
+        for col in df.columns if pd.api.types.is_datetime64_any_dtype(df[col])
+    }
+    return {
+        'colunas': df.columns.tolist(),
+        'texto': [col for col in df.columns if pd.api.types.is_string_dtype(df[col].dtype)
+                  and not isinstance(df[col].dtype, pd.CategoricalDtype)],
+        'categorias': categorias,
+        'faixas': faixas,
+        'total': len(df),
+        'attrs': df.attrs,
+    }
+
+def salvar_particionada(chave: str, versao: str, df: pd.DataFrame, diretorio: Path = None) -> None:
+    """Grava a prata como dataset particionado por ano de criação.
+
+    Grava em diretório temporário e renomeia, como medalhao faz com os
+    arquivos, para nunca expor um dataset parcial.
+    """
+    destino = medalhao.caminho_particionado(chave, versao, diretorio)
+    tabela = pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None)
+    # categóricas como texto: as estatísticas por grupo ficam nos próprios valores
+    for posicao, campo in enumerate(tabela.schema):
+        if pa.types.is_dictionary(campo.type):
+            tabela = tabela.set_column(posicao, campo.name, tabela.column(posicao).cast(campo.type.value_type))
+    tabela = tabela.append_column(COLUNA_LINHA, pa.array(np.arange(len(df), dtype=np.int64)))
+    if COLUNA_DATA_PARTICAO in tabela.column_names:
+        ano = pc.year(tabela[COLUNA_DATA_PARTICAO]).cast(pa.int32())
+    else:
+        ano = pa.nulls(len(df), pa.int32())
+    tabela = tabela.append_column(COLUNA_PARTICAO, ano)
+    ordem = [(col, 'ascending') for col in ORDEM_LINHAS if col in tabela.column_names]
+    if ordem:
+        tabela = tabela.sort_by(ordem)
+
+    temporario = destino.with_name(f"{destino.name}.{os.getpid()}.tmp")
+    shutil.rmtree(temporario, ignore_errors=True)
+    ds.write_dataset(
+        tabela, temporario, format='parquet', partitioning=_PARTICIONAMENTO,
+        max_rows_per_group=LINHAS_POR_GRUPO, min_rows_per_group=LINHAS_POR_GRUPO,
+        basename_template='part-{i}.parquet',
+    )
+    with open(temporario / '_esquema.json', 'w', encoding='utf-8') as arquivo:
+        json.dump(_esquema_do_df(df), arquivo, ensure_ascii=False, default=str)
+    shutil.rmtree(destino, ignore_errors=True)
+    os.replace(temporario, destino)
+
+class ConsultaPrata:
+    """Leitura filtrada da prata particionada de um dataset.
+
+    Filtros seguem o formato do dashboard: {coluna: valor} ou
+    {coluna: [valores]} para dimensões e {coluna: (inicio, fim)} para
+    datas, com os dois extremos incluídos e None para em aberto.
+    """
+
+    def __init__(self, caminho: Path):
+        self.caminho = caminho
+        with open(caminho / '_esquema.json', encoding='utf-8') as arquivo:
+            self.esquema = json.load(arquivo)
+        self.dataset = ds.dataset(caminho, format='parquet', partitioning=_PARTICIONAMENTO)
+
+    @classmethod
+    def abrir(cls, chave: str, versao: str, diretorio: Path = None) -> 'ConsultaPrata':
+        """Consulta do dataset; None se a prata particionada não existir."""
+        caminho = medalhao.caminho_particionado(chave, versao, diretorio)
+        if not (caminho / '_esquema.json').exists():
+            return None
+        return cls(caminho)
+
+    @property
+    def colunas(self) -> list:
+        return self.esquema['colunas']
+
+    @property
+    def total(self) -> int:
+        return self.esquema['total']
+
+    @property
+    def attrs(self) -> dict:
+        return self.esquema['attrs']
+
+    def colunas_sem_texto(self) -> list:
+        """Colunas exceto as de texto livre, as mais pesadas do dataset."""
+        return [col for col in self.colunas if col not in self.esquema['texto']]
+
+    def opcoes(self, col: str) -> list:
+        """Valores presentes na coluna categórica, como em opcoes_filtro."""
+        info = self.esquema['categorias'].get(col)
+        if info is None:
+            return []
+        return info['presentes'] if info['ordenada'] else sorted(info['presentes'])
+
+    def faixa(self, col: str) -> tuple:
+        """Datas mínima e máxima da coluna, ou (None, None)."""
+        inicio, fim = self.esquema['faixas'].get(col, (None, None))
+        return (pd.Timestamp(inicio) if inicio else None, pd.Timestamp(fim) if fim else None)
+
+    def expressao(self, filtros: dict = None, datas: dict = None):
+        """Filtro do dataset; None quando não há filtro ativo."""
+        partes = []
+        for col, valor in (filtros or {}).items():
+            if col not in self.colunas:
+                continue
+            if isinstance(valor, (list, tuple, set)):
+                partes.append(ds.field(col).isin(list(valor)))
+            else:
+                partes.append(ds.field(col) == valor)
+        for col, (inicio, fim) in (datas or {}).items():
+            if col not in self.colunas:
+                continue
+            if inicio is not None:
+                inicio = pd.Timestamp(inicio).normalize()
+                partes.append(ds.field(col) >= inicio)
+                if col == COLUNA_DATA_PARTICAO:
+                    partes.append(ds.field(COLUNA_PARTICAO) >= inicio.year)
+            if fim is not None:
+                # o dia final inteiro entra na faixa
+                fim = pd.Timestamp(fim).normalize() + pd.Timedelta(days=1)
+                partes.append(ds.field(col) < fim)
+                if col == COLUNA_DATA_PARTICAO:
+                    partes.append(ds.field(COLUNA_PARTICAO) <= fim.year)
+        if not partes:
+            return None
+        expressao = partes[0]
+        for parte in partes[1:]:
+            expressao = expressao & parte
+        return expressao
+
+    def contar(self, filtros: dict = None, datas: dict = None) -> int:
+        """Quantidade de linhas que atendem aos filtros."""
+        return self.dataset.count_rows(filter=self.expressao(filtros, datas))
+
+    def ler(self, filtros: dict = None, datas: dict = None, colunas: list = None) -> pd.DataFrame:
+        """Linhas filtradas, só com as colunas pedidas, na ordem da prata.
+
+        O índice é a posição de cada linha na prata, como em df.take.
+        """
+        colunas = [col for col in (colunas or self.colunas) if col in self.colunas]
+        tabela = self.dataset.to_table(
+            columns=colunas + [COLUNA_LINHA], filter=self.expressao(filtros, datas)
+        )
+        tabela = tabela.sort_by(COLUNA_LINHA)
+        linhas = tabela.column(COLUNA_LINHA).to_numpy()
+        df = tabela.drop_columns([COLUNA_LINHA]).to_pandas(split_blocks=True, self_destruct=True)
+        df.index = pd.Index(linhas)
+        for col in df.columns:
+            info = self.esquema['categorias'].get(col)
+            if info is not None:
+                df[col] = df[col].astype(pd.CategoricalDtype(info['categorias'], ordered=info['ordenada']))
+        df.attrs = dict(self.attrs)
+        return df
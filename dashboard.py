@@ -1,9 +1,56 @@
 import pandas as pd
 import numpy as np
 import streamlit as st
-import altair as alt
 from datetime import datetime
+import functools
+import io
+import json
 import warnings
+
+import medalhao
+import perfil
+from memoria import CacheDatasets
+from agregacao import contar_valores, media_e_mediana, serie_contagem
+from consulta import CONSULTA_PADRAO, ConsultaPrata, salvar_particionada
+from graficos import (
+    CacheGraficos,
+    criar_grafico_categorias,
+    criar_grafico_colunas,
+    criar_grafico_faixas,
+    criar_grafico_pizza,
+    criar_grafico_ranking,
+    criar_grafico_rosca,
+    criar_histograma,
+    tabelas_pagina,
+)
+from indices import (
+    COLUNAS_BUSCA,
+    COLUNAS_DATA,
+    COLUNAS_FILTRO,
+    IndiceDatas,
+    IndiceFacetas,
+    IndiceFiltros,
+    IndiceOrdenacao,
+    IndiceTexto,
+    intersecao,
+)
+from perfil import ARQUIVO_PERFIL, MODO_PADRAO, Perfilador
+from pipeline import (
+    adicionar_colunas_analise,
+    calcular_agregados,
+    calcular_metricas,
+    carregar_csv_em_blocos,
+    contar_combinacoes,
+    hash_conteudo,
+    hashes_linhas,
+    load_uploaded_file,
+    metricas_do_cubo,
+    preparar_dados,
+    preparar_incremental,
+    usar_ingestao_em_blocos,
+    versao_pipeline,
+)
+
 warnings.filterwarnings('ignore')
 
 # -------------------------------------------------
@@ -15,274 +62,323 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# -------------------------------------------------
-# Mapeamento de colunas
-# -------------------------------------------------
-COLUMN_MAPPING = {
-    'Quadro': 'Quadro',
-    'Cliente': 'Cliente',
-    'Grupo': 'Grupo',
-    'Projeto': 'Projeto',
-    'ID da tarefa principal': 'ID_Tarefa',
-    'Título da tarefa principal': 'Titulo_Tarefa',
-    'Tipo de tarefa': 'Tipo_Tarefa',
-    'Equipe': 'Equipe',
-    'Centro de custo': 'CC',
-    'Para': 'Para',
-    'ID da Tarefa': 'ID_Tarefa_Secundaria',
-    'Tarefa': 'Tarefa',
-    'Urgente': 'Urgente',
-    'Prioridade': 'Prioridade',
-    'Aberta por': 'Tarefa_Aberta',
-    'Criada em': 'Tarefa_Criada',
-    'Entrega desejada': 'Tarefa_Entrega_Desejada',
-    'Entrega estimada': 'Tarefa_Entrega_Estimada',
-    'Fechada em': 'Tarefa_Fechada',
-    'Esforço estimado h': 'Tarefa_Esforco_Estimado',
-    'Primeiro esforço estimado h': 'Tarefa_Esforco_Primeiro',
-    'Já registradas h': 'Tarefa_Esforco_Registradas',
-    'Já registradas em subtarefas': 'Tarefa_Esforco_Registradas_Sub',
-    '%': 'Tarefa_Esforco_Percentual',
-    'Etapa': 'Etapa',
-    'Fase': 'Fase',
-    'Reaberta?': 'Tarefa_Reaberta',
-    'Tags': 'Tags',
-    'Código customizado de cliente': 'Codigo_Cliente',
-    'Horas restantes h': 'Horas_Restantes'
-}
-
 # -------------------------------------------------
 # Funções auxiliares
 # -------------------------------------------------
-@st.cache_data
-def load_uploaded_file(file) -> pd.DataFrame:
-    """Lê CSV ou Excel enviado pelo usuário."""
-    if file.name.endswith(".csv"):
-        return pd.read_csv(file, encoding='utf-8', encoding_errors='ignore')
-    return pd.read_excel(file)
-
-def preparar_dados(df: pd.DataFrame) -> pd.DataFrame:
-    """Limpa e padroniza colunas básicas."""
-    df = df.copy()
-    df.columns = df.columns.str.strip()
-    df = df.rename(columns=COLUMN_MAPPING)
-
-    # remove colunas totalmente vazias
-    df = df.dropna(axis=1, how='all')
-
-    # trata valores estranhos
-    df = df.replace(['-', 'NaN', 'nan', ''], np.nan)
-
-    # datas
-    date_cols = [
-        'Tarefa_Criada',
-        'Tarefa_Entrega_Desejada',
-        'Tarefa_Entrega_Estimada',
-        'Tarefa_Fechada'
-    ]
-    for col in date_cols:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors='coerce')
-
-    # numéricos
-    num_cols = [
-        'Tarefa_Esforco_Estimado',
-        'Tarefa_Esforco_Primeiro',
-        'Tarefa_Esforco_Registradas',
-        'Tarefa_Esforco_Registradas_Sub',
-        'Tarefa_Esforco_Percentual',
-        'Horas_Restantes'
-    ]
-    for col in num_cols:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-
-    # booleanos
-    if 'Urgente' in df.columns:
-        df['Urgente'] = df['Urgente'].map({'Sim': True, 'Não': False}).fillna(False)
+# Entradas lidas por cada seção da página. 'filtros' vem da barra lateral,
+# é lido por todas e dispara a execução completa; as demais são widgets da
+# própria seção. Seções com widgets próprios rodam como fragmentos: mudar um
+# deles reexecuta só a seção, com os dados da última execução completa.
+DEPENDENCIAS_SECOES = {
+    'Visão Geral': {'filtros'},
+    'Gráficos': {'filtros', 'cores', 'faixa_sla'},
+    'Dados Detalhados': {'filtros', 'colunas', 'linhas_por_pagina', 'busca', 'ordenacao', 'pagina'},
+    'Resumo Estatístico': {'filtros'},
+}
+ENTRADAS_GLOBAIS = {'filtros'}
+
+# Rótulos dos filtros da barra lateral (COLUNAS_FILTRO e COLUNAS_DATA)
+ROTULOS_FILTROS = {
+    'Cliente': "Cliente",
+    'Tipo_Tarefa': "Tipo de Tarefa",
+    'Prioridade': "Prioridade",
+    'Equipe': "Equipe",
+}
+ROTULOS_DATAS = {
+    'Tarefa_Criada': "Criação",
+    'Tarefa_Entrega_Desejada': "Entrega desejada",
+    'Tarefa_Entrega_Estimada': "Entrega estimada",
+    'Tarefa_Fechada': "Fechamento",
+}
 
-    if 'Tarefa_Reaberta' in df.columns:
-        df['Tarefa_Reaberta'] = df['Tarefa_Reaberta'].map({'Sim': True, 'Não': False}).fillna(False)
-    
-    # Prioridade - converter para categórica ordenada
-    if 'Prioridade' in df.columns:
-        priority_order = {'Baixa': 1, 'Média': 2, 'Alta': 3, 'Urgente': 4}
-        df['Prioridade_Num'] = df['Prioridade'].map(priority_order)
-    
+# Faixa inicial, em dias, do histograma de SLA (corta outliers extremos)
+FAIXA_SLA_PADRAO = (-30, 60)
+
+def chave_upload(file) -> str:
+    """Hash do arquivo enviado, calculado uma única vez por upload na sessão."""
+    hashes = st.session_state.setdefault('_hash_uploads', {})
+    if file.file_id not in hashes:
+        hashes[file.file_id] = hash_conteudo(file.getvalue())
+    return hashes[file.file_id]
+
+def opcoes_filtro(serie: pd.Series) -> list:
+    """Valores presentes na coluna, na ordem das categorias se ordenada."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        presentes = serie.cat.remove_unused_categories().cat.categories.tolist()
+        return presentes if serie.cat.ordered else sorted(presentes)
+    return sorted(serie.dropna().unique().tolist())
+
+def perfil_da_sessao() -> Perfilador:
+    """Perfilador da sessão, ou None com o diagnóstico desligado."""
+    if not st.session_state.get('diagnostico', MODO_PADRAO not in ('', '0')):
+        return None
+    if '_perfil' not in st.session_state:
+        st.session_state['_perfil'] = Perfilador(arquivo=ARQUIVO_PERFIL)
+    return st.session_state['_perfil']
+
+def secao(nome: str):
+    """Decorador da função de uma seção, conforme DEPENDENCIAS_SECOES.
+
+    A seção é medida pelo perfil; reexecutada sozinha como fragmento, vira
+    uma execução própria do perfil.
+    """
+    def decorar(funcao):
+        @functools.wraps(funcao)
+        def executar(*args, **kwargs):
+            perfilador = perfil_da_sessao()
+            perfil.ativar(perfilador)
+            fragmento = perfilador is not None and not perfilador.aberta
+            if fragmento:
+                perfilador.iniciar_execucao(f'fragmento: {nome}')
+            try:
+                with perfil.etapa(f'seção: {nome}'):
+                    return funcao(*args, **kwargs)
+            finally:
+                if fragmento:
+                    perfilador.encerrar_execucao()
+
+        if DEPENDENCIAS_SECOES[nome] - ENTRADAS_GLOBAIS:
+            return st.fragment(executar)
+        return executar
+    return decorar
+
+def preparar_dataset(chave: str, versao: str, conteudo: bytes, nome: str,
+                     incremental: bool = True) -> pd.DataFrame:
+    """Lê e prepara o arquivo (camada prata), gravando as camadas do dataset.
+
+    Usa o armazenamento local quando disponível: a prata gravada evita
+    reprocessar e a bronze evita reler o arquivo quando só a versão mudou.
+    Com incremental, só as tarefas novas ou alteradas em relação ao último
+    dataset preparado passam pelo preparo.
+    """
+    with perfil.etapa('leitura_prata'):
+        df = medalhao.ler_prata(chave, versao)
+    if df is not None:
+        return df
+
+    arquivo = io.BytesIO(conteudo)
+    arquivo.name = nome
+    hashes = None
+    bronze = medalhao.ler_bronze(chave)
+    if bronze is None and usar_ingestao_em_blocos(nome, len(conteudo)):
+        # CSV grande: lê em blocos sem materializar a camada bronze inteira
+        with perfil.etapa('leitura_em_blocos'):
+            df = carregar_csv_em_blocos(arquivo)
+    else:
+        if bronze is None:
+            barra = st.sidebar.empty()
+            with perfil.etapa('leitura'):
+                bronze = load_uploaded_file(
+                    arquivo,
+                    lambda fracao: barra.progress(fracao, text="📥 Lendo planilha...")
+                )
+            barra.empty()
+            medalhao.salvar_bronze(chave, bronze)
+        with perfil.etapa('hashes', linhas=len(bronze)):
+            hashes = hashes_linhas(bronze)
+        df = None
+        base = medalhao.ultimo_com_hashes(versao, exceto=chave) if incremental and hashes is not None else None
+        if base is not None:
+            with perfil.etapa('preparo_incremental'):
+                df = preparar_incremental(
+                    bronze, hashes, medalhao.ler_prata(base, versao), medalhao.ler_hashes(base, versao)
+                )
+        if df is None:
+            with perfil.etapa('preparo', linhas=len(bronze)):
+                df = preparar_dados(bronze)
+            with perfil.etapa('colunas_analise'):
+                df = adicionar_colunas_analise(df, copiar=False)
+
+    with perfil.etapa('camada_ouro', linhas=len(df)):
+        medalhao.salvar_prata(chave, versao, df)
+        if hashes is not None:
+            medalhao.salvar_hashes(chave, versao, hashes)
+        medalhao.salvar_ouro(chave, versao, calcular_metricas(df), calcular_agregados(df))
     return df
 
-def adicionar_colunas_analise(df: pd.DataFrame) -> pd.DataFrame:
-    """Adiciona colunas específicas das análises obrigatórias."""
-    df = df.copy()
-
-    # SLA / Distância em dias (Entrega desejada × Fechada)
-    if {'Tarefa_Entrega_Desejada', 'Tarefa_Fechada'}.issubset(df.columns):
-        df['SLA_Dias'] = (df['Tarefa_Fechada'] - df['Tarefa_Entrega_Desejada']).dt.days
-        df['Distancia_Dias'] = df['SLA_Dias']
-        
-        # Classificar SLA
-        df['SLA_Status'] = np.where(
-            df['SLA_Dias'] > 0,
-            "Atrasada",
-            np.where(df['SLA_Dias'].isna(), "Sem data", "No prazo")
-        )
-
-    # Eficiência de esforço (%)
-    if {'Tarefa_Esforco_Registradas', 'Tarefa_Esforco_Estimado'}.issubset(df.columns):
-        df['Eficiencia'] = (
-            df['Tarefa_Esforco_Registradas'] / df['Tarefa_Esforco_Estimado']
-        ) * 100
-        
-        # Classificar eficiência
-        conditions = [
-            df['Eficiencia'] < 50,
-            df['Eficiencia'] <= 100,
-            df['Eficiencia'] > 100
-        ]
-        choices = ['Baixa', 'Normal', 'Alta']
-        df['Eficiencia_Categoria'] = np.select(conditions, choices, default='Normal')
-
+@st.cache_resource
+def cache_datasets() -> CacheDatasets:
+    """Datasets preparados e seus índices, compartilhados entre sessões dentro do orçamento de memória."""
+    return CacheDatasets()
+
+def carregar_dataset_preparado(chave: str, versao: str, conteudo: bytes, nome: str,
+                               incremental: bool = True) -> pd.DataFrame:
+    """Dataset preparado em memória, um por hash e versão em todo o processo.
+
+    Sessões que enviam o mesmo conteúdo dividem o mesmo DataFrame; escritas
+    de uma sessão não o alteram (Copy-on-Write).
+    """
+    def preparar():
+        with st.spinner("Preparando dados..."):
+            return preparar_dataset(chave, versao, conteudo, nome, incremental)
+
+    return cache_datasets().obter((chave, versao), preparar)
+
+@st.cache_resource(show_spinner="Preparando dados...", max_entries=4)
+def abrir_consulta(chave: str, versao: str, _conteudo: bytes, _nome: str,
+                   _incremental: bool = True) -> ConsultaPrata:
+    """Consulta à prata particionada do dataset, gravada na primeira abertura.
+
+    Só o esquema fica em memória; cada rerun lê do disco as linhas e
+    colunas do recorte filtrado.
+    """
+    consulta = ConsultaPrata.abrir(chave, versao)
+    if consulta is None:
+        df = preparar_dataset(chave, versao, _conteudo, _nome, _incremental)
+        with perfil.etapa('prata_particionada', linhas=len(df)):
+            salvar_particionada(chave, versao, df)
+        del df
+        consulta = ConsultaPrata.abrir(chave, versao)
+    return consulta
+
+@st.cache_resource(max_entries=2)
+def ler_recorte(chave: str, versao: str, filtros: dict, datas: dict, colunas: tuple,
+                _consulta: ConsultaPrata) -> pd.DataFrame:
+    """Linhas filtradas lidas da prata particionada, só com as colunas pedidas.
+
+    Fragmentos e reruns com o mesmo recorte reaproveitam a leitura.
+    """
+    with perfil.etapa('consulta', colunas=len(colunas)) as registro:
+        df = _consulta.ler(filtros, datas, list(colunas))
+        if registro is not None:
+            registro['linhas'] = len(df)
     return df
 
-def calcular_metricas(df: pd.DataFrame) -> dict:
-    """Calcula métricas gerais e tempos por tipo/cliente."""
-    m = {}
-
-    m['total_tarefas'] = len(df)
-    
-    if 'Tarefa_Reaberta' in df.columns:
-        m['tarefas_reabertas'] = df['Tarefa_Reaberta'].sum()
-        m['perc_reabertas'] = df['Tarefa_Reaberta'].mean() * 100
-    else:
-        m['tarefas_reabertas'] = 0
-        m['perc_reabertas'] = 0
-
-    if 'Tarefa_Esforco_Registradas' in df.columns:
-        m['total_horas'] = df['Tarefa_Esforco_Registradas'].sum()
-        m['media_horas_por_tarefa'] = df['Tarefa_Esforco_Registradas'].mean()
-    else:
-        m['total_horas'] = 0
-        m['media_horas_por_tarefa'] = 0
-    
-    if 'Eficiencia' in df.columns:
-        m['eficiencia_media'] = df['Eficiencia'].mean()
-        m['outliers_eficiencia'] = len(df[(df['Eficiencia'] > 100) | (df['Eficiencia'] < 50)])
-    
-    if 'SLA_Status' in df.columns:
-        sla_stats = df['SLA_Status'].value_counts(normalize=True) * 100
-        m['sla_no_prazo'] = sla_stats.get("No prazo", 0)
-        m['sla_atrasadas'] = sla_stats.get("Atrasada", 0)
-
-    # tempo médio geral (Criada x Fechada)
-    m['tempo_medio_dias'] = None
-    if {'Tarefa_Criada', 'Tarefa_Fechada'}.issubset(df.columns):
-        fechadas = df.dropna(subset=['Tarefa_Criada', 'Tarefa_Fechada']).copy()
-        if not fechadas.empty:
-            dias = (fechadas['Tarefa_Fechada'] - fechadas['Tarefa_Criada']).dt.days
-            m['tempo_medio_dias'] = dias.mean()
-            m['tempo_mediano_dias'] = dias.median()
-
-    return m
-
-# -------------------------------------------------
-# Funções para criar gráficos com Altair (ATUALIZADAS)
-# -------------------------------------------------
-def criar_grafico_barras_horizontais(df, x_col, y_col, title, limit=10, color="#4CAF50"):
-    """Cria gráfico de barras horizontais."""
-    if y_col not in df.columns:
-        return None
-    
-    top_data = df[y_col].value_counts().head(limit).reset_index()
-    top_data.columns = ['Categoria', 'Quantidade']
-    
-    chart = alt.Chart(top_data).mark_bar(color=color).encode(
-        x=alt.X('Quantidade:Q', title='Quantidade'),
-        y=alt.Y('Categoria:N', sort='-x', title='Categoria')
-    ).properties(
-        title=title,
-        height=300
-    )
-    
-    return chart
-
-def criar_grafico_barras(df, x_col, y_col, title, color="#2196F3"):
-    """Cria gráfico de barras verticais."""
-    if x_col not in df.columns or y_col not in df.columns:
-        return None
-    
-    chart_data = df.groupby(x_col)[y_col].sum().reset_index()
-    
-    chart = alt.Chart(chart_data).mark_bar(color=color).encode(
-        x=alt.X(f'{x_col}:N', title=x_col, axis=alt.Axis(labelAngle=45)),
-        y=alt.Y(f'{y_col}:Q', title=y_col)
-    ).properties(
-        title=title,
-        height=300
-    )
-    
-    return chart
+@st.cache_resource(max_entries=4)
+def carregar_ouro(chave: str, versao: str):
+    """Lê a camada ouro gravada para o dataset."""
+    return medalhao.ler_ouro(chave, versao)
+
+def indice_do_dataset(chave: str, versao: str, nome, construir):
+    """Índice do dataset em memória, guardado e despejado junto com ele."""
+    return cache_datasets().derivado((chave, versao), nome, construir)
+
+def carregar_indice_filtros(chave: str, versao: str, df: pd.DataFrame) -> IndiceFiltros:
+    """Índice de filtros do dataset, construído uma vez por chave e versão."""
+    def construir():
+        with perfil.etapa('indice_filtros'):
+            return IndiceFiltros(df)
+
+    return indice_do_dataset(chave, versao, 'filtros', construir)
+
+def carregar_indice_datas(chave: str, versao: str, df: pd.DataFrame) -> IndiceDatas:
+    """Posições ordenadas por data do dataset, para os filtros de período."""
+    def construir():
+        with perfil.etapa('indice_datas'):
+            return IndiceDatas(df)
+
+    return indice_do_dataset(chave, versao, 'datas', construir)
+
+def carregar_facetas(chave: str, versao: str, datas: dict, df_base: pd.DataFrame,
+                     consulta: ConsultaPrata) -> IndiceFacetas:
+    """Contagens cruzadas das opções de filtro no período.
+
+    Sem período, vêm das contagens do cubo da camada ouro; com período, das
+    combinações das linhas do período (índice de datas ou consulta em disco).
+    """
+    ouro = carregar_ouro(chave, versao)
+    if consulta is not None or (not datas and ouro is not None and 'cubo' in ouro[1]):
+        return carregar_facetas_do_disco(chave, versao, datas, consulta)
+
+    def construir():
+        with perfil.etapa('indice_facetas'):
+            posicoes = carregar_indice_datas(chave, versao, df_base).posicoes(datas)
+            dimensoes = df_base[[col for col in COLUNAS_FILTRO if col in df_base.columns]]
+            return IndiceFacetas(contar_combinacoes(dimensoes if posicoes is None else dimensoes.take(posicoes)))
+
+    return indice_do_dataset(chave, versao, ('facetas', tuple(sorted(datas.items()))), construir)
+
+@st.cache_resource(max_entries=8)
+def carregar_facetas_do_disco(chave: str, versao: str, datas: dict,
+                              _consulta: ConsultaPrata) -> IndiceFacetas:
+    """Facetas lidas do disco: cubo da camada ouro ou consulta à prata particionada."""
+    ouro = carregar_ouro(chave, versao)
+    with perfil.etapa('indice_facetas'):
+        if not datas and ouro is not None and 'cubo' in ouro[1]:
+            return IndiceFacetas(ouro[1]['cubo'])
+        colunas = tuple(col for col in COLUNAS_FILTRO if col in _consulta.colunas)
+        return IndiceFacetas(contar_combinacoes(ler_recorte(chave, versao, {}, datas, colunas, _consulta)))
+
+def carregar_indice_texto(chave: str, versao: str, df: pd.DataFrame) -> IndiceTexto:
+    """Índice de busca em título e tarefa, construído na primeira busca do dataset."""
+    return indice_do_dataset(chave, versao, 'texto', lambda: IndiceTexto(df))
+
+def carregar_ordenacoes(chave: str, versao: str, df: pd.DataFrame) -> IndiceOrdenacao:
+    """Permutações de ordenação do dataset, reaproveitadas entre reruns."""
+    return indice_do_dataset(chave, versao, 'ordenacoes', lambda: IndiceOrdenacao(df))
+
+@st.cache_resource(max_entries=4)
+def carregar_indice_texto_recorte(chave_recorte: str, versao: str, _df: pd.DataFrame) -> IndiceTexto:
+    """Índice de busca de um recorte lido da prata particionada."""
+    return IndiceTexto(_df)
+
+@st.cache_resource(max_entries=4)
+def carregar_ordenacoes_recorte(chave_recorte: str, versao: str, _df: pd.DataFrame) -> IndiceOrdenacao:
+    """Permutações de ordenação de um recorte lido da prata particionada."""
+    return IndiceOrdenacao(_df)
+
+@st.cache_resource
+def cache_graficos() -> CacheGraficos:
+    """Cache de especificações de gráficos, compartilhado entre sessões."""
+    return CacheGraficos()
+
+def mostrar_grafico(construtor, tabela, **parametros):
+    """Desenha o gráfico a partir do cache; só constrói o que não está nele."""
+    cache = cache_graficos()
+    with perfil.etapa(f'gráfico: {construtor.__name__}') as registro:
+        faltas = cache.faltas
+        spec = cache.obter(construtor, tabela, **parametros)
+        if registro is not None:
+            registro['cache'] = 'falta' if cache.faltas > faltas else 'acerto'
+            registro['bytes'] = len(json.dumps(spec, default=str)) if spec else 0
+        if spec:
+            st.vega_lite_chart(spec, use_container_width=True)
+
+def painel_diagnostico(perfilador: Perfilador):
+    """Etapas da última execução completa, na barra lateral."""
+    execucao = perfilador.ultima_execucao('completa')
+    if execucao is None:
+        return
+    with st.sidebar:
+        st.markdown("---")
+        st.header("🩺 Diagnóstico")
+
+        principal = perfil.dominante(execucao)
+        if principal is not None:
+            st.warning(
+                f"Seção dominante: **{principal['etapa'].removeprefix('seção: ')}** "
+                f"({principal['segundos']:.2f}s de {execucao['segundos']:.2f}s, "
+                f"{principal['segundos'] / max(execucao['segundos'], 1e-9):.0%})"
+            )
 
-def criar_grafico_pizza(df, col, title, colors=None):
-    """Cria gráfico de pizza/donut."""
-    if col not in df.columns:
-        return None
-    
-    chart_data = df[col].value_counts().reset_index()
-    chart_data.columns = ['Categoria', 'Quantidade']
-    
-    # Usar cores personalizadas se fornecidas
-    if colors and len(colors) >= len(chart_data):
-        color_scale = alt.Scale(
-            domain=chart_data['Categoria'].tolist(),
-            range=colors[:len(chart_data)]
+        tabela = pd.DataFrame([
+            {
+                'Etapa': '\u2003' * registro['nivel'] + registro['etapa'],
+                'Tempo (ms)': registro['segundos'] * 1000,
+                'Memória (MB)': registro.get('pico_mb'),
+                'Payload (KB)': registro['bytes'] / 1024 if 'bytes' in registro else None,
+                'Linhas': registro.get('linhas'),
+            }
+            for registro in execucao['registros']
+        ])
+        st.dataframe(tabela, hide_index=True, use_container_width=True,
+                     column_config={
+                         'Tempo (ms)': st.column_config.NumberColumn(format="%.1f"),
+                         'Memória (MB)': st.column_config.NumberColumn(format="%.1f"),
+                         'Payload (KB)': st.column_config.NumberColumn(format="%.1f"),
+                     })
+
+        fragmentos = [e for e in perfilador.execucoes
+                      if e['tipo'] != 'completa' and e['execucao'] < execucao['execucao']][-5:]
+        for fragmento in fragmentos:
+            st.caption(f"↻ {fragmento['tipo']}: {fragmento['segundos'] * 1000:.0f} ms")
+
+        st.download_button(
+            "⬇️ Exportar perfil (JSON lines)",
+            perfil.linhas_json(perfilador.execucoes),
+            file_name="perfil_dashboard.jsonl",
+            mime="application/jsonl",
         )
-    else:
-        # Cores padrão
-        color_scale = alt.Scale(scheme='category10')
-    
-    chart = alt.Chart(chart_data).mark_arc(innerRadius=50).encode(
-        theta=alt.Theta(field="Quantidade", type="quantitative"),
-        color=alt.Color(field="Categoria", type="nominal", scale=color_scale),
-        tooltip=['Categoria', 'Quantidade']
-    ).properties(
-        title=title,
-        height=300,
-        width=300
-    )
-    
-    return chart
-
-def criar_grafico_dispersao(df, x_col, y_col, color_col, title, color="#FF5722"):
-    """Cria gráfico de dispersão."""
-    if x_col not in df.columns or y_col not in df.columns:
-        return None
-    
-    chart = alt.Chart(df).mark_circle(size=60).encode(
-        x=alt.X(f'{x_col}:Q', title=x_col),
-        y=alt.Y(f'{y_col}:Q', title=y_col),
-        color=alt.Color(f'{color_col}:N', title=color_col) if color_col in df.columns else alt.value(color),
-        tooltip=[x_col, y_col, color_col] if color_col in df.columns else [x_col, y_col]
-    ).properties(
-        title=title,
-        height=400
-    )
-    
-    return chart
-
-def criar_histograma(df, col, title, bins=30, color="#9C27B0"):
-    """Cria histograma."""
-    if col not in df.columns:
-        return None
-    
-    chart = alt.Chart(df).mark_bar(color=color).encode(
-        alt.X(f'{col}:Q', bin=alt.Bin(maxbins=bins), title=col),
-        alt.Y('count()', title='Frequência')
-    ).properties(
-        title=title,
-        height=300
-    )
-    
-    return chart
 
 # -------------------------------------------------
 # Header Principal
@@ -302,63 +398,136 @@ with st.sidebar:
         type=["csv", "xlsx"],
         help="Arquivos CSV ou Excel com dados de tarefas"
     )
-    
-# Inicializar variáveis de filtro
-filtro_cliente = None
-filtro_tipo = None
-filtro_prioridade = None
+    atualizacao_incremental = st.checkbox(
+        "⚡ Atualização incremental",
+        value=True,
+        help="Reaproveita as tarefas inalteradas do último arquivo processado"
+    )
+    consulta_em_disco = st.checkbox(
+        "🗄️ Consultar em disco",
+        value=CONSULTA_PADRAO,
+        help="Lê do disco só as linhas e colunas de cada recorte, sem manter o dataset em memória"
+    )
+    diagnostico = st.checkbox(
+        "🩺 Diagnóstico de desempenho",
+        value=MODO_PADRAO not in ('', '0'),
+        key='diagnostico',
+        help="Mede tempo e memória de cada etapa e seção da página"
+    )
+    medir_memoria = diagnostico and st.checkbox(
+        "Medir memória (mais lento)",
+        value=MODO_PADRAO == 'memoria',
+        help="Pico de memória por etapa via tracemalloc"
+    )
 
-# Inicializar cores com valores padrão
-cor_primaria = "#2196F3"
-cor_secundaria = "#4CAF50"
+# Perfil desta execução; desligado, as etapas não medem nada
+perfilador = perfil_da_sessao()
+perfil.ativar(perfilador)
+if perfilador is not None:
+    perfilador.memoria = medir_memoria
+    perfilador.iniciar_execucao('completa')
+    
+# Inicializar variáveis de filtro: {coluna: [valores]} e {coluna: (inicio, fim)}
+filtros_selecionados = {}
+datas_selecionadas = {}
 
 if uploaded_file:
-    # Carregar e preparar dados UMA VEZ
-    df_raw = load_uploaded_file(uploaded_file)
-    df_base = preparar_dados(df_raw)
-    df_base = adicionar_colunas_analise(df_base)
+    # Carregar e preparar dados UMA VEZ por conteúdo (reruns usam o cache).
+    # Consultando em disco, só o esquema da prata particionada fica em memória.
+    chave_dataset = chave_upload(uploaded_file)
+    versao_dataset = versao_pipeline()
+    df_base = consulta = None
+    if consulta_em_disco:
+        consulta = abrir_consulta(
+            chave_dataset,
+            versao_dataset,
+            uploaded_file.getvalue(),
+            uploaded_file.name,
+            atualizacao_incremental
+        )
+        colunas_base, total_base, atributos = consulta.colunas, consulta.total, consulta.attrs
+        faixas_datas = {col: consulta.faixa(col) for col in COLUNAS_DATA}
+    else:
+        df_base = carregar_dataset_preparado(
+            chave_dataset,
+            versao_dataset,
+            uploaded_file.getvalue(),
+            uploaded_file.name,
+            atualizacao_incremental
+        )
+        colunas_base, total_base, atributos = df_base.columns.tolist(), len(df_base), df_base.attrs
+        indice_datas = carregar_indice_datas(chave_dataset, versao_dataset, df_base)
+        faixas_datas = {col: indice_datas.faixa(col) for col in indice_datas.colunas}
+
+    def opcoes(col: str) -> list:
+        return consulta.opcoes(col) if consulta is not None else opcoes_filtro(df_base[col])
     
     with st.sidebar:
         st.success("✅ Arquivo carregado com sucesso!")
+
+        delta = atributos.get('incremental')
+        if delta:
+            st.info(
+                f"⚡ Atualização incremental: {delta['novas']:,} novas, "
+                f"{delta['alteradas']:,} alteradas, {delta['removidas']:,} removidas"
+            )
+
+        datas_coagidas = {c: n for c, n in atributos.get('datas_coagidas', {}).items() if n}
+        if datas_coagidas:
+            st.warning(
+                "⚠️ Datas inválidas descartadas: "
+                + ", ".join(f"{col} ({n:,})" for col, n in datas_coagidas.items())
+            )
         
         st.markdown("---")
         st.header("🔍 Filtros")
         
-        # Filtros usando df_base para as opções
-        if 'Cliente' in df_base.columns:
-            clientes = ['Todos'] + sorted(df_base['Cliente'].dropna().unique().tolist())
-            filtro_cliente = st.selectbox("Cliente", clientes)
-        
-        if 'Tipo_Tarefa' in df_base.columns:
-            tipos = ['Todos'] + sorted(df_base['Tipo_Tarefa'].dropna().unique().tolist())
-            filtro_tipo = st.selectbox("Tipo de Tarefa", tipos)
-        
-        if 'Prioridade' in df_base.columns:
-            prioridades = ['Todos'] + sorted(df_base['Prioridade'].dropna().unique().tolist())
-            filtro_prioridade = st.selectbox("Prioridade", prioridades)
-        
-        st.markdown("---")
-        st.header("🎨 Configurações de Cores")
-        
-        # Cores personalizadas que serão usadas em TODOS os gráficos
-        cor_primaria = st.color_picker("Cor Primária", "#2196F3", 
-                                      help="Cor para gráficos principais")
-        cor_secundaria = st.color_picker("Cor Secundária", "#4CAF50", 
-                                        help="Cor para gráficos secundários")
-        cor_terciaria = st.color_picker("Cor Terciária", "#FF5722", 
-                                       help="Cor para gráficos complementares")
-        
-        # Paleta de cores para gráficos de pizza
-        st.markdown("**Paleta para gráficos de categoria:**")
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            cor_cat1 = st.color_picker("Cat 1", "#4CAF50", key="cat1")
-        with col2:
-            cor_cat2 = st.color_picker("Cat 2", "#2196F3", key="cat2")
-        with col3:
-            cor_cat3 = st.color_picker("Cat 3", "#FF9800", key="cat3")
-        
-        paleta_cores = [cor_cat1, cor_cat2, cor_cat3, "#9C27B0", "#F44336", "#00BCD4"]
+        # Os períodos, desenhados abaixo, rodam antes: as contagens das
+        # opções de cada dimensão consideram os demais filtros e os períodos
+        caixa_dimensoes = st.container()
+
+        st.subheader("📅 Períodos")
+        for col in COLUNAS_DATA:
+            inicio_dados, fim_dados = faixas_datas.get(col, (None, None))
+            if inicio_dados is None:
+                continue
+            primeiro_dia, ultimo_dia = inicio_dados.date(), fim_dados.date()
+            periodo = st.date_input(
+                ROTULOS_DATAS[col],
+                value=(primeiro_dia, ultimo_dia),
+                min_value=primeiro_dia,
+                max_value=ultimo_dia,
+                format="DD/MM/YYYY"
+            )
+            # Durante a seleção o widget devolve só o início
+            inicio = periodo[0] if len(periodo) > 0 else None
+            fim = periodo[1] if len(periodo) > 1 else None
+            if (inicio is not None and inicio > primeiro_dia) or (fim is not None and fim < ultimo_dia):
+                datas_selecionadas[col] = (inicio, fim)
+
+        # Seleções atuais de todas as dimensões, para as contagens cruzadas
+        for col in COLUNAS_FILTRO:
+            if st.session_state.get(f'filtro_{col}'):
+                filtros_selecionados[col] = st.session_state[f'filtro_{col}']
+        indice_facetas = carregar_facetas(chave_dataset, versao_dataset, datas_selecionadas, df_base, consulta)
+        with perfil.etapa('facetas'):
+            facetas = indice_facetas.contagens(filtros_selecionados)
+
+        # Opções com a contagem sob os demais filtros; as sem tarefas somem,
+        # exceto as já selecionadas. Sem seleção, todos.
+        with caixa_dimensoes:
+            for col in COLUNAS_FILTRO:
+                if col not in colunas_base:
+                    continue
+                contagens = facetas.get(col, pd.Series(dtype='int64'))
+                selecionados = filtros_selecionados.get(col, [])
+                st.multiselect(
+                    ROTULOS_FILTROS[col],
+                    [valor for valor in opcoes(col) if valor in contagens.index or valor in selecionados],
+                    format_func=lambda valor, contagens=contagens: f"{valor} ({contagens.get(valor, 0):,})",
+                    placeholder="Todos",
+                    key=f'filtro_{col}',
+                )
         
         st.markdown("---")
         st.header("ℹ️ Sobre")
@@ -369,31 +538,45 @@ if uploaded_file:
         - Camada Ouro: Indicadores e métricas
         """)
     
-    # APLICAR FILTROS ao DataFrame
-    df_filtrado = df_base.copy()
-    
-    if filtro_cliente and filtro_cliente != 'Todos':
-        df_filtrado = df_filtrado[df_filtrado['Cliente'] == filtro_cliente]
-    
-    if filtro_tipo and filtro_tipo != 'Todos':
-        df_filtrado = df_filtrado[df_filtrado['Tipo_Tarefa'] == filtro_tipo]
+    if consulta is not None:
+        # APLICAR FILTROS: varredura da prata particionada, sem as colunas de texto
+        df_filtrado = ler_recorte(chave_dataset, versao_dataset, filtros_selecionados,
+                                  datas_selecionadas, tuple(consulta.colunas_sem_texto()), consulta)
+        posicoes = None if not (filtros_selecionados or datas_selecionadas) else df_filtrado.index.to_numpy()
+    else:
+        # APLICAR FILTROS: posições resolvidas pelos índices, sem copiar df_base;
+        # períodos por busca binária nas posições ordenadas por data
+        indice_filtros = carregar_indice_filtros(chave_dataset, versao_dataset, df_base)
+        with perfil.etapa('filtros') as registro:
+            posicoes = intersecao(indice_filtros.posicoes(filtros_selecionados),
+                                  indice_datas.posicoes(datas_selecionadas))
+            df_filtrado = df_base if posicoes is None else df_base.take(posicoes)
+            if registro is not None:
+                registro['linhas'] = len(df_filtrado)
     
-    if filtro_prioridade and filtro_prioridade != 'Todos':
-        df_filtrado = df_filtrado[df_filtrado['Prioridade'] == filtro_prioridade]
+    # Calcular métricas com dados FILTRADOS: roll-up do cubo da camada ouro
+    # (o cubo não tem datas; com período, as métricas saem do recorte)
+    ouro = carregar_ouro(chave_dataset, versao_dataset)
+    with perfil.etapa('metricas'):
+        if ouro is not None and 'cubo' in ouro[1] and not datas_selecionadas:
+            metricas = metricas_do_cubo(ouro[1]['cubo'], filtros_selecionados, ouro[1].get('quantis'))
+        else:
+            metricas = calcular_metricas(df_filtrado)
     
-    # Calcular métricas com dados FILTRADOS
-    metricas = calcular_metricas(df_filtrado)
+    # Tabelas de todas as seções em uma única passada sobre df_filtrado
+    with perfil.etapa('agregacao', linhas=len(df_filtrado)):
+        tabelas = tabelas_pagina(df_filtrado)
     
     # Mostrar filtros aplicados
     st.sidebar.markdown("---")
     st.sidebar.header("📋 Filtros Aplicados")
-    filtros_ativos = []
-    if filtro_cliente and filtro_cliente != 'Todos':
-        filtros_ativos.append(f"**Cliente:** {filtro_cliente}")
-    if filtro_tipo and filtro_tipo != 'Todos':
-        filtros_ativos.append(f"**Tipo:** {filtro_tipo}")
-    if filtro_prioridade and filtro_prioridade != 'Todos':
-        filtros_ativos.append(f"**Prioridade:** {filtro_prioridade}")
+    filtros_ativos = [
+        f"**{ROTULOS_FILTROS[col]}:** {', '.join(map(str, valores))}"
+        for col, valores in filtros_selecionados.items()
+    ]
+    for col, (inicio, fim) in datas_selecionadas.items():
+        periodo = f"{inicio:%d/%m/%Y} a {fim:%d/%m/%Y}" if fim else f"desde {inicio:%d/%m/%Y}"
+        filtros_ativos.append(f"**{ROTULOS_DATAS[col]}:** {periodo}")
     
     if filtros_ativos:
         for filtro in filtros_ativos:
@@ -420,433 +603,495 @@ else:
 # -------------------------------------------------
 # Visão geral (métricas) - AGORA COM DADOS FILTRADOS
 # -------------------------------------------------
-st.header("📈 Visão Geral")
-
-# Mostrar informações dos filtros
-if filtros_ativos:
-    st.info(f"**Filtros ativos:** {', '.join([f.split(':')[1].strip() for f in filtros_ativos])}")
-
-# Mostrar paleta de cores ativa
-with st.expander("🎨 Paleta de Cores Ativa", expanded=False):
-    col_cor1, col_cor2, col_cor3 = st.columns(3)
-    with col_cor1:
-        st.color_picker("Primária", cor_primaria, disabled=True)
-    with col_cor2:
-        st.color_picker("Secundária", cor_secundaria, disabled=True)
-    with col_cor3:
-        st.color_picker("Terciária", "#FF5722", disabled=True)
-
-# Primeira linha de métricas
-col1, col2, col3, col4 = st.columns(4)
-
-with col1:
-    st.metric(
-        label="Total de Tarefas",
-        value=f"{metricas['total_tarefas']:,}",
-        help="Número total de tarefas no dataset"
-    )
+@secao('Visão Geral')
+def secao_visao_geral(metricas, filtros_ativos):
+    """Cartões de indicadores do recorte filtrado."""
+    st.header("📈 Visão Geral")
 
-with col2:
-    st.metric(
-        label="Horas Registradas",
-        value=f"{metricas['total_horas']:,.1f} h",
-        help="Total de horas registradas em todas as tarefas"
-    )
-
-with col3:
-    if metricas['tempo_medio_dias'] is not None:
-        valor = f"{metricas['tempo_medio_dias']:.1f} dias"
-    else:
-        valor = "—"
-    st.metric(
-        label="Tempo Médio",
-        value=valor,
-        help="Tempo médio entre criação e fechamento"
-    )
-
-with col4:
-    st.metric(
-        label="Tarefas Reabertas",
-        value=f"{metricas['perc_reabertas']:.1f}%",
-        help="Percentual de tarefas que foram reabertas"
-    )
+    # Mostrar informações dos filtros
+    if filtros_ativos:
+        st.info(f"**Filtros ativos:** {', '.join([f.split(':')[1].strip() for f in filtros_ativos])}")
 
-# Segunda linha de métricas
-col5, col6, col7, col8 = st.columns(4)
+    # Primeira linha de métricas
+    col1, col2, col3, col4 = st.columns(4)
 
-with col5:
-    if 'eficiencia_media' in metricas:
+    with col1:
         st.metric(
-            label="Eficiência Média",
-            value=f"{metricas['eficiencia_media']:.1f}%",
-            help="Média da eficiência (horas registradas/estimadas)"
+            label="Total de Tarefas",
+            value=f"{metricas['total_tarefas']:,}",
+            help="Número total de tarefas no dataset"
         )
 
-with col6:
-    if 'sla_no_prazo' in metricas:
+    with col2:
         st.metric(
-            label="SLA no Prazo",
-            value=f"{metricas['sla_no_prazo']:.1f}%",
-            help="Percentual de tarefas entregues no prazo"
+            label="Horas Registradas",
+            value=f"{metricas['total_horas']:,.1f} h",
+            help="Total de horas registradas em todas as tarefas"
         )
 
-with col7:
-    if 'outliers_eficiencia' in metricas:
+    with col3:
+        if metricas['tempo_medio_dias'] is not None:
+            valor = f"{metricas['tempo_medio_dias']:.1f} dias"
+        else:
+            valor = "—"
         st.metric(
-            label="Outliers de Eficiência",
-            value=f"{metricas['outliers_eficiencia']}",
-            help="Tarefas com eficiência <50% ou >100%"
+            label="Tempo Médio",
+            value=valor,
+            help="Tempo médio entre criação e fechamento"
         )
 
-with col8:
-    if 'media_horas_por_tarefa' in metricas:
+    with col4:
         st.metric(
-            label="Média Horas/Tarefa",
-            value=f"{metricas['media_horas_por_tarefa']:.1f} h",
-            help="Média de horas por tarefa"
+            label="Tarefas Reabertas",
+            value=f"{metricas['perc_reabertas']:.1f}%",
+            help="Percentual de tarefas que foram reabertas"
         )
 
-st.markdown("---")
+    # Segunda linha de métricas
+    col5, col6, col7, col8 = st.columns(4)
 
-# -------------------------------------------------
-# Gráficos principais - Primeira linha
-# -------------------------------------------------
-st.header("📊 Gráficos Principais")
+    with col5:
+        if 'eficiencia_media' in metricas:
+            st.metric(
+                label="Eficiência Média",
+                value=f"{metricas['eficiencia_media']:.1f}%",
+                help="Média da eficiência (horas registradas/estimadas)"
+            )
 
-col_graf1, col_graf2 = st.columns(2)
+    with col6:
+        if 'sla_no_prazo' in metricas:
+            st.metric(
+                label="SLA no Prazo",
+                value=f"{metricas['sla_no_prazo']:.1f}%",
+                help="Percentual de tarefas entregues no prazo"
+            )
 
-with col_graf1:
-    # 1. Tarefas reabertas (Pizza)
-    if 'Tarefa_Reaberta' in df_filtrado.columns:
-        st.subheader("🔄 Tarefas Reabertas")
-        
-        # Converter booleanos para texto para melhor visualização
-        df_pizza = df_filtrado.copy()
-        df_pizza['Tarefa_Reaberta_Texto'] = df_pizza['Tarefa_Reaberta'].map({True: 'Reabertas', False: 'Não Reabertas'})
-        
-        pizza_chart = criar_grafico_pizza(df_pizza, 'Tarefa_Reaberta_Texto', 
-                                         'Distribuição de Tarefas Reabertas',
-                                         colors=[cor_primaria, cor_secundaria])
-        if pizza_chart:
-            st.altair_chart(pizza_chart, use_container_width=True)
-        
-        # Estatísticas
-        reabertas_stats = df_filtrado['Tarefa_Reaberta'].value_counts()
-        col_stat1, col_stat2 = st.columns(2)
-        with col_stat1:
-            st.info(f"**Não Reabertas:** {reabertas_stats.get(False, 0):,}")
-        with col_stat2:
-            st.warning(f"**Reabertas:** {reabertas_stats.get(True, 0):,}")
-
-with col_graf2:
-    # 2. Horas por Cliente (Top 10) - AGORA COM FILTROS
-    if {'Cliente', 'Tarefa_Esforco_Registradas'}.issubset(df_filtrado.columns):
-        st.subheader("🏢 Top 10 Clientes por Horas")
-        
-        # Se já está filtrado por um cliente específico, mostrar apenas ele
-        if filtro_cliente and filtro_cliente != 'Todos':
-            cliente_especifico = df_filtrado[df_filtrado['Cliente'] == filtro_cliente]
-            if not cliente_especifico.empty:
-                horas = cliente_especifico['Tarefa_Esforco_Registradas'].sum()
-                st.info(f"**Cliente selecionado:** {filtro_cliente}")
-                st.metric("Total de Horas", f"{horas:,.1f} h")
-        else:
-            # Mostrar top 10 clientes
-            top_clientes = df_filtrado.groupby('Cliente')['Tarefa_Esforco_Registradas'].sum().nlargest(10).reset_index()
-            
-            if not top_clientes.empty:
-                chart = alt.Chart(top_clientes).mark_bar(color=cor_primaria).encode(
-                    x=alt.X('Tarefa_Esforco_Registradas:Q', title='Horas Registradas'),
-                    y=alt.Y('Cliente:N', sort='-x', title='Cliente'),
-                    tooltip=['Cliente', 'Tarefa_Esforco_Registradas']
-                ).properties(
-                    height=400
-                )
-                
-                st.altair_chart(chart, use_container_width=True)
+    with col7:
+        if 'outliers_eficiencia' in metricas:
+            st.metric(
+                label="Outliers de Eficiência",
+                value=f"{metricas['outliers_eficiencia']}",
+                help="Tarefas com eficiência <50% ou >100%"
+            )
 
-# -------------------------------------------------
-# Gráficos principais - Segunda linha
-# -------------------------------------------------
-col_graf3, col_graf4 = st.columns(2)
+    with col8:
+        if 'media_horas_por_tarefa' in metricas:
+            st.metric(
+                label="Média Horas/Tarefa",
+                value=f"{metricas['media_horas_por_tarefa']:.1f} h",
+                help="Média de horas por tarefa"
+            )
 
-with col_graf3:
-    # 3. Horas por Equipe
-    if {'Equipe', 'Tarefa_Esforco_Registradas'}.issubset(df_filtrado.columns):
-        st.subheader("👥 Horas por Equipe")
-        
-        horas_equipe = df_filtrado.groupby('Equipe')['Tarefa_Esforco_Registradas'].sum().reset_index()
-        
-        if not horas_equipe.empty:
-            chart = alt.Chart(horas_equipe).mark_bar(color=cor_secundaria).encode(
-                x=alt.X('Equipe:N', title='Equipe', axis=alt.Axis(labelAngle=45)),
-                y=alt.Y('Tarefa_Esforco_Registradas:Q', title='Horas Registradas'),
-                tooltip=['Equipe', 'Tarefa_Esforco_Registradas']
-            ).properties(
-                height=300
+    # Terceira linha: distribuição do lead time
+    if metricas.get('tempo_mediano_dias') is not None:
+        col9, col10, col11 = st.columns(3)
+        with col9:
+            st.metric(
+                label="Tempo Mediano",
+                value=f"{metricas['tempo_mediano_dias']:.1f} dias",
+                help="Metade das tarefas é fechada em até este tempo"
+            )
+        with col10:
+            st.metric(
+                label="Tempo p90",
+                value=f"{metricas['tempo_p90_dias']:.1f} dias",
+                help="90% das tarefas são fechadas em até este tempo"
+            )
+        with col11:
+            st.metric(
+                label="Tempo p95",
+                value=f"{metricas['tempo_p95_dias']:.1f} dias",
+                help="95% das tarefas são fechadas em até este tempo"
             )
-            
-            st.altair_chart(chart, use_container_width=True)
 
-with col_graf4:
-    # 4. Distribuição por Prioridade
-    if 'Prioridade' in df_filtrado.columns:
-        st.subheader("🎯 Distribuição por Prioridade")
-        
-        # Se já está filtrado por uma prioridade específica
-        if filtro_prioridade and filtro_prioridade != 'Todos':
-            st.info(f"**Prioridade selecionada:** {filtro_prioridade}")
-            contagem = len(df_filtrado[df_filtrado['Prioridade'] == filtro_prioridade])
-            st.metric("Tarefas com esta prioridade", contagem)
-        else:
-            # Gráfico de barras com cores da paleta
-            prioridade_data = df_filtrado['Prioridade'].value_counts().reset_index()
-            prioridade_data.columns = ['Prioridade', 'Quantidade']
-            
-            if not prioridade_data.empty:
-                chart = alt.Chart(prioridade_data).mark_bar().encode(
-                    x=alt.X('Prioridade:N', title='Prioridade', axis=alt.Axis(labelAngle=0)),
-                    y=alt.Y('Quantidade:Q', title='Quantidade de Tarefas'),
-                    color=alt.Color('Prioridade:N', scale=alt.Scale(
-                        domain=prioridade_data['Prioridade'].tolist(),
-                        range=paleta_cores[:len(prioridade_data)]
-                    )),
-                    tooltip=['Prioridade', 'Quantidade']
-                ).properties(
-                    height=300,
-                    title='Quantidade por Prioridade'
-                )
-                
-                st.altair_chart(chart, use_container_width=True)
-        
-        # Estatísticas de prioridade
-        prioridades = df_filtrado['Prioridade'].value_counts()
-        col_pri1, col_pri2, col_pri3 = st.columns(3)
-        with col_pri1:
-            st.error(f"**Alta:** {prioridades.get('Alta', 0):,}")
-        with col_pri2:
-            st.warning(f"**Média:** {prioridades.get('Média', 0):,}")
-        with col_pri3:
-            st.success(f"**Baixa:** {prioridades.get('Baixa', 0):,}")
+    st.markdown("---")
 
-st.markdown("---")
+secao_visao_geral(metricas, filtros_ativos)
 
 # -------------------------------------------------
-# Análise de SLA
+# Gráficos (cores e faixa do SLA reexecutam só esta seção)
 # -------------------------------------------------
-st.header("⏱️ Análise de SLA")
+@secao('Gráficos')
+def secao_graficos(metricas, tabelas, filtros_selecionados):
+    """Gráficos da página, desenhados a partir das tabelas já agregadas."""
+    with st.expander("🎨 Configurações de Cores", expanded=False):
+        # Cores personalizadas que serão usadas em TODOS os gráficos
+        col_cor1, col_cor2, col_cor3 = st.columns(3)
+        with col_cor1:
+            cor_primaria = st.color_picker("Cor Primária", "#2196F3",
+                                          help="Cor para gráficos principais")
+        with col_cor2:
+            cor_secundaria = st.color_picker("Cor Secundária", "#4CAF50",
+                                            help="Cor para gráficos secundários")
+        with col_cor3:
+            cor_terciaria = st.color_picker("Cor Terciária", "#FF5722",
+                                           help="Cor para gráficos complementares")
 
-if 'SLA_Status' in df_filtrado.columns:
-    col_sla1, col_sla2 = st.columns(2)
-    
-    with col_sla1:
-        st.subheader("📊 Status do SLA")
-        
-        sla_data = df_filtrado['SLA_Status'].value_counts().reset_index()
-        sla_data.columns = ['Status', 'Quantidade']
-        
-        if not sla_data.empty:
-            # Mapa de cores usando a paleta
-            cores_sla = [cor_secundaria, "#F44336", "#FF9800"]
-            color_scale = alt.Scale(
-                domain=['No prazo', 'Atrasada', 'Sem data'],
-                range=cores_sla
-            )
-            
-            chart = alt.Chart(sla_data).mark_arc(innerRadius=50).encode(
-                theta='Quantidade:Q',
-                color=alt.Color('Status:N', scale=color_scale),
-                tooltip=['Status', 'Quantidade']
-            ).properties(
-                height=300,
-                width=300
+        # Paleta de cores para gráficos de pizza
+        st.markdown("**Paleta para gráficos de categoria:**")
+        col_cat1, col_cat2, col_cat3 = st.columns(3)
+        with col_cat1:
+            cor_cat1 = st.color_picker("Cat 1", "#4CAF50", key="cat1")
+        with col_cat2:
+            cor_cat2 = st.color_picker("Cat 2", "#2196F3", key="cat2")
+        with col_cat3:
+            cor_cat3 = st.color_picker("Cat 3", "#FF9800", key="cat3")
+
+        paleta_cores = [cor_cat1, cor_cat2, cor_cat3, "#9C27B0", "#F44336", "#00BCD4"]
+
+    # -------------------------------------------------
+    # Gráficos principais - Primeira linha
+    # -------------------------------------------------
+    st.header("📊 Gráficos Principais")
+
+    col_graf1, col_graf2 = st.columns(2)
+
+    with col_graf1:
+        # 1. Tarefas reabertas (Pizza)
+        if 'reabertas' in tabelas:
+            st.subheader("🔄 Tarefas Reabertas")
+
+            reabertas_stats = serie_contagem(tabelas['reabertas'])
+
+            # Booleanos como texto para melhor visualização
+            mostrar_grafico(
+                criar_grafico_pizza,
+                reabertas_stats.rename({False: 'Não Reabertas', True: 'Reabertas'}),
+                title='Distribuição de Tarefas Reabertas',
+                colors=[cor_primaria, cor_secundaria]
             )
-            
-            st.altair_chart(chart, use_container_width=True)
-    
-    with col_sla2:
-        st.subheader("📈 Distribuição do SLA (Dias)")
-        
-        if 'SLA_Dias' in df_filtrado.columns:
-            df_sla = df_filtrado.dropna(subset=['SLA_Dias']).copy()
-            
-            if not df_sla.empty:
-                # Filtrar outliers extremos para melhor visualização
-                df_sla_filtered = df_sla[(df_sla['SLA_Dias'] >= -30) & (df_sla['SLA_Dias'] <= 60)]
-                
-                chart = criar_histograma(df_sla_filtered, 'SLA_Dias', 
-                                        'Distribuição do SLA (entre -30 e 60 dias)', 
-                                        bins=30, color=cor_primaria)
-                if chart:
-                    st.altair_chart(chart, use_container_width=True)
-                
-                # Estatísticas do SLA
-                col_stat1, col_stat2, col_stat3 = st.columns(3)
-                with col_stat1:
-                    st.metric("Média", f"{df_sla['SLA_Dias'].mean():.1f} dias")
-                with col_stat2:
-                    st.metric("Mediana", f"{df_sla['SLA_Dias'].median():.1f} dias")
-                with col_stat3:
-                    atrasadas = len(df_sla[df_sla['SLA_Dias'] > 0])
-                    st.metric("Atrasadas", f"{atrasadas:,}")
 
-# -------------------------------------------------
-# Análise de Eficiência
-# -------------------------------------------------
-st.markdown("---")
-st.header("🎯 Análise de Eficiência")
+            # Estatísticas
+            col_stat1, col_stat2 = st.columns(2)
+            with col_stat1:
+                st.info(f"**Não Reabertas:** {reabertas_stats.get(False, 0):,}")
+            with col_stat2:
+                st.warning(f"**Reabertas:** {reabertas_stats.get(True, 0):,}")
+
+    with col_graf2:
+        # 2. Horas por Cliente (Top 10) - AGORA COM FILTROS
+        if 'horas_cliente' in tabelas:
+            st.subheader("🏢 Top 10 Clientes por Horas")
+
+            # Se já está filtrado por um cliente específico, mostrar apenas ele
+            clientes_filtro = filtros_selecionados.get('Cliente', [])
+            if len(clientes_filtro) == 1:
+                # as métricas já são só as do cliente
+                if metricas['total_tarefas']:
+                    st.info(f"**Cliente selecionado:** {clientes_filtro[0]}")
+                    st.metric("Total de Horas", f"{metricas['total_horas']:,.1f} h")
+            else:
+                # Mostrar top 10 clientes
+                top_clientes = tabelas['horas_cliente'].nlargest(10, 'Tarefa_Esforco_Registradas')
+
+                if not top_clientes.empty:
+                    mostrar_grafico(criar_grafico_ranking, top_clientes,
+                                    x_col='Tarefa_Esforco_Registradas', y_col='Cliente',
+                                    titulo_x='Horas Registradas', titulo_y='Cliente',
+                                    color=cor_primaria)
+
+    # -------------------------------------------------
+    # Gráficos principais - Segunda linha
+    # -------------------------------------------------
+    col_graf3, col_graf4 = st.columns(2)
+
+    with col_graf3:
+        # 3. Horas por Equipe
+        if 'horas_equipe' in tabelas:
+            st.subheader("👥 Horas por Equipe")
+
+            horas_equipe = tabelas['horas_equipe']
+
+            if not horas_equipe.empty:
+                mostrar_grafico(criar_grafico_colunas, horas_equipe,
+                                x_col='Equipe', y_col='Tarefa_Esforco_Registradas',
+                                titulo_x='Equipe', titulo_y='Horas Registradas',
+                                color=cor_secundaria)
+
+    with col_graf4:
+        # 4. Distribuição por Prioridade
+        if 'prioridade' in tabelas:
+            st.subheader("🎯 Distribuição por Prioridade")
+
+            prioridades = serie_contagem(tabelas['prioridade'])
+
+            # Se já está filtrado por uma prioridade específica
+            prioridades_filtro = filtros_selecionados.get('Prioridade', [])
+            if len(prioridades_filtro) == 1:
+                st.info(f"**Prioridade selecionada:** {prioridades_filtro[0]}")
+                st.metric("Tarefas com esta prioridade", metricas['total_tarefas'])
+            else:
+                # Gráfico de barras com cores da paleta
+                prioridade_data = prioridades.reset_index()
+                prioridade_data.columns = ['Prioridade', 'Quantidade']
+
+                if not prioridade_data.empty:
+                    mostrar_grafico(criar_grafico_categorias, prioridade_data,
+                                    col='Prioridade', titulo_x='Prioridade',
+                                    dominio=prioridade_data['Prioridade'].tolist(),
+                                    cores=paleta_cores[:len(prioridade_data)],
+                                    title='Quantidade por Prioridade', angulo_rotulo=0)
+
+            # Estatísticas de prioridade
+            col_pri1, col_pri2, col_pri3 = st.columns(3)
+            with col_pri1:
+                st.error(f"**Alta:** {prioridades.get('Alta', 0):,}")
+            with col_pri2:
+                st.warning(f"**Média:** {prioridades.get('Média', 0):,}")
+            with col_pri3:
+                st.success(f"**Baixa:** {prioridades.get('Baixa', 0):,}")
 
-if 'Eficiencia' in df_filtrado.columns:
-    col_eff1, col_eff2 = st.columns(2)
-    
-    with col_eff1:
-        st.subheader("📊 Categorias de Eficiência")
-        
-        if 'Eficiencia_Categoria' in df_filtrado.columns:
-            eff_data = df_filtrado['Eficiencia_Categoria'].value_counts().reset_index()
-            eff_data.columns = ['Categoria', 'Quantidade']
-            
-            if not eff_data.empty:
-                color_scale = alt.Scale(
-                    domain=['Baixa', 'Normal', 'Alta'],
-                    range=[cor_secundaria, cor_primaria, "#FF5722"]
-                )
-                
-                chart = alt.Chart(eff_data).mark_bar().encode(
-                    x=alt.X('Categoria:N', title='Categoria'),
-                    y=alt.Y('Quantidade:Q', title='Quantidade de Tarefas'),
-                    color=alt.Color('Categoria:N', scale=color_scale, legend=None),
-                    tooltip=['Categoria', 'Quantidade']
-                ).properties(
-                    height=300
-                )
-                
-                st.altair_chart(chart, use_container_width=True)
-    
-    with col_eff2:
-        st.subheader("📈 Distribuição da Eficiência")
-        
-        chart = criar_histograma(df_filtrado, 'Eficiencia', 
-                                'Distribuição da Eficiência (%)', 
-                                bins=30, color=cor_primaria)
-        if chart:
-            st.altair_chart(chart, use_container_width=True)
-        
-        # Outliers
-        outliers = df_filtrado[(df_filtrado['Eficiencia'] > 100) | (df_filtrado['Eficiencia'] < 50)]
-        if len(outliers) > 0:
-            st.warning(f"**Outliers detectados:** {len(outliers):,} tarefas")
+    st.markdown("---")
 
-# -------------------------------------------------
-# Análise de Tempo
-# -------------------------------------------------
-st.markdown("---")
-st.header("⏰ Análise de Tempo")
+    # -------------------------------------------------
+    # Análise de SLA
+    # -------------------------------------------------
+    st.header("⏱️ Análise de SLA")
+
+    if 'sla_status' in tabelas:
+        col_sla1, col_sla2 = st.columns(2)
+
+        with col_sla1:
+            st.subheader("📊 Status do SLA")
+
+            sla_data = serie_contagem(tabelas['sla_status']).reset_index()
+            sla_data.columns = ['Status', 'Quantidade']
+
+            if not sla_data.empty:
+                # Mapa de cores usando a paleta
+                cores_sla = [cor_secundaria, "#F44336", "#FF9800"]
+                mostrar_grafico(criar_grafico_rosca, sla_data, col='Status',
+                                dominio=['No prazo', 'Atrasada', 'Sem data'],
+                                cores=cores_sla)
+
+        with col_sla2:
+            st.subheader("📈 Distribuição do SLA (Dias)")
+
+            if 'sla_dias' in tabelas:
+                # Quantidade de tarefas por valor de SLA_Dias
+                sla_dias = tabelas['sla_dias']
+
+                if not sla_dias.empty:
+                    # Faixa exibida, para limitar outliers extremos
+                    faixa_sla = st.slider(
+                        "Faixa exibida (dias)",
+                        min(int(sla_dias['SLA_Dias'].min()), FAIXA_SLA_PADRAO[0]),
+                        max(int(sla_dias['SLA_Dias'].max()), FAIXA_SLA_PADRAO[1]),
+                        FAIXA_SLA_PADRAO,
+                        key="faixa_sla"
+                    )
+
+                    mostrar_grafico(criar_histograma, sla_dias, col='SLA_Dias',
+                                    title=f'Distribuição do SLA (entre {faixa_sla[0]} e {faixa_sla[1]} dias)',
+                                    bins=30, color=cor_primaria, faixa=faixa_sla,
+                                    pesos='Quantidade')
+
+                    # Estatísticas do SLA
+                    media_sla, mediana_sla = media_e_mediana(sla_dias['SLA_Dias'], sla_dias['Quantidade'])
+                    col_stat1, col_stat2, col_stat3 = st.columns(3)
+                    with col_stat1:
+                        st.metric("Média", f"{media_sla:.1f} dias")
+                    with col_stat2:
+                        st.metric("Mediana", f"{mediana_sla:.1f} dias")
+                    with col_stat3:
+                        atrasadas = int(sla_dias.loc[sla_dias['SLA_Dias'] > 0, 'Quantidade'].sum())
+                        st.metric("Atrasadas", f"{atrasadas:,}")
+
+    # -------------------------------------------------
+    # Análise de Eficiência
+    # -------------------------------------------------
+    st.markdown("---")
+    st.header("🎯 Análise de Eficiência")
 
-col_time1, col_time2 = st.columns(2)
+    if 'faixas_eficiencia' in tabelas:
+        col_eff1, col_eff2 = st.columns(2)
+
+        with col_eff1:
+            st.subheader("📊 Categorias de Eficiência")
+
+            if 'eficiencia_categoria' in tabelas:
+                eff_data = serie_contagem(tabelas['eficiencia_categoria']).reset_index()
+                eff_data.columns = ['Categoria', 'Quantidade']
+
+                if not eff_data.empty:
+                    mostrar_grafico(criar_grafico_categorias, eff_data,
+                                    col='Categoria', titulo_x='Categoria',
+                                    dominio=['Baixa', 'Normal', 'Alta'],
+                                    cores=[cor_secundaria, cor_primaria, "#FF5722"],
+                                    legenda=False)
+
+        with col_eff2:
+            st.subheader("📈 Distribuição da Eficiência")
+
+            mostrar_grafico(criar_grafico_faixas, tabelas['faixas_eficiencia'], col='Eficiencia',
+                            title='Distribuição da Eficiência (%)', color=cor_primaria)
+
+            # Outliers (já contados nas métricas gerais)
+            if metricas.get('outliers_eficiencia', 0) > 0:
+                st.warning(f"**Outliers detectados:** {metricas['outliers_eficiencia']:,} tarefas")
+
+    # -------------------------------------------------
+    # Análise de Tempo
+    # -------------------------------------------------
+    st.markdown("---")
+    st.header("⏰ Análise de Tempo")
+
+    col_time1, col_time2 = st.columns(2)
+
+    with col_time1:
+        # Tempo por Tipo de Tarefa
+        if 'tempo_tipo' in tabelas:
+            st.subheader("⏱️ Tempo por Tipo de Tarefa")
+
+            tempo_tipo = (
+                tabelas['tempo_tipo']
+                .rename(columns={'Lead_Time_Dias': 'Dias'})
+                .sort_values('Dias', ascending=False)
+                .head(10)
+            )
 
-with col_time1:
-    # Tempo por Tipo de Tarefa
-    if {'Tipo_Tarefa', 'Tarefa_Criada', 'Tarefa_Fechada'}.issubset(df_filtrado.columns):
-        st.subheader("⏱️ Tempo por Tipo de Tarefa")
-        
-        tmp = df_filtrado.dropna(subset=['Tarefa_Criada', 'Tarefa_Fechada']).copy()
-        
-        if not tmp.empty:
-            tmp['Dias'] = (tmp['Tarefa_Fechada'] - tmp['Tarefa_Criada']).dt.days
-            
-            tempo_tipo = tmp.groupby('Tipo_Tarefa')['Dias'].mean().sort_values(ascending=False).head(10).reset_index()
-            
             if not tempo_tipo.empty:
-                chart = alt.Chart(tempo_tipo).mark_bar(color="#9C27B0").encode(
-                    x=alt.X('Dias:Q', title='Dias Médios'),
-                    y=alt.Y('Tipo_Tarefa:N', sort='-x', title='Tipo de Tarefa'),
-                    tooltip=['Tipo_Tarefa', 'Dias']
-                ).properties(
-                    height=400
-                )
-                
-                st.altair_chart(chart, use_container_width=True)
+                mostrar_grafico(criar_grafico_ranking, tempo_tipo,
+                                x_col='Dias', y_col='Tipo_Tarefa',
+                                titulo_x='Dias Médios', titulo_y='Tipo de Tarefa',
+                                color="#9C27B0")
+
+    with col_time2:
+        # Tempo por Cliente
+        if 'tempo_cliente' in tabelas:
+            st.subheader("🏢 Tempo por Cliente")
+
+            tempo_cliente = (
+                tabelas['tempo_cliente']
+                .rename(columns={'Lead_Time_Dias': 'Dias'})
+                .sort_values('Dias', ascending=False)
+                .head(10)
+            )
 
-with col_time2:
-    # Tempo por Cliente
-    if {'Cliente', 'Tarefa_Criada', 'Tarefa_Fechada'}.issubset(df_filtrado.columns):
-        st.subheader("🏢 Tempo por Cliente")
-        
-        tmp = df_filtrado.dropna(subset=['Tarefa_Criada', 'Tarefa_Fechada']).copy()
-        
-        if not tmp.empty:
-            tmp['Dias'] = (tmp['Tarefa_Fechada'] - tmp['Tarefa_Criada']).dt.days
-            
-            tempo_cliente = tmp.groupby('Cliente')['Dias'].mean().sort_values(ascending=False).head(10).reset_index()
-            
             if not tempo_cliente.empty:
-                chart = alt.Chart(tempo_cliente).mark_bar(color=cor_secundaria).encode(
-                    x=alt.X('Dias:Q', title='Dias Médios'),
-                    y=alt.Y('Cliente:N', sort='-x', title='Cliente'),
-                    tooltip=['Cliente', 'Dias']
-                ).properties(
-                    height=400
-                )
-                
-                st.altair_chart(chart, use_container_width=True)
+                mostrar_grafico(criar_grafico_ranking, tempo_cliente,
+                                x_col='Dias', y_col='Cliente',
+                                titulo_x='Dias Médios', titulo_y='Cliente',
+                                color=cor_secundaria)
+
+secao_graficos(metricas, tabelas, filtros_selecionados)
 
 # -------------------------------------------------
 # Tabela de dados
 # -------------------------------------------------
-st.markdown("---")
-st.header("📋 Dados Detalhados")
-
-with st.expander("🔍 Ver dados completos", expanded=False):
-    # Filtros para a tabela
-    col_filt1, col_filt2 = st.columns(2)
-    with col_filt1:
-        mostrar_colunas = st.multiselect(
-            "Selecione colunas para exibir",
-            options=df_filtrado.columns.tolist(),
-            default=df_filtrado.columns.tolist()[:8]
+@secao('Dados Detalhados')
+def secao_tabela(df_base, posicoes, chave_dataset, versao_dataset, consulta=None, recorte=None):
+    """Tabela paginada; busca, ordenação e página reexecutam só esta seção.
+
+    Com consulta, lê do disco só as colunas exibidas, buscadas ou ordenadas
+    das linhas do recorte (filtros, datas).
+    """
+    colunas_base = consulta.colunas if consulta is not None else df_base.columns.tolist()
+    st.markdown("---")
+    st.header("📋 Dados Detalhados")
+
+    with st.expander("🔍 Ver dados completos", expanded=False):
+        # Filtros para a tabela
+        col_filt1, col_filt2 = st.columns(2)
+        with col_filt1:
+            mostrar_colunas = st.multiselect(
+                "Selecione colunas para exibir",
+                options=colunas_base,
+                default=colunas_base[:8]
+            )
+
+        with col_filt2:
+            linhas_mostrar = st.slider("Linhas por página", 10, 100, 50)
+
+        col_busca, col_ordem, col_sentido = st.columns([2, 1, 1])
+        with col_busca:
+            busca = st.text_input("Buscar em título e tarefa", placeholder="Ex.: migração servidor")
+        with col_ordem:
+            ordenar_por = st.selectbox("Ordenar por", ['(ordem original)'] + colunas_base)
+        with col_sentido:
+            decrescente = st.checkbox("Decrescente")
+
+        colunas_tabela = mostrar_colunas or colunas_base
+        if consulta is not None:
+            colunas_lidas = list(dict.fromkeys(
+                colunas_tabela
+                + (COLUNAS_BUSCA if busca.strip() else [])
+                + ([ordenar_por] if ordenar_por != '(ordem original)' else [])
+            ))
+            df_tabela = ler_recorte(chave_dataset, versao_dataset, *recorte, tuple(colunas_lidas), consulta)
+            # índices do recorte lido, não do dataset inteiro
+            chave_tabela = f"{chave_dataset}:{json.dumps([recorte, colunas_lidas], default=str)}"
+            linhas_tabela = None
+        else:
+            df_tabela, chave_tabela, linhas_tabela = df_base, chave_dataset, posicoes
+
+        # Linhas da tabela como posições em df_tabela: filtros da barra lateral,
+        # busca pelo índice de texto e ordenação por permutação em cache
+        if busca.strip():
+            carregar = carregar_indice_texto if consulta is None else carregar_indice_texto_recorte
+            indice_texto = carregar(chave_tabela, versao_dataset, df_tabela)
+            linhas_tabela = intersecao(linhas_tabela, indice_texto.buscar(busca))
+        if ordenar_por != '(ordem original)':
+            carregar = carregar_ordenacoes if consulta is None else carregar_ordenacoes_recorte
+            ordenacoes = carregar(chave_tabela, versao_dataset, df_tabela)
+            linhas_tabela = ordenacoes.ordenar(ordenar_por, not decrescente, linhas_tabela)
+
+        total_tabela = len(df_tabela) if linhas_tabela is None else len(linhas_tabela)
+        total_paginas = max(-(-total_tabela // linhas_mostrar), 1)
+        # Mantém a página dentro do total quando filtros ou busca reduzem as linhas
+        st.session_state['pagina_tabela'] = min(st.session_state.get('pagina_tabela', 1), total_paginas)
+        pagina = st.number_input("Página", min_value=1, max_value=total_paginas, key='pagina_tabela')
+
+        # Só a página atual sai de df_tabela e vai para o navegador
+        inicio = (pagina - 1) * linhas_mostrar
+        fim = min(inicio + linhas_mostrar, total_tabela)
+        linhas_pagina = np.arange(inicio, fim) if linhas_tabela is None else linhas_tabela[inicio:fim]
+
+        st.dataframe(
+            df_tabela[colunas_tabela].take(linhas_pagina),
+            use_container_width=True,
+            height=400
         )
-    
-    with col_filt2:
-        linhas_mostrar = st.slider("Número de linhas para exibir", 10, 100, 50)
-    
-    # Exibir tabela
-    st.dataframe(
-        df_filtrado[mostrar_colunas] if mostrar_colunas else df_filtrado.head(linhas_mostrar),
-        use_container_width=True,
-        height=400
-    )
+        st.caption(f"{total_tabela:,} linhas · página {pagina} de {total_paginas}")
+
+secao_tabela(df_base, posicoes, chave_dataset, versao_dataset,
+             consulta, (filtros_selecionados, datas_selecionadas))
 
 # -------------------------------------------------
 # Resumo estatístico
 # -------------------------------------------------
-st.markdown("---")
-st.header("📊 Resumo Estatístico")
-
-col_res1, col_res2, col_res3 = st.columns(3)
-
-with col_res1:
-    st.subheader("📈 Estatísticas Numéricas")
-    numeric_cols = df_filtrado.select_dtypes(include=[np.number]).columns.tolist()
-    if numeric_cols:
-        st.dataframe(df_filtrado[numeric_cols].describe(), use_container_width=True)
-
-with col_res2:
-    st.subheader("📋 Contagem por Categoria")
-    categorical_cols = df_filtrado.select_dtypes(include=['object', 'bool']).columns.tolist()[:3]
-    for col in categorical_cols:
-        if col in df_filtrado.columns:
-            st.write(f"**{col}:**")
-            st.write(df_filtrado[col].value_counts().head(5))
-
-with col_res3:
-    st.subheader("📅 Estatísticas de Datas")
-    date_cols = df_filtrado.select_dtypes(include=['datetime64']).columns.tolist()
-    for col in date_cols[:2]:
-        if col in df_filtrado.columns and not df_filtrado[col].isna().all():
-            st.write(f"**{col}:**")
-            st.write(f"Início: {df_filtrado[col].min().date()}")
-            st.write(f"Fim: {df_filtrado[col].max().date()}")
+@secao('Resumo Estatístico')
+def secao_resumo(df_filtrado):
+    """Estatísticas descritivas do recorte filtrado."""
+    st.markdown("---")
+    st.header("📊 Resumo Estatístico")
+
+    col_res1, col_res2, col_res3 = st.columns(3)
+
+    with col_res1:
+        st.subheader("📈 Estatísticas Numéricas")
+        numeric_cols = df_filtrado.select_dtypes(include=[np.number]).columns.tolist()
+        if numeric_cols:
+            st.dataframe(df_filtrado[numeric_cols].describe(), use_container_width=True)
+
+    with col_res2:
+        st.subheader("📋 Contagem por Categoria")
+        categorical_cols = df_filtrado.select_dtypes(include=['object', 'category', 'bool']).columns.tolist()[:3]
+        for col in categorical_cols:
+            if col in df_filtrado.columns:
+                st.write(f"**{col}:**")
+                st.write(contar_valores(df_filtrado[col]).head(5))
+
+    with col_res3:
+        st.subheader("📅 Estatísticas de Datas")
+        date_cols = df_filtrado.select_dtypes(include=['datetime64']).columns.tolist()
+        for col in date_cols[:2]:
+            if col in df_filtrado.columns and not df_filtrado[col].isna().all():
+                st.write(f"**{col}:**")
+                st.write(f"Início: {df_filtrado[col].min().date()}")
+                st.write(f"Fim: {df_filtrado[col].max().date()}")
+
+secao_resumo(df_filtrado)
 
 # -------------------------------------------------
 # Botão para limpar filtros
@@ -860,6 +1105,16 @@ if st.button("🔄 Limpar Todos os Filtros"):
 # -------------------------------------------------
 st.markdown("---")
 st.caption(f"📅 Última atualização: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
-st.caption(f"📊 Tarefas analisadas: {len(df_filtrado):,} de {len(df_base):,} total")
-st.caption("🎨 Cores ativas: " + f"Primária: {cor_primaria}, Secundária: {cor_secundaria}")
+st.caption(f"📊 Tarefas analisadas: {len(df_filtrado):,} de {total_base:,} total")
+cache = cache_graficos().estatisticas()
+st.caption(f"🖼️ Cache de gráficos: {cache['acertos']:,} acertos, {cache['faltas']:,} faltas, "
+           f"{cache['entradas']} de {cache['max_entradas']} entradas")
+cache = cache_datasets().estatisticas()
+st.caption(f"🗃️ Cache de datasets: {cache['acertos']:,} acertos, {cache['faltas']:,} faltas, "
+           f"{cache['despejos']:,} despejos, {cache['entradas']} datasets, "
+           f"{cache['bytes'] / 1024 ** 2:,.0f} de {cache['orcamento_bytes'] / 1024 ** 2:,.0f} MB")
 st.caption("Dashboard de Análise de Tarefas - Baseado na Arquitetura Medalhão")
+
+if perfilador is not None:
+    perfilador.encerrar_execucao()
+    painel_diagnostico(perfilador)
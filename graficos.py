@@ -0,0 +1,306 @@
+"""Gráficos Altair do dashboard e cache LRU das especificações prontas.
+
+Os construtores recebem tabelas já agregadas (ou pequenas) e devolvem
+gráficos Altair. CacheGraficos guarda a especificação Vega-Lite de cada
+gráfico, indexada pelo construtor, pela impressão digital da tabela e pelos
+parâmetros (cores, títulos), de modo que rever um mesmo recorte não
+reconstrói nem revalida nenhum gráfico.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import altair as alt
+import pandas as pd
+
+from agregacao import Agregacao, agregar, amostra_estratificada, contar_valores, histograma
+
+# Acima deste número de pontos, gráficos de dispersão usam uma amostra
+LIMITE_PONTOS_DISPERSAO = 5000
+
+# Especificações prontas mantidas em memória pelo cache de gráficos
+MAX_GRAFICOS_EM_CACHE = int(os.environ.get('DASHBOARD_MAX_GRAFICOS', '256'))
+
+# -------------------------------------------------
+# Tabelas da página
+# -------------------------------------------------
+# Tabelas por dimensão usadas nas seções da página, calculadas em uma passada
+TABELAS_PAGINA = {
+    'reabertas': Agregacao('Tarefa_Reaberta', None, 'contagem'),
+    'horas_cliente': Agregacao('Cliente', 'Tarefa_Esforco_Registradas', 'soma'),
+    'horas_equipe': Agregacao('Equipe', 'Tarefa_Esforco_Registradas', 'soma'),
+    'prioridade': Agregacao('Prioridade', None, 'contagem'),
+    'sla_status': Agregacao('SLA_Status', None, 'contagem'),
+    'eficiencia_categoria': Agregacao('Eficiencia_Categoria', None, 'contagem'),
+    'tempo_tipo': Agregacao('Tipo_Tarefa', 'Lead_Time_Dias', 'media'),
+    'tempo_cliente': Agregacao('Cliente', 'Lead_Time_Dias', 'media'),
+    'sla_dias': Agregacao('SLA_Dias', None, 'contagem'),
+}
+
+def tabelas_pagina(df: pd.DataFrame) -> dict:
+    """Tabelas de todas as seções em uma única passada sobre df."""
+    tabelas = agregar(df, TABELAS_PAGINA)
+    if 'Eficiencia' in df.columns:
+        tabelas['faixas_eficiencia'] = histograma(df['Eficiencia'], bins=30)
+    return tabelas
+
+# -------------------------------------------------
+# Construtores
+# -------------------------------------------------
+def criar_grafico_barras_horizontais(df, x_col, y_col, title, limit=10, color="#4CAF50"):
+    """Cria gráfico de barras horizontais."""
+    if y_col not in df.columns:
+        return None
+
+    top_data = contar_valores(df[y_col]).head(limit).reset_index()
+    top_data.columns = ['Categoria', 'Quantidade']
+
+    chart = alt.Chart(top_data).mark_bar(color=color).encode(
+        x=alt.X('Quantidade:Q', title='Quantidade'),
+        y=alt.Y('Categoria:N', sort='-x', title='Categoria')
+    ).properties(
+        title=title,
+        height=300
+    )
+
+    return chart
+
+def criar_grafico_barras(df, x_col, y_col, title, color="#2196F3"):
+    """Cria gráfico de barras verticais."""
+    if x_col not in df.columns or y_col not in df.columns:
+        return None
+
+    chart_data = df.groupby(x_col, observed=True)[y_col].sum().reset_index()
+
+    chart = alt.Chart(chart_data).mark_bar(color=color).encode(
+        x=alt.X(f'{x_col}:N', title=x_col, axis=alt.Axis(labelAngle=45)),
+        y=alt.Y(f'{y_col}:Q', title=y_col)
+    ).properties(
+        title=title,
+        height=300
+    )
+
+    return chart
+
+def criar_grafico_pizza(contagem, title, colors=None):
+    """Cria gráfico de pizza/donut a partir das contagens por categoria."""
+    chart_data = contagem.reset_index()
+    chart_data.columns = ['Categoria', 'Quantidade']
+
+    # Usar cores personalizadas se fornecidas
+    if colors and len(colors) >= len(chart_data):
+        color_scale = alt.Scale(
+            domain=chart_data['Categoria'].tolist(),
+            range=colors[:len(chart_data)]
+        )
+    else:
+        # Cores padrão
+        color_scale = alt.Scale(scheme='category10')
+
+    chart = alt.Chart(chart_data).mark_arc(innerRadius=50).encode(
+        theta=alt.Theta(field="Quantidade", type="quantitative"),
+        color=alt.Color(field="Categoria", type="nominal", scale=color_scale),
+        tooltip=['Categoria', 'Quantidade']
+    ).properties(
+        title=title,
+        height=300,
+        width=300
+    )
+
+    return chart
+
+def criar_grafico_dispersao(df, x_col, y_col, color_col, title, color="#FF5722",
+                            limite=LIMITE_PONTOS_DISPERSAO):
+    """Cria gráfico de dispersão.
+
+    Com mais de `limite` pontos, desenha uma amostra estratificada por
+    color_col que preserva os outliers, e o título informa o total original.
+    """
+    if x_col not in df.columns or y_col not in df.columns:
+        return None
+
+    colunas = [x_col, y_col] + ([color_col] if color_col in df.columns else [])
+    pontos = df[colunas].dropna(subset=[x_col, y_col])
+    if len(pontos) > limite:
+        total = len(pontos)
+        pontos = amostra_estratificada(pontos, [x_col, y_col], color_col, limite)
+        title = f"{title} (amostra de {len(pontos):,} de {total:,} pontos)"
+
+    chart = alt.Chart(pontos).mark_circle(size=60).encode(
+        x=alt.X(f'{x_col}:Q', title=x_col),
+        y=alt.Y(f'{y_col}:Q', title=y_col),
+        color=alt.Color(f'{color_col}:N', title=color_col) if color_col in df.columns else alt.value(color),
+        tooltip=[x_col, y_col, color_col] if color_col in df.columns else [x_col, y_col]
+    ).properties(
+        title=title,
+        height=400
+    )
+
+    return chart
+
+def criar_histograma(df, col, title, bins=30, color="#9C27B0", faixa=None, pesos=None):
+    """Cria histograma com as faixas calculadas no servidor.
+
+    Só a tabela de faixas vai para o gráfico; faixa=(min, max) limita os
+    valores considerados e pesos nomeia uma coluna de quantidades, para
+    histogramas a partir de tabelas já agregadas.
+    """
+    if col not in df.columns:
+        return None
+
+    faixas = histograma(df[col], bins=bins, faixa=faixa,
+                        pesos=df[pesos] if pesos else None)
+    return criar_grafico_faixas(faixas, col, title, color=color)
+
+def criar_grafico_faixas(faixas, col, title, color="#9C27B0"):
+    """Cria o gráfico de barras de uma tabela de faixas de histograma."""
+    chart = alt.Chart(faixas).mark_bar(color=color).encode(
+        alt.X('inicio:Q', bin='binned', title=col),
+        alt.X2('fim:Q'),
+        alt.Y('quantidade:Q', title='Frequência'),
+        tooltip=[
+            alt.Tooltip('inicio:Q', title='De'),
+            alt.Tooltip('fim:Q', title='Até'),
+            alt.Tooltip('quantidade:Q', title='Frequência')
+        ]
+    ).properties(
+        title=title,
+        height=300
+    )
+
+    return chart
+
+def criar_grafico_ranking(tabela, x_col, y_col, titulo_x, titulo_y, color="#2196F3"):
+    """Cria barras horizontais ordenadas pelo valor, a partir de uma tabela agregada."""
+    chart = alt.Chart(tabela).mark_bar(color=color).encode(
+        x=alt.X(f'{x_col}:Q', title=titulo_x),
+        y=alt.Y(f'{y_col}:N', sort='-x', title=titulo_y),
+        tooltip=[y_col, x_col]
+    ).properties(
+        height=400
+    )
+
+    return chart
+
+def criar_grafico_colunas(tabela, x_col, y_col, titulo_x, titulo_y, color="#4CAF50"):
+    """Cria barras verticais a partir de uma tabela agregada."""
+    chart = alt.Chart(tabela).mark_bar(color=color).encode(
+        x=alt.X(f'{x_col}:N', title=titulo_x, axis=alt.Axis(labelAngle=45)),
+        y=alt.Y(f'{y_col}:Q', title=titulo_y),
+        tooltip=[x_col, y_col]
+    ).properties(
+        height=300
+    )
+
+    return chart
+
+def criar_grafico_categorias(tabela, col, titulo_x, dominio, cores, title=None,
+                             legenda=True, angulo_rotulo=None):
+    """Cria barras de contagem com uma cor fixa por categoria."""
+    eixo = alt.Axis(labelAngle=angulo_rotulo) if angulo_rotulo is not None else alt.Undefined
+    chart = alt.Chart(tabela).mark_bar().encode(
+        x=alt.X(f'{col}:N', title=titulo_x, axis=eixo),
+        y=alt.Y('Quantidade:Q', title='Quantidade de Tarefas'),
+        color=alt.Color(
+            f'{col}:N',
+            scale=alt.Scale(domain=list(dominio), range=list(cores)),
+            legend=alt.Undefined if legenda else None
+        ),
+        tooltip=[col, 'Quantidade']
+    ).properties(
+        height=300
+    )
+    if title:
+        chart = chart.properties(title=title)
+
+    return chart
+
+def criar_grafico_rosca(tabela, col, dominio, cores):
+    """Cria rosca de contagens com uma cor fixa por categoria."""
+    chart = alt.Chart(tabela).mark_arc(innerRadius=50).encode(
+        theta='Quantidade:Q',
+        color=alt.Color(f'{col}:N', scale=alt.Scale(domain=list(dominio), range=list(cores))),
+        tooltip=[col, 'Quantidade']
+    ).properties(
+        height=300,
+        width=300
+    )
+
+    return chart
+
+# -------------------------------------------------
+# Cache de especificações
+# -------------------------------------------------
+def impressao_digital(tabela) -> str:
+    """Hash do conteúdo, das colunas e dos tipos de uma tabela ou série."""
+    colunas = list(tabela.columns) if isinstance(tabela, pd.DataFrame) else [tabela.name]
+    tipos = list(tabela.dtypes) if isinstance(tabela, pd.DataFrame) else [tabela.dtype]
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((colunas, [str(t) for t in tipos])).encode())
+    h.update(pd.util.hash_pandas_object(tabela, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+def _congelar(valor):
+    """Listas viram tuplas, para os parâmetros entrarem na chave do cache."""
+    if isinstance(valor, (list, tuple)):
+        return tuple(_congelar(v) for v in valor)
+    return valor
+
+class CacheGraficos:
+    """Cache LRU de especificações Vega-Lite prontas, limitado em entradas.
+
+    Pode ser compartilhado entre sessões: as especificações não são alteradas
+    depois de guardadas e o acesso é protegido por uma trava.
+    """
+
+    _AUSENTE = object()
+
+    def __init__(self, max_entradas: int = None):
+        self.max_entradas = max_entradas or MAX_GRAFICOS_EM_CACHE
+        self.acertos = 0
+        self.faltas = 0
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+
+    def obter(self, construtor, tabela, **parametros) -> dict:
+        """Especificação de construtor(tabela, **parametros), construída só na falta.
+
+        Retorna None quando o construtor não gera gráfico.
+        """
+        chave = (
+            construtor.__name__,
+            impressao_digital(tabela),
+            tuple(sorted((nome, _congelar(v)) for nome, v in parametros.items())),
+        )
+        with self._trava:
+            spec = self._itens.get(chave, self._AUSENTE)
+            if spec is not self._AUSENTE:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return spec
+            self.faltas += 1
+
+        grafico = construtor(tabela, **parametros)
+        if grafico is None:
+            spec = None
+        else:
+            # tabelas agregadas podem passar do limite padrão de linhas do Altair
+            with alt.data_transformers.disable_max_rows():
+                spec = grafico.to_dict()
+
+        with self._trava:
+            self._itens[chave] = spec
+            while len(self._itens) > self.max_entradas:
+                self._itens.popitem(last=False)
+        return spec
+
+    def estatisticas(self) -> dict:
+        """Acertos, faltas e ocupação do cache."""
+        with self._trava:
+            return {
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'entradas': len(self._itens),
+                'max_entradas': self.max_entradas,
+            }
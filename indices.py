@@ -0,0 +1,347 @@
+"""Índices construídos uma vez por dataset para responder filtros sem varreduras."""
+import re
+import sys
+import unicodedata
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from pipeline import COLUNAS_DATA
+
+# Colunas com filtro na barra lateral (as dimensões do cubo da visão geral)
+COLUNAS_FILTRO = ['Cliente', 'Tipo_Tarefa', 'Prioridade', 'Equipe']
+
+# Colunas de texto livre pesquisáveis na tabela de dados
+COLUNAS_BUSCA = ['Titulo_Tarefa', 'Tarefa']
+
+# Tokens são sequências de letras, dígitos e '_' (o \w do Python); a
+# normalização remove acentos (marcas Mn após a decomposição NFKD)
+_TOKEN = re.compile(r'\w+')
+_SEPARADOR = r'[^\p{L}\p{N}_]+'
+
+class IndiceFiltros:
+    """Posições das linhas agrupadas por valor de cada coluna de filtro.
+
+    Para cada coluna guarda os códigos das categorias e as posições das
+    linhas ordenadas por código, de modo que as linhas de um valor formam
+    uma fatia contígua e já ordenada. Uma combinação de filtros parte da
+    fatia mais seletiva e descarta as linhas cujos códigos não batem com os
+    demais filtros, sem copiar nem mascarar o DataFrame inteiro.
+    """
+
+    def __init__(self, df: pd.DataFrame, colunas: list = None):
+        self.total = len(df)
+        self._codigos = {}
+        self._categorias = {}
+        self._ordem = {}
+        self._inicio = {}
+        for col in colunas or COLUNAS_FILTRO:
+            if col not in df.columns:
+                continue
+            serie = df[col]
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                codigos = serie.cat.codes.to_numpy()
+                categorias = serie.cat.categories
+            else:
+                codigos, categorias = pd.factorize(serie)
+            ordem = np.argsort(codigos, kind='stable')
+            contagem = np.bincount(codigos[codigos >= 0], minlength=len(categorias))
+            # linhas sem valor (código -1) ficam antes da primeira categoria
+            inicio = np.concatenate(([0], np.cumsum(contagem))) + int((codigos < 0).sum())
+
+            self._codigos[col] = codigos
+            self._categorias[col] = pd.Index(categorias)
+            self._ordem[col] = ordem
+            self._inicio[col] = inicio
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelo índice, sem contar o DataFrame."""
+        arrays = [*self._codigos.values(), *self._ordem.values(), *self._inicio.values()]
+        return (sum(a.nbytes for a in arrays)
+                + sum(c.memory_usage(deep=True) for c in self._categorias.values()))
+
+    def _codigo(self, col: str, valor) -> int:
+        categorias = self._categorias[col]
+        return categorias.get_loc(valor) if valor in categorias else -1
+
+    def _codigos_dos_valores(self, col: str, valores: list) -> np.ndarray:
+        codigos = {self._codigo(col, valor) for valor in valores}
+        return np.array(sorted(codigos - {-1}), dtype=np.intp)
+
+    def linhas_do_valor(self, col: str, valor) -> np.ndarray:
+        """Posições, em ordem crescente, das linhas com col == valor."""
+        codigo = self._codigo(col, valor)
+        if codigo < 0:
+            return np.empty(0, dtype=np.intp)
+        inicio = self._inicio[col]
+        return self._ordem[col][inicio[codigo]:inicio[codigo + 1]]
+
+    def linhas_dos_valores(self, col: str, valores: list) -> np.ndarray:
+        """Posições, em ordem crescente, das linhas com col em valores."""
+        fatias = [self.linhas_do_valor(col, valor) for valor in dict.fromkeys(valores)]
+        if len(fatias) == 1:
+            return fatias[0]
+        # fatias de valores distintos não se sobrepõem: basta juntar e ordenar
+        return np.sort(np.concatenate(fatias)) if fatias else np.empty(0, dtype=np.intp)
+
+    def posicoes(self, filtros: dict) -> np.ndarray:
+        """Posições das linhas que atendem a todos os filtros.
+
+        filtros é {coluna: valor} ou {coluna: [valores]}, com os valores de
+        uma coluna combinados por "ou". Retorna None quando não há filtro
+        ativo, indicando todas as linhas.
+        """
+        ativos = {
+            col: list(valor) if isinstance(valor, (list, tuple, set)) else [valor]
+            for col, valor in filtros.items() if col in self._codigos
+        }
+        if not ativos:
+            return None
+
+        fatias = {col: self.linhas_dos_valores(col, valores) for col, valores in ativos.items()}
+        base = min(fatias, key=lambda col: len(fatias[col]))
+        linhas = fatias[base]
+        for col, valores in ativos.items():
+            if col != base and len(linhas):
+                codigos = self._codigos_dos_valores(col, valores)
+                if len(codigos) == 1:
+                    linhas = linhas[self._codigos[col][linhas] == codigos[0]]
+                else:
+                    linhas = linhas[np.isin(self._codigos[col][linhas], codigos)]
+        return linhas
+
+class IndiceDatas:
+    """Posições das linhas em ordem de data, para os filtros de período.
+
+    Para cada coluna guarda as datas não nulas em ordem crescente e as
+    posições das linhas na mesma ordem. Um período vira uma fatia achada
+    por busca binária: só as posições dentro dela são lidas e ordenadas,
+    sem comparar a coluna inteira.
+    """
+
+    def __init__(self, df: pd.DataFrame, colunas: list = None):
+        self.total = len(df)
+        self._datas = {}
+        self._ordem = {}
+        for col in colunas or COLUNAS_DATA:
+            if col not in df.columns or not pd.api.types.is_datetime64_any_dtype(df[col]):
+                continue
+            datas = df[col].to_numpy()
+            presentes = np.flatnonzero(~np.isnat(datas))
+            ordem = presentes[np.argsort(datas[presentes], kind='stable')]
+            self._datas[col] = datas[ordem]
+            self._ordem[col] = ordem
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelo índice, sem contar o DataFrame."""
+        return sum(a.nbytes for a in [*self._datas.values(), *self._ordem.values()])
+
+    @property
+    def colunas(self) -> list:
+        return list(self._datas)
+
+    def faixa(self, col: str) -> tuple:
+        """Datas mínima e máxima da coluna, ou (None, None) se não houver."""
+        datas = self._datas.get(col)
+        if datas is None or not len(datas):
+            return None, None
+        return pd.Timestamp(datas[0]), pd.Timestamp(datas[-1])
+
+    def linhas(self, col: str, inicio=None, fim=None) -> np.ndarray:
+        """Posições, em ordem crescente, das linhas com data no período.
+
+        inicio e fim são dias, ambos incluídos; None deixa o lado em aberto.
+        Linhas sem data nunca entram.
+        """
+        datas = self._datas[col]
+        primeiro, ultimo = 0, len(datas)
+        if inicio is not None:
+            limite = pd.Timestamp(inicio).normalize().to_datetime64().astype(datas.dtype)
+            primeiro = np.searchsorted(datas, limite, side='left')
+        if fim is not None:
+            limite = (pd.Timestamp(fim).normalize() + pd.Timedelta(days=1)).to_datetime64().astype(datas.dtype)
+            ultimo = np.searchsorted(datas, limite, side='left')
+        return np.sort(self._ordem[col][primeiro:max(ultimo, primeiro)])
+
+    def posicoes(self, datas: dict) -> np.ndarray:
+        """Posições das linhas em todos os períodos {coluna: (inicio, fim)}.
+
+        Retorna None quando não há período ativo, indicando todas as linhas.
+        """
+        linhas = None
+        for col, (inicio, fim) in datas.items():
+            if col in self._datas:
+                linhas = intersecao(linhas, self.linhas(col, inicio, fim))
+        return linhas
+
+class IndiceFacetas:
+    """Contagens de cada opção dos filtros sob os filtros das demais colunas.
+
+    Construído sobre uma tabela de tarefas por combinação de valores (o cubo
+    da camada ouro ou contar_combinacoes): guarda os códigos de cada coluna
+    por combinação e as tarefas de cada uma. Uma consulta marca as
+    combinações de cada filtro por tabela de consulta dos códigos e soma as
+    tarefas com bincount; o custo depende do número de combinações, não do
+    número de tarefas.
+    """
+
+    def __init__(self, combinacoes: pd.DataFrame, colunas: list = None):
+        self._tarefas = combinacoes['tarefas'].to_numpy(dtype='float64')
+        self._codigos = {}
+        self._categorias = {}
+        for col in colunas or COLUNAS_FILTRO:
+            if col not in combinacoes.columns:
+                continue
+            codigos, categorias = pd.factorize(combinacoes[col])
+            self._codigos[col] = codigos
+            self._categorias[col] = pd.Index(categorias)
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelo índice."""
+        return (self._tarefas.nbytes + sum(c.nbytes for c in self._codigos.values())
+                + sum(c.memory_usage(deep=True) for c in self._categorias.values()))
+
+    def _combinacoes(self, col: str, valores: list) -> np.ndarray:
+        """Máscara das combinações com col em valores."""
+        # posição extra, sempre False, para os códigos -1 (valores ausentes)
+        marcados = np.zeros(len(self._categorias[col]) + 1, dtype=bool)
+        posicoes = self._categorias[col].get_indexer(valores)
+        marcados[posicoes[posicoes >= 0]] = True
+        return marcados[self._codigos[col]]
+
+    def contagens(self, filtros: dict) -> dict:
+        """{coluna: Series de tarefas por valor}, só com valores que têm tarefas.
+
+        A contagem de cada valor é o total que ele daria se escolhido,
+        mantidos os filtros das outras colunas (os da própria são ignorados).
+        """
+        mascaras = {
+            col: self._combinacoes(col, list(valor) if isinstance(valor, (list, tuple, set)) else [valor])
+            for col, valor in filtros.items() if col in self._codigos
+        }
+        facetas = {}
+        for col, codigos in self._codigos.items():
+            selecionadas = codigos >= 0
+            for outra, mascara in mascaras.items():
+                if outra != col:
+                    selecionadas &= mascara
+            soma = np.bincount(codigos[selecionadas], weights=self._tarefas[selecionadas],
+                               minlength=len(self._categorias[col]))
+            serie = pd.Series(soma.astype(np.int64), index=self._categorias[col])
+            facetas[col] = serie[serie > 0]
+        return facetas
+
+def _normalizar(texto: str) -> str:
+    """Minúsculas e sem acentos, para a busca ignorar grafia."""
+    decomposto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in decomposto if unicodedata.category(c) != 'Mn')
+
+def intersecao(linhas_a: np.ndarray, linhas_b: np.ndarray) -> np.ndarray:
+    """Interseção de posições ordenadas; None representa todas as linhas."""
+    if linhas_a is None:
+        return linhas_b
+    if linhas_b is None:
+        return linhas_a
+    return np.intersect1d(linhas_a, linhas_b, assume_unique=True)
+
+class IndiceTexto:
+    """Índice invertido dos tokens das colunas de texto livre.
+
+    Para cada coluna guarda os tokens distintos em ordem alfabética e, em
+    fatias contíguas, os valores distintos da coluna que contêm cada token.
+    Os tokens com um prefixo formam um intervalo, achado por busca binária;
+    as linhas saem dos códigos da coluna, sem reprocessar texto.
+    """
+
+    def __init__(self, df: pd.DataFrame, colunas: list = None):
+        self.total = len(df)
+        self._colunas = {}
+        self.nbytes = 0
+        for col in colunas or COLUNAS_BUSCA:
+            if col not in df.columns:
+                continue
+            codigos, valores = pd.factorize(df[col])
+            texto = pa.array(pd.Series(valores, dtype=object).astype(str), type=pa.large_string())
+            texto = pc.replace_substring_regex(
+                pc.utf8_normalize(pc.utf8_lower(texto), 'NFKD'), r'\p{Mn}', ''
+            )
+            listas = pc.split_pattern_regex(texto, _SEPARADOR)
+            tokens = pc.list_flatten(listas)
+            valor_do_token = pc.list_parent_indices(listas).to_numpy()
+
+            # tokens em ordem alfabética; os valores de cada token ficam contíguos
+            dicionario = pc.dictionary_encode(tokens)
+            distintos = dicionario.dictionary
+            ordem_alfabetica = pc.array_sort_indices(distintos).to_numpy()
+            posto = np.empty(len(distintos), dtype=np.int64)
+            posto[ordem_alfabetica] = np.arange(len(distintos))
+            posto_token = posto[dicionario.indices.to_numpy()]
+            ordem = np.argsort(posto_token, kind='stable')
+            inicio = np.concatenate(([0], np.cumsum(np.bincount(posto_token, minlength=len(distintos)))))
+
+            ordenados = np.asarray(distintos.take(ordem_alfabetica).to_pylist(), dtype=object)
+            valores_do_token = valor_do_token[ordem]
+            self._colunas[col] = (codigos, len(valores), ordenados, inicio, valores_do_token)
+            # memória ocupada, sem o DataFrame; os tokens são objetos str
+            self.nbytes += (codigos.nbytes + ordenados.nbytes + sum(map(sys.getsizeof, ordenados))
+                            + inicio.nbytes + valores_do_token.nbytes)
+
+    def _mascara_do_termo(self, termo: str) -> np.ndarray:
+        """Linhas com algum token iniciado por termo, em qualquer coluna."""
+        linhas = np.zeros(self.total, dtype=bool)
+        for codigos, n_valores, tokens, inicio, valores in self._colunas.values():
+            primeiro, ultimo = np.searchsorted(tokens, [termo, termo + '\U0010ffff'])
+            # posição extra, sempre False, para os códigos -1 (valores ausentes)
+            marcados = np.zeros(n_valores + 1, dtype=bool)
+            marcados[valores[inicio[primeiro]:inicio[ultimo]]] = True
+            linhas |= marcados[codigos]
+        return linhas
+
+    def buscar(self, consulta: str) -> np.ndarray:
+        """Posições das linhas que contêm todos os termos da consulta.
+
+        Cada termo casa com tokens que começam por ele; retorna None para
+        consulta vazia, indicando todas as linhas.
+        """
+        termos = _TOKEN.findall(_normalizar(consulta or ''))
+        if not termos:
+            return None
+        linhas = np.ones(self.total, dtype=bool)
+        for termo in termos:
+            linhas &= self._mascara_do_termo(termo)
+        return np.flatnonzero(linhas)
+
+class IndiceOrdenacao:
+    """Permutações de ordenação por coluna, calculadas sob demanda e reaproveitadas."""
+
+    def __init__(self, df: pd.DataFrame):
+        self._df = df
+        self._permutacoes = {}
+
+    @property
+    def nbytes(self) -> int:
+        """Memória das permutações já calculadas, sem contar o DataFrame."""
+        return sum(p.nbytes for p in self._permutacoes.values())
+
+    def _permutacao(self, coluna: str, crescente: bool) -> np.ndarray:
+        chave = (coluna, crescente)
+        if chave not in self._permutacoes:
+            serie = self._df[coluna].reset_index(drop=True)
+            self._permutacoes[chave] = serie.sort_values(
+                ascending=crescente, kind='stable', na_position='last'
+            ).index.to_numpy()
+        return self._permutacoes[chave]
+
+    def ordenar(self, coluna: str, crescente: bool = True, linhas: np.ndarray = None) -> np.ndarray:
+        """Posições das linhas (todas, se None) na ordem da coluna."""
+        permutacao = self._permutacao(coluna, crescente)
+        if linhas is None:
+            return permutacao
+        selecionadas = np.zeros(len(permutacao), dtype=bool)
+        selecionadas[linhas] = True
+        return permutacao[selecionadas[permutacao]]
@@ -0,0 +1,222 @@
+"""Processamento em lote, sem interface: relatórios ouro de muitas exportações.
+
+Uso:
+
+    python lote.py <diretorio_exportacoes> <diretorio_saida> [--processos N]
+                   [--formato json|parquet|ambos] [--reprocessar]
+
+Cada arquivo CSV/XLSX do diretório passa por preparar_dados,
+adicionar_colunas_analise, calcular_metricas e calcular_agregados em um
+processo do pool, e gera um relatório ouro próprio:
+
+    <saida>/<arquivo>.json                       métricas e agregados por dimensão
+    <saida>/<arquivo>/<versao>/ouro_*.parquet    mesma camada ouro do dashboard
+    <saida>/consolidado.json                     métricas de todas as exportações
+
+<arquivo> é o nome com extensão, para que relatorio.csv e relatorio.xlsx
+não se sobrescrevam.
+
+O relatório JSON guarda o hash do conteúdo e a versão do pipeline; sem
+--reprocessar, exportações que não mudaram desde a última execução são
+puladas. O relatório guarda também o AcumuladorMetricas da exportação;
+o consolidado mescla os acumuladores, com quantis aproximados, sem juntar
+as tarefas de todos os arquivos.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import medalhao
+from pipeline import (
+    DIMENSOES_OURO,
+    AcumuladorMetricas,
+    adicionar_colunas_analise,
+    calcular_agregados,
+    calcular_metricas,
+    carregar_csv_em_blocos,
+    hash_conteudo,
+    load_uploaded_file,
+    preparar_dados,
+    usar_ingestao_em_blocos,
+    versao_pipeline,
+)
+
+# Extensões aceitas, as mesmas do upload do dashboard
+EXTENSOES = ('.csv', '.xlsx')
+
+FORMATOS = ('json', 'parquet', 'ambos')
+
+def listar_exportacoes(diretorio) -> list:
+    """Arquivos CSV/XLSX do diretório, dos maiores para os menores.
+
+    Os maiores vão primeiro para o pool, para que nenhum deles fique
+    sozinho no fim da execução.
+    """
+    arquivos = [
+        caminho for caminho in Path(diretorio).iterdir()
+        if caminho.is_file() and caminho.suffix.lower() in EXTENSOES
+    ]
+    return sorted(arquivos, key=lambda caminho: caminho.stat().st_size, reverse=True)
+
+def _valor_json(valor):
+    """Escalar numpy/pandas como tipo nativo; NaN e NaT viram None."""
+    if hasattr(valor, 'item'):
+        valor = valor.item()
+    if valor is None or (isinstance(valor, float) and np.isnan(valor)):
+        return None
+    return valor
+
+def _registros(tabela: pd.DataFrame) -> list:
+    """Linhas da tabela como dicionários serializáveis em JSON."""
+    return json.loads(tabela.to_json(orient='records', date_format='iso', double_precision=15))
+
+def relatorio_ouro(metricas: dict, agregados: dict) -> dict:
+    """Métricas gerais e agregados por Cliente, Tipo_Tarefa e Equipe, em JSON."""
+    return {
+        'metricas': {nome: _valor_json(valor) for nome, valor in metricas.items()},
+        'agregados': {
+            dim: _registros(agregados[dim]) for dim in DIMENSOES_OURO if dim in agregados
+        },
+    }
+
+def _ler_relatorio(caminho: Path) -> dict:
+    try:
+        with open(caminho, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+def _gravar_json(relatorio: dict, caminho: Path) -> None:
+    """Grava em arquivo temporário e renomeia, como em medalhao."""
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_name(f"{caminho.name}.{os.getpid()}.tmp")
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(relatorio, arquivo, ensure_ascii=False, indent=1)
+    os.replace(temporario, caminho)
+
+def processar_exportacao(caminho, saida, formato: str = 'ambos', reprocessar: bool = False) -> dict:
+    """Gera o relatório ouro de uma exportação e retorna um resumo da execução.
+
+    Roda dentro de um processo do pool; erros de leitura viram o campo
+    'erro' do resumo, para não interromper o lote.
+    """
+    caminho, saida = Path(caminho), Path(saida)
+    inicio = time.perf_counter()
+    resumo = {'arquivo': caminho.name, 'status': 'processado', 'linhas': None}
+    try:
+        conteudo = caminho.read_bytes()
+        chave = hash_conteudo(conteudo)
+        versao = versao_pipeline()
+        destino_json = saida / f'{caminho.name}.json'
+
+        anterior = _ler_relatorio(destino_json) if not reprocessar else None
+        if (
+            anterior and anterior.get('chave') == chave and anterior.get('versao') == versao
+            and 'acumulador' in anterior
+        ):
+            resumo['status'] = 'sem_alteracao'
+            resumo['linhas'] = anterior['metricas'].get('total_tarefas')
+            resumo['acumulador'] = AcumuladorMetricas.de_dict(anterior['acumulador'])
+            return resumo
+
+        arquivo = io.BytesIO(conteudo)
+        arquivo.name = caminho.name
+        del conteudo
+        acumulador = AcumuladorMetricas()
+        if usar_ingestao_em_blocos(caminho.name, caminho.stat().st_size):
+            df = carregar_csv_em_blocos(arquivo, acumulador=acumulador)
+        else:
+            df = adicionar_colunas_analise(preparar_dados(load_uploaded_file(arquivo)), copiar=False)
+            acumulador.atualizar(df)
+
+        metricas = calcular_metricas(df)
+        agregados = calcular_agregados(df)
+        resumo['linhas'] = len(df)
+        resumo['acumulador'] = acumulador
+        del df
+
+        if formato in ('parquet', 'ambos'):
+            medalhao.salvar_ouro(caminho.name, versao, metricas, agregados, diretorio=saida)
+        if formato in ('json', 'ambos'):
+            relatorio = {'arquivo': caminho.name, 'chave': chave, 'versao': versao}
+            relatorio.update(relatorio_ouro(metricas, agregados))
+            relatorio['acumulador'] = acumulador.para_dict()
+            _gravar_json(relatorio, destino_json)
+    except Exception as erro:
+        resumo['status'] = 'erro'
+        resumo['erro'] = f'{type(erro).__name__}: {erro}'
+    finally:
+        resumo['segundos'] = round(time.perf_counter() - inicio, 3)
+    return resumo
+
+def processar_diretorio(diretorio, saida, processos: int = None, formato: str = 'ambos',
+                        reprocessar: bool = False, ao_concluir=None) -> list:
+    """Processa todas as exportações do diretório em um pool de processos.
+
+    processos=None usa todos os núcleos. ao_concluir(resumo), se dado, é
+    chamado a cada arquivo concluído, na ordem de término. As métricas das
+    exportações sem erro são mescladas em <saida>/consolidado.json.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconhecido: {formato}")
+    arquivos = listar_exportacoes(diretorio)
+    Path(saida).mkdir(parents=True, exist_ok=True)
+    resumos = []
+    if not arquivos:
+        return resumos
+    consolidado = AcumuladorMetricas()
+
+    processos = min(processos or os.cpu_count() or 1, len(arquivos))
+    with ProcessPoolExecutor(max_workers=processos) as pool:
+        tarefas = [
+            pool.submit(processar_exportacao, caminho, saida, formato, reprocessar)
+            for caminho in arquivos
+        ]
+        for tarefa in as_completed(tarefas):
+            resumo = tarefa.result()
+            acumulador = resumo.pop('acumulador', None)
+            if acumulador is not None:
+                consolidado.mesclar(acumulador)
+            resumos.append(resumo)
+            if ao_concluir:
+                ao_concluir(resumo)
+
+    _gravar_json({
+        'arquivos': sum(resumo['status'] != 'erro' for resumo in resumos),
+        'metricas': {nome: _valor_json(valor) for nome, valor in consolidado.metricas().items()},
+    }, Path(saida) / 'consolidado.json')
+    return sorted(resumos, key=lambda resumo: resumo['arquivo'])
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Gera relatórios ouro de um diretório de exportações.")
+    parser.add_argument('diretorio', help="diretório com as exportações CSV/XLSX")
+    parser.add_argument('saida', help="diretório dos relatórios")
+    parser.add_argument('--processos', type=int, default=None,
+                        help="processos em paralelo (padrão: todos os núcleos)")
+    parser.add_argument('--formato', choices=FORMATOS, default='ambos')
+    parser.add_argument('--reprocessar', action='store_true',
+                        help="refaz também as exportações que não mudaram")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+
+    def mostrar(resumo):
+        detalhe = resumo.get('erro') or f"{resumo['linhas'] or 0:,} linhas"
+        print(f"[{resumo['status']}] {resumo['arquivo']}: {detalhe} ({resumo['segundos']:.1f}s)", flush=True)
+
+    resumos = processar_diretorio(args.diretorio, args.saida, args.processos,
+                                  args.formato, args.reprocessar, mostrar)
+    erros = sum(resumo['status'] == 'erro' for resumo in resumos)
+    print(f"{len(resumos)} arquivos em {time.perf_counter() - inicio:.1f}s, {erros} com erro")
+    return 1 if erros else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Armazenamento local das camadas Bronze, Prata e Ouro em Parquet.
+
+Cada dataset fica em um diretório nomeado pelo hash do arquivo enviado:
+
+    <DIRETORIO_DADOS>/<chave>/bronze.parquet
+    <DIRETORIO_DADOS>/<chave>/<versao>/prata.parquet
+    <DIRETORIO_DADOS>/<chave>/<versao>/hashes.parquet
+    <DIRETORIO_DADOS>/<chave>/<versao>/ouro_<nome>.parquet
+    <DIRETORIO_DADOS>/<chave>/<versao>/prata_particionada/   (ver consulta.py)
+
+A camada bronze depende só do conteúdo enviado; prata e ouro dependem
+também da versão do pipeline de preparo. Os hashes por tarefa permitem
+preparar a próxima exportação de forma incremental a partir desta prata.
+"""
+import os
+from pathlib import Path
+
+import pandas as pd
+
+DIRETORIO_DADOS = Path(os.environ.get('DASHBOARD_DADOS_DIR', '.dados'))
+
+def _diretorio(chave: str, versao: str = None, diretorio: Path = None) -> Path:
+    caminho = Path(diretorio or DIRETORIO_DADOS) / chave
+    return caminho / versao if versao else caminho
+
+def _para_parquet(df: pd.DataFrame) -> pd.DataFrame:
+    """Converte colunas object com tipos misturados para texto."""
+    mistas = [
+        col for col in df.columns
+        if df[col].dtype == object
+        and pd.api.types.infer_dtype(df[col], skipna=True) not in ('string', 'empty', 'boolean')
+    ]
+    if not mistas:
+        return df
+    df = df.copy()
+    for col in mistas:
+        df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+def _gravar(df: pd.DataFrame, caminho: Path) -> None:
+    """Grava em arquivo temporário e renomeia, para nunca expor Parquet parcial."""
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_name(f"{caminho.name}.{os.getpid()}.tmp")
+    _para_parquet(df).to_parquet(temporario, index=False)
+    os.replace(temporario, caminho)
+
+def _ler(caminho: Path) -> pd.DataFrame:
+    if not caminho.exists():
+        return None
+    return pd.read_parquet(caminho)
+
+def salvar_bronze(chave: str, df: pd.DataFrame, diretorio: Path = None) -> None:
+    """Grava o arquivo enviado, como lido, na camada bronze."""
+    _gravar(df, _diretorio(chave, diretorio=diretorio) / 'bronze.parquet')
+
+def ler_bronze(chave: str, diretorio: Path = None) -> pd.DataFrame:
+    """Lê a camada bronze; retorna None se ainda não existir."""
+    return _ler(_diretorio(chave, diretorio=diretorio) / 'bronze.parquet')
+
+def salvar_prata(chave: str, versao: str, df: pd.DataFrame, diretorio: Path = None) -> None:
+    """Grava os dados tratados e com colunas de análise na camada prata."""
+    _gravar(df, _diretorio(chave, versao, diretorio) / 'prata.parquet')
+
+def ler_prata(chave: str, versao: str, diretorio: Path = None) -> pd.DataFrame:
+    """Lê a camada prata; retorna None se ainda não existir."""
+    return _ler(_diretorio(chave, versao, diretorio) / 'prata.parquet')
+
+def caminho_particionado(chave: str, versao: str, diretorio: Path = None) -> Path:
+    """Diretório da prata particionada, gravada e lida por consulta.py."""
+    return _diretorio(chave, versao, diretorio) / 'prata_particionada'
+
+def salvar_hashes(chave: str, versao: str, hashes: pd.DataFrame, diretorio: Path = None) -> None:
+    """Grava o ID e o hash de cada linha da exportação, na ordem da prata."""
+    _gravar(hashes, _diretorio(chave, versao, diretorio) / 'hashes.parquet')
+
+def ler_hashes(chave: str, versao: str, diretorio: Path = None) -> pd.DataFrame:
+    """Lê os hashes por tarefa; retorna None se não existirem."""
+    return _ler(_diretorio(chave, versao, diretorio) / 'hashes.parquet')
+
+def ultimo_com_hashes(versao: str, exceto: str = None, diretorio: Path = None) -> str:
+    """Chave do dataset da versão com prata e hashes gravados mais recentemente."""
+    candidatos = [
+        caminho for caminho in Path(diretorio or DIRETORIO_DADOS).glob(f'*/{versao}/hashes.parquet')
+        if caminho.parent.parent.name != exceto and (caminho.parent / 'prata.parquet').exists()
+    ]
+    if not candidatos:
+        return None
+    return max(candidatos, key=lambda caminho: caminho.stat().st_mtime).parent.parent.name
+
+def salvar_ouro(chave: str, versao: str, metricas: dict, agregados: dict,
+                diretorio: Path = None) -> None:
+    """Grava as métricas gerais e os agregados por dimensão na camada ouro."""
+    destino = _diretorio(chave, versao, diretorio)
+    for nome, tabela in agregados.items():
+        _gravar(tabela, destino / f'ouro_{nome}.parquet')
+    linha = {k: (v.item() if hasattr(v, 'item') else v) for k, v in metricas.items()}
+    # métricas por último: a presença do arquivo indica camada ouro completa
+    _gravar(pd.DataFrame([linha]), destino / 'ouro_metricas.parquet')
+
+def ler_ouro(chave: str, versao: str, diretorio: Path = None):
+    """Lê a camada ouro como (metricas, agregados); retorna None se não existir."""
+    destino = _diretorio(chave, versao, diretorio)
+    tabela = _ler(destino / 'ouro_metricas.parquet')
+    if tabela is None:
+        return None
+    metricas = {
+        k: (v.item() if hasattr(v, 'item') else v)
+        for k, v in tabela.to_dict('records')[0].items()
+    }
+    agregados = {
+        caminho.stem[len('ouro_'):]: pd.read_parquet(caminho)
+        for caminho in destino.glob('ouro_*.parquet')
+        if caminho.name != 'ouro_metricas.parquet'
+    }
+    return metricas, agregados
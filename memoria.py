@@ -0,0 +1,142 @@
+"""Datasets preparados em memória, compartilhados entre sessões e limitados em bytes.
+
+Analistas que enviam a mesma exportação recebem o mesmo DataFrame: a chave
+é o hash do conteúdo (mais a versão do pipeline), não a sessão nem o nome
+do arquivo. O total guardado respeita um orçamento em bytes
+(DASHBOARD_MEMORIA_MB); ao passar dele, saem os datasets usados há mais
+tempo.
+
+Cada pedido recebe uma cópia rasa do DataFrame guardado. Com o
+Copy-on-Write do pandas, ela não copia dados, e qualquer escrita de uma
+sessão copia só a coluna alterada, sem nunca mudar o DataFrame
+compartilhado.
+
+Os índices construídos sobre um dataset (filtros, datas, busca, ordenação)
+ficam guardados junto com ele: contam no mesmo orçamento e saem no mesmo
+despejo.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Orçamento, em MB, dos datasets preparados guardados pelo processo
+ORCAMENTO_MB = float(os.environ.get('DASHBOARD_MEMORIA_MB', '2048'))
+
+# Máximo de objetos derivados guardados por dataset (índices de cada período)
+MAX_DERIVADOS = 16
+
+def tamanho_em_bytes(objeto) -> int:
+    """Memória ocupada pelo DataFrame (com textos e categorias) ou pelo índice (nbytes)."""
+    if isinstance(objeto, pd.DataFrame):
+        return int(objeto.memory_usage(index=True, deep=True).sum())
+    return int(getattr(objeto, 'nbytes', 0))
+
+class CacheDatasets:
+    """Cache LRU de datasets preparados, limitado pelo total de bytes.
+
+    Pedidos simultâneos da mesma chave esperam uma única preparação em vez
+    de repeti-la. Objetos derivados (ver derivado) somam ao tamanho do
+    dataset e saem com ele. Um dataset maior que o orçamento sozinho fica
+    guardado só, depois de despejar todos os outros.
+    """
+
+    def __init__(self, orcamento_bytes: int = None):
+        self.orcamento_bytes = orcamento_bytes or int(ORCAMENTO_MB * 1024 ** 2)
+        self.acertos = 0
+        self.faltas = 0
+        self.despejos = 0
+        self._itens = OrderedDict()
+        self._bytes = {}
+        self._derivados = {}
+        self._preparando = {}
+        self._trava = threading.Lock()
+
+    def obter(self, chave, preparar) -> pd.DataFrame:
+        """Dataset da chave; na falta, guarda o resultado de preparar()."""
+        while True:
+            with self._trava:
+                df = self._itens.get(chave)
+                if df is not None:
+                    self._itens.move_to_end(chave)
+                    self.acertos += 1
+                    return df.copy(deep=False)
+                espera = self._preparando.get(chave)
+                if espera is None:
+                    self._preparando[chave] = threading.Event()
+                    self.faltas += 1
+                    break
+            # outra sessão já está preparando a mesma chave
+            espera.wait()
+
+        try:
+            df = preparar()
+            self._guardar(chave, df)
+        finally:
+            with self._trava:
+                self._preparando.pop(chave).set()
+        return df.copy(deep=False)
+
+    def derivado(self, chave, nome, construir):
+        """Objeto derivado do dataset da chave; na falta, guarda construir().
+
+        O tamanho do objeto (tamanho_em_bytes) conta no orçamento do dataset,
+        medido a cada verificação, de modo que índices que crescem sob
+        demanda também contam. Se o dataset não estiver guardado, o objeto
+        é construído e devolvido sem guardar.
+        """
+        with self._trava:
+            derivados = self._derivados.get(chave)
+            if derivados is not None and nome in derivados:
+                derivados.move_to_end(nome)
+                return derivados[nome]
+        objeto = construir()
+        if derivados is None:
+            return objeto
+
+        with self._trava:
+            # o dataset pode ter sido despejado durante a construção
+            if self._derivados.get(chave) is not derivados:
+                return objeto
+            objeto = derivados.setdefault(nome, objeto)
+            while len(derivados) > MAX_DERIVADOS:
+                derivados.popitem(last=False)
+            self._despejar()
+        return objeto
+
+    def _guardar(self, chave, df: pd.DataFrame) -> None:
+        """Guarda o dataset e despeja os mais antigos até caber no orçamento."""
+        tamanho = tamanho_em_bytes(df)
+        with self._trava:
+            self._itens[chave] = df
+            self._bytes[chave] = tamanho
+            self._derivados[chave] = OrderedDict()
+            self._despejar()
+
+    def _ocupados(self) -> int:
+        """Bytes dos datasets e de seus derivados; chamado com a trava."""
+        return sum(
+            self._bytes[chave] + sum(tamanho_em_bytes(objeto) for objeto in self._derivados[chave].values())
+            for chave in self._itens
+        )
+
+    def _despejar(self) -> None:
+        """Despeja os datasets mais antigos até caber no orçamento; chamado com a trava."""
+        while len(self._itens) > 1 and self._ocupados() > self.orcamento_bytes:
+            antiga, _ = self._itens.popitem(last=False)
+            del self._bytes[antiga]
+            del self._derivados[antiga]
+            self.despejos += 1
+
+    def estatisticas(self) -> dict:
+        """Acertos, faltas, despejos e ocupação do cache."""
+        with self._trava:
+            return {
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'despejos': self.despejos,
+                'entradas': len(self._itens),
+                'bytes': self._ocupados(),
+                'orcamento_bytes': self.orcamento_bytes,
+            }
@@ -0,0 +1,166 @@
+"""Perfil de desempenho das execuções do dashboard: tempo e memória por etapa.
+
+Cada execução da página (completa ou só de um fragmento) gera registros
+por etapa: leitura, preparo, filtros, métricas, seções e gráficos. Com o
+perfil desligado, etapa() devolve um contexto nulo compartilhado e nada
+é medido nem guardado.
+
+    with etapa('metricas', linhas=len(df)) as registro:
+        ...
+        if registro is not None:
+            registro['bytes'] = ...
+
+O perfil ativo é por thread (cada sessão do Streamlit roda o script na
+sua própria thread), de modo que funções em cache medem na sessão que as
+executou. Os registros podem ser exportados como JSON lines, um por
+etapa, e gravados em DASHBOARD_PERFIL_ARQUIVO a cada execução encerrada.
+"""
+import contextlib
+import itertools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+# Liga o perfil por padrão nas novas sessões ('memoria' mede também o pico)
+MODO_PADRAO = os.environ.get('DASHBOARD_PERFIL', '').strip().lower()
+
+# Arquivo JSON lines onde cada execução encerrada é acrescentada
+ARQUIVO_PERFIL = os.environ.get('DASHBOARD_PERFIL_ARQUIVO') or None
+
+# Execuções mantidas por sessão para o painel de diagnóstico
+MAX_EXECUCOES = 20
+
+_NULO = contextlib.nullcontext()
+_local = threading.local()
+
+class Perfilador:
+    """Registros de tempo (e, com memoria, pico do tracemalloc) por etapa.
+
+    Etapas podem ser aninhadas e ficam na ordem em que começaram; o pico de
+    memória de uma etapa inclui o das etapas internas. O tracemalloc só fica
+    ligado durante as execuções com memoria=True, porque deixa o Python
+    sensivelmente mais lento.
+    """
+
+    def __init__(self, memoria: bool = False, arquivo: str = None,
+                 max_execucoes: int = MAX_EXECUCOES):
+        self.memoria = memoria
+        self.arquivo = arquivo
+        self.execucoes = deque(maxlen=max_execucoes)
+        self._execucao = None
+        self._pilha = []
+        self._iniciou_tracemalloc = False
+        self._ids = itertools.count(1)
+
+    @property
+    def aberta(self) -> bool:
+        return self._execucao is not None
+
+    def iniciar_execucao(self, tipo: str = 'completa') -> dict:
+        """Abre uma execução, encerrando a anterior se ficou aberta (st.stop)."""
+        if self.aberta:
+            self.encerrar_execucao()
+        self._execucao = {
+            'execucao': next(self._ids),
+            'tipo': tipo,
+            'momento': time.time(),
+            'registros': [],
+            '_inicio': time.perf_counter(),
+        }
+        if self.memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._iniciou_tracemalloc = True
+        return self._execucao
+
+    def encerrar_execucao(self) -> dict:
+        """Fecha a execução aberta, guarda e, se configurado, grava seus registros."""
+        execucao = self._execucao
+        if execucao is None:
+            return None
+        execucao['segundos'] = time.perf_counter() - execucao.pop('_inicio')
+        self._execucao = None
+        self._pilha.clear()
+        if self._iniciou_tracemalloc:
+            tracemalloc.stop()
+            self._iniciou_tracemalloc = False
+        self.execucoes.append(execucao)
+        if self.arquivo:
+            with open(self.arquivo, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(linhas_json([execucao]))
+        return execucao
+
+    @contextlib.contextmanager
+    def etapa(self, nome: str, **detalhes):
+        """Mede o bloco; o registro pode receber detalhes (bytes, linhas) dentro dele."""
+        if not self.aberta:
+            self.iniciar_execucao()
+        registro = {'etapa': nome, 'nivel': len(self._pilha), **detalhes}
+        medir_memoria = tracemalloc.is_tracing()
+        if medir_memoria:
+            # o pico até aqui pertence à etapa externa; a interna parte do zero
+            if self._pilha:
+                pai = self._pilha[-1]
+                pai['_pico'] = max(pai['_pico'], tracemalloc.get_traced_memory()[1])
+            registro['_base'] = tracemalloc.get_traced_memory()[0]
+            registro['_pico'] = 0
+            tracemalloc.reset_peak()
+        self._pilha.append(registro)
+        self._execucao['registros'].append(registro)
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            registro['segundos'] = time.perf_counter() - inicio
+            if self._pilha and self._pilha[-1] is registro:
+                self._pilha.pop()
+            if medir_memoria and tracemalloc.is_tracing():
+                pico = max(registro.pop('_pico'), tracemalloc.get_traced_memory()[1])
+                registro['pico_mb'] = max(pico - registro.pop('_base'), 0) / 1024 ** 2
+                if self._pilha:
+                    pai = self._pilha[-1]
+                    pai['_pico'] = max(pai['_pico'], pico)
+
+    def ultima_execucao(self, tipo: str = None) -> dict:
+        """Execução encerrada mais recente, opcionalmente de um tipo."""
+        for execucao in reversed(self.execucoes):
+            if tipo is None or execucao['tipo'] == tipo:
+                return execucao
+        return None
+
+def linhas_json(execucoes) -> str:
+    """Registros das execuções em JSON lines, um objeto por etapa."""
+    linhas = []
+    for execucao in execucoes:
+        contexto = {campo: execucao[campo] for campo in ('execucao', 'tipo', 'momento')}
+        for registro in execucao['registros']:
+            linhas.append(json.dumps({**contexto, **registro}, ensure_ascii=False, default=str))
+        linhas.append(json.dumps({**contexto, 'etapa': 'total', 'nivel': -1,
+                                  'segundos': execucao.get('segundos')}))
+    return ''.join(linha + '\n' for linha in linhas)
+
+def dominante(execucao: dict, prefixo: str = 'seção: ') -> dict:
+    """Registro de nível 0 mais demorado, entre os de nome com o prefixo."""
+    candidatos = [
+        r for r in execucao['registros'] if r['nivel'] == 0 and r['etapa'].startswith(prefixo)
+    ]
+    return max(candidatos, key=lambda r: r['segundos'], default=None)
+
+# -------------------------------------------------
+# Perfil ativo da thread
+# -------------------------------------------------
+def ativar(perfilador: Perfilador) -> None:
+    """Passa a registrar as etapas desta thread em perfilador (None desliga)."""
+    _local.perfilador = perfilador
+
+def atual() -> Perfilador:
+    return getattr(_local, 'perfilador', None)
+
+def etapa(nome: str, **detalhes):
+    """Contexto que mede o bloco no perfil ativo; nulo se não houver perfil."""
+    perfilador = getattr(_local, 'perfilador', None)
+    if perfilador is None:
+        return _NULO
+    return perfilador.etapa(nome, **detalhes)
@@ -0,0 +1,1213 @@
+"""Pipeline de dados do dashboard: leitura, preparo (prata) e métricas (ouro).
+
+Não depende do Streamlit, para poder ser usado também fora da interface.
+"""
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from datetime import date, datetime
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+from openpyxl import load_workbook
+
+from agregacao import SketchQuantis
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # opcional: sem ele o Excel é lido pelo openpyxl
+    CalamineWorkbook = None
+
+# -------------------------------------------------
+# Mapeamento de colunas
+# -------------------------------------------------
+COLUMN_MAPPING = {
+    'Quadro': 'Quadro',
+    'Cliente': 'Cliente',
+    'Grupo': 'Grupo',
+    'Projeto': 'Projeto',
+    'ID da tarefa principal': 'ID_Tarefa',
+    'Título da tarefa principal': 'Titulo_Tarefa',
+    'Tipo de tarefa': 'Tipo_Tarefa',
+    'Equipe': 'Equipe',
+    'Centro de custo': 'CC',
+    'Para': 'Para',
+    'ID da Tarefa': 'ID_Tarefa_Secundaria',
+    'Tarefa': 'Tarefa',
+    'Urgente': 'Urgente',
+    'Prioridade': 'Prioridade',
+    'Aberta por': 'Tarefa_Aberta',
+    'Criada em': 'Tarefa_Criada',
+    'Entrega desejada': 'Tarefa_Entrega_Desejada',
+    'Entrega estimada': 'Tarefa_Entrega_Estimada',
+    'Fechada em': 'Tarefa_Fechada',
+    'Esforço estimado h': 'Tarefa_Esforco_Estimado',
+    'Primeiro esforço estimado h': 'Tarefa_Esforco_Primeiro',
+    'Já registradas h': 'Tarefa_Esforco_Registradas',
+    'Já registradas em subtarefas': 'Tarefa_Esforco_Registradas_Sub',
+    '%': 'Tarefa_Esforco_Percentual',
+    'Etapa': 'Etapa',
+    'Fase': 'Fase',
+    'Reaberta?': 'Tarefa_Reaberta',
+    'Tags': 'Tags',
+    'Código customizado de cliente': 'Codigo_Cliente',
+    'Horas restantes h': 'Horas_Restantes'
+}
+
+# Versão da lógica de preparo: incrementar sempre que preparar_dados,
+# adicionar_colunas_analise ou as tabelas da camada ouro mudarem, para
+# invalidar os datasets em cache.
+VERSAO_PREPARO = 6
+
+# -------------------------------------------------
+# Esquema das colunas
+# -------------------------------------------------
+COLUNAS_DATA = [
+    'Tarefa_Criada',
+    'Tarefa_Entrega_Desejada',
+    'Tarefa_Entrega_Estimada',
+    'Tarefa_Fechada'
+]
+
+COLUNAS_NUMERICAS = [
+    'Tarefa_Esforco_Estimado',
+    'Tarefa_Esforco_Primeiro',
+    'Tarefa_Esforco_Registradas',
+    'Tarefa_Esforco_Registradas_Sub',
+    'Tarefa_Esforco_Percentual',
+    'Horas_Restantes'
+]
+
+# "Sim" vira True; "Não" e ausentes viram False
+COLUNAS_BOOLEANAS = ['Urgente', 'Tarefa_Reaberta']
+
+# Ordem da Prioridade; valores fora da lista vão para o fim, em ordem alfabética
+ORDEM_PRIORIDADE = ['Baixa', 'Média', 'Alta', 'Urgente']
+
+# Categorias das colunas derivadas em adicionar_colunas_analise
+CATEGORIAS_SLA = ['No prazo', 'Atrasada', 'Sem data']
+CATEGORIAS_EFICIENCIA = ['Baixa', 'Normal', 'Alta']
+
+COLUNAS_CATEGORICAS = [
+    'Quadro',
+    'Cliente',
+    'Grupo',
+    'Projeto',
+    'Tipo_Tarefa',
+    'Equipe',
+    'CC',
+    'Para',
+    'Prioridade',
+    'Tarefa_Aberta',
+    'Etapa',
+    'Fase'
+]
+
+def _tipo_coluna(nome: str) -> str:
+    if nome in COLUNAS_DATA:
+        return 'data'
+    if nome in COLUNAS_NUMERICAS:
+        return 'numero'
+    if nome in COLUNAS_BOOLEANAS:
+        return 'booleano'
+    if nome in COLUNAS_CATEGORICAS:
+        return 'categoria'
+    return 'texto'
+
+# Tipo de cada coluna do COLUMN_MAPPING, pelo nome padronizado. Colunas fora
+# do esquema não são lidas; 'texto' mantém o tipo inferido pelo parser.
+ESQUEMA = {nome: _tipo_coluna(nome) for nome in COLUMN_MAPPING.values()}
+
+# Valores tratados como ausentes
+VALORES_AUSENTES = ['-', 'NaN', 'nan', '']
+
+# Ausentes padrão do read_csv do pandas (parâmetro na_values), que o
+# parser do pyarrow não conhece
+AUSENTES_PADRAO_PANDAS = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a',
+    'nan', 'null',
+]
+
+# dtype usado na leitura para cada tipo do esquema
+_DTYPE_LEITURA = {
+    'data': str,
+    'numero': 'float64',
+    'booleano': 'category',
+    'categoria': 'category',
+}
+
+# Motor de leitura dos CSVs: 'pandas' (parser C do pandas) ou 'arrow'
+# (parser do pyarrow, bem mais rápido, com o mesmo resultado)
+MOTORES = ('pandas', 'arrow')
+MOTOR_PADRAO = os.environ.get('DASHBOARD_MOTOR', 'pandas').strip().lower()
+
+# Tipo Arrow correspondente a cada dtype de _DTYPE_LEITURA
+_TIPO_ARROW = {
+    str: pa.string(),
+    'float64': pa.float64(),
+    'category': pa.dictionary(pa.int32(), pa.string()),
+}
+
+# Ausentes do parser do pyarrow: os mesmos da leitura pelo pandas
+_AUSENTES_ARROW = sorted(set(AUSENTES_PADRAO_PANDAS) | set(VALORES_AUSENTES))
+
+# -------------------------------------------------
+# Datas
+# -------------------------------------------------
+# Formatos tentados na detecção. Exportações brasileiras trazem o dia antes
+# do mês, por isso esses formatos vêm primeiro e vencem em caso de empate.
+FORMATOS_DATA = [
+    '%d/%m/%Y %H:%M:%S',
+    '%d/%m/%Y %H:%M',
+    '%d/%m/%Y',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%d',
+    '%Y-%m-%dT%H:%M:%S',
+    '%d-%m-%Y %H:%M',
+    '%d-%m-%Y',
+    '%m/%d/%Y %H:%M',
+    '%m/%d/%Y'
+]
+
+# Quantidade de valores distintos usados para detectar o formato
+_AMOSTRA_FORMATO = 500
+
+def detectar_formato_data(valores) -> str:
+    """Escolhe o formato de FORMATOS_DATA que converte mais valores da amostra.
+
+    Retorna None se nenhum formato converter valor algum.
+    """
+    amostra = pd.Series([v for v in valores[:_AMOSTRA_FORMATO] if isinstance(v, str)], dtype=object)
+    if amostra.empty:
+        return None
+    acertos = {
+        formato: pd.to_datetime(amostra, format=formato, errors='coerce').notna().sum()
+        for formato in FORMATOS_DATA
+    }
+    melhor = max(FORMATOS_DATA, key=lambda formato: acertos[formato])
+    return melhor if acertos[melhor] else None
+
+def _converter_formato(textos: np.ndarray, formato: str) -> np.ndarray:
+    """Converte textos num formato fixo; os que não se encaixam viram NaT.
+
+    O strptime do Arrow é bem mais rápido que o do pandas, mas aceita dias
+    inexistentes (31/02 vira 03/03). Datas assim sempre caem nos dias 1 a 3,
+    que são conferidas de novo pelo pandas.
+    """
+    try:
+        convertidos = pc.strptime(
+            pa.array(textos, type=pa.string()), format=formato, unit='us', error_is_null=True
+        )
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return pd.to_datetime(pd.Series(textos, dtype=object), format=formato, errors='coerce').to_numpy('datetime64[us]')
+
+    datas = convertidos.to_numpy(zero_copy_only=False).astype('datetime64[us]')
+    if '%d' in formato:
+        suspeitos = pc.fill_null(pc.less_equal(pc.day(convertidos), 3), False).to_numpy(zero_copy_only=False)
+        if suspeitos.any():
+            datas[suspeitos] = pd.to_datetime(
+                pd.Series(textos[suspeitos], dtype=object), format=formato, errors='coerce'
+            ).to_numpy('datetime64[us]')
+    return datas
+
+def converter_datas(serie: pd.Series, formato: str = None):
+    """Converte uma coluna em datas, analisando cada valor distinto uma vez.
+
+    Exportações repetem muito as mesmas datas: os valores são fatorados,
+    só os distintos são convertidos e o resultado é expandido pelos códigos.
+    Sem formato informado ele é detectado por detectar_formato_data; textos
+    fora do formato ainda são tentados um a um, com o dia primeiro.
+    Retorna (datas, formato usado, quantidade de valores descartados).
+    """
+    codigos, unicos = pd.factorize(serie)
+    unicos = np.asarray(unicos, dtype=object)
+    if formato is None:
+        formato = detectar_formato_data(unicos)
+
+    convertidos = np.full(len(unicos), np.datetime64('NaT'), dtype='datetime64[us]')
+    if serie.dtype != object and pd.api.types.is_string_dtype(serie.dtype):
+        texto = np.ones(len(unicos), dtype=bool)
+    else:
+        texto = np.fromiter((isinstance(v, str) for v in unicos), dtype=bool, count=len(unicos))
+    if (~texto).any():
+        # datas já nativas (ex.: células de data do Excel)
+        convertidos[~texto] = pd.to_datetime(
+            pd.Series(unicos[~texto], dtype=object), errors='coerce'
+        ).to_numpy('datetime64[us]')
+    if formato is not None and texto.any():
+        convertidos[texto] = _converter_formato(unicos[texto], formato)
+
+    # textos fora do formato: demais formatos conhecidos e, por fim, um a um
+    for alternativo in FORMATOS_DATA:
+        falhas = texto & np.isnat(convertidos)
+        if not falhas.any():
+            break
+        if alternativo != formato:
+            convertidos[falhas] = _converter_formato(unicos[falhas], alternativo)
+    falhas = texto & np.isnat(convertidos)
+    if falhas.any():
+        convertidos[falhas] = pd.to_datetime(
+            pd.Series(unicos[falhas], dtype=object), errors='coerce', dayfirst=True, format='mixed'
+        ).to_numpy('datetime64[us]')
+
+    datas = np.append(convertidos, np.datetime64('NaT'))[codigos]
+    descartados = int(np.isnat(convertidos)[codigos[codigos >= 0]].sum())
+    return pd.Series(datas, index=serie.index, name=serie.name), formato, descartados
+
+# -------------------------------------------------
+# Leitura e preparo
+# -------------------------------------------------
+def _argumentos_esquema(cabecalho, numeros_tipados: bool = True) -> dict:
+    """Monta usecols, dtype e valores ausentes da leitura a partir do ESQUEMA.
+
+    Com numeros_tipados=False as colunas numéricas são lidas como texto e
+    convertidas depois, tolerando valores fora do padrão (ex.: "12,5").
+    """
+    colunas = {}
+    for original in cabecalho:
+        nome = COLUMN_MAPPING.get(str(original).strip())
+        if nome is not None:
+            colunas[original] = ESQUEMA[nome]
+
+    dtype = {}
+    for original, tipo in colunas.items():
+        if tipo == 'numero' and not numeros_tipados:
+            dtype[original] = str
+        elif tipo in _DTYPE_LEITURA:
+            dtype[original] = _DTYPE_LEITURA[tipo]
+
+    return {'usecols': list(colunas), 'dtype': dtype, 'na_values': VALORES_AUSENTES}
+
+def _motor(motor: str = None) -> str:
+    motor = motor or MOTOR_PADRAO
+    if motor not in MOTORES:
+        raise ValueError(f"Motor de leitura desconhecido: {motor}")
+    return motor
+
+def _cabecalho(arquivo) -> pd.Index:
+    cabecalho = pd.read_csv(arquivo, encoding='utf-8', encoding_errors='ignore', nrows=0).columns
+    if hasattr(arquivo, 'seek'):
+        arquivo.seek(0)
+    return cabecalho
+
+def _opcoes_arrow(argumentos: dict) -> pa_csv.ConvertOptions:
+    """Equivalente, para o pyarrow, dos argumentos de _argumentos_esquema.
+
+    Colunas sem dtype no esquema são lidas como texto; o tipo delas é
+    inferido depois, na coluna inteira, por _inferir_texto.
+    """
+    tipos = {original: _TIPO_ARROW[dtype] for original, dtype in argumentos['dtype'].items()}
+    for original in argumentos['usecols']:
+        tipos.setdefault(original, pa.string())
+    return pa_csv.ConvertOptions(
+        include_columns=argumentos['usecols'],
+        column_types=tipos,
+        null_values=_AUSENTES_ARROW,
+        strings_can_be_null=True,
+        quoted_strings_can_be_null=True,
+    )
+
+def _inferir_texto(tabela: pa.Table, colunas) -> pa.Table:
+    """Colunas de texto só com números viram int64 ou float64, como no pandas.
+
+    Os metadados do pandas na tabela são descartados, para que to_pandas
+    não devolva essas colunas ao dtype de texto original.
+    """
+    tabela = tabela.replace_schema_metadata(None)
+    for nome in colunas:
+        if nome not in tabela.column_names:
+            continue
+        posicao = tabela.schema.get_field_index(nome)
+        coluna = tabela.column(posicao)
+        if not (pa.types.is_string(coluna.type) or pa.types.is_large_string(coluna.type)):
+            continue
+        for tipo in (pa.int64(), pa.float64()):
+            try:
+                tabela = tabela.set_column(posicao, nome, coluna.cast(tipo))
+                break
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                continue
+    return tabela
+
+def _tabela_para_pandas(tabela: pa.Table) -> pd.DataFrame:
+    """Converte a leitura do pyarrow para os dtypes da leitura do pandas."""
+    df = tabela.to_pandas(split_blocks=True, self_destruct=True)
+    # o dicionário do Arrow segue a ordem de aparição; o do pandas, a alfabética
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].cat.reorder_categories(sorted(df[col].cat.categories))
+    return df
+
+def _ler_csv_arrow(arquivo, numeros_tipados: bool = True) -> pd.DataFrame:
+    argumentos = _argumentos_esquema(_cabecalho(arquivo), numeros_tipados)
+    tabela = pa_csv.read_csv(arquivo, convert_options=_opcoes_arrow(argumentos))
+    textos = [c for c in argumentos['usecols'] if c not in argumentos['dtype']]
+    return _tabela_para_pandas(_inferir_texto(tabela, textos))
+
+def ler_csv(arquivo, numeros_tipados: bool = True, motor: str = None, **kwargs):
+    """Lê o CSV numa única passada guiada pelo ESQUEMA.
+
+    Só as colunas do COLUMN_MAPPING são materializadas, já com o dtype do
+    esquema e com VALORES_AUSENTES tratados pelo próprio parser. Aceita os
+    argumentos extras de pd.read_csv (ex.: nrows, chunksize), que sempre
+    usam o parser do pandas. motor escolhe o parser (padrão: MOTOR_PADRAO).
+    """
+    if _motor(motor) == 'arrow' and not kwargs:
+        try:
+            return _ler_csv_arrow(arquivo, numeros_tipados)
+        except pa.ArrowInvalid:
+            # número fora do padrão: quem chamou relê com números como texto
+            if numeros_tipados:
+                raise
+            # demais recusas do pyarrow (ex.: UTF-8 inválido) ficam com o pandas
+            if hasattr(arquivo, 'seek'):
+                arquivo.seek(0)
+    argumentos = _argumentos_esquema(_cabecalho(arquivo), numeros_tipados)
+    return pd.read_csv(arquivo, encoding='utf-8', encoding_errors='ignore', **argumentos, **kwargs)
+
+# Origem das datas seriais do Excel (sistema 1900, com o bug do ano bissexto)
+_ORIGEM_EXCEL = pd.Timestamp('1899-12-30')
+
+# Frequência, em linhas, dos avisos de progresso da leitura do Excel
+_PASSO_PROGRESSO = 5000
+
+def _datas_excel(valores: pd.Series) -> pd.Series:
+    """Converte datas do Excel: datetime, número serial ou texto."""
+    numeros = pd.to_numeric(valores, errors='coerce')
+    datas = pd.to_datetime(numeros, unit='D', origin=_ORIGEM_EXCEL, errors='coerce')
+    nativas = valores.map(lambda v: isinstance(v, (date, datetime)), na_action='ignore').fillna(False).astype(bool)
+    if nativas.any():
+        datas[nativas] = pd.to_datetime(valores[nativas])
+    # texto (ex.: "15/01/2024") fica para preparar_dados
+    texto = valores.notna() & datas.isna()
+    if texto.any():
+        return valores.where(texto, datas)
+    return datas
+
+def _texto_excel(valores: pd.Series) -> pd.Series:
+    """Infere o tipo de uma coluna livre; números inteiros voltam a ser int."""
+    valores = valores.infer_objects()
+    if (
+        pd.api.types.is_float_dtype(valores)
+        and valores.notna().all()
+        and (valores % 1 == 0).all()
+    ):
+        return valores.astype('int64')
+    return valores
+
+@contextmanager
+def _abrir_planilha(arquivo):
+    """Abre a primeira planilha e fornece (total de linhas, iterador de linhas).
+
+    Usa o python-calamine quando instalado, bem mais rápido; senão, o
+    openpyxl em modo somente leitura. Nos dois casos as linhas são lidas
+    em fluxo, sem montar a planilha em memória.
+    """
+    if CalamineWorkbook is not None:
+        if isinstance(arquivo, (str, os.PathLike)):
+            livro = CalamineWorkbook.from_path(str(arquivo))
+        else:
+            livro = CalamineWorkbook.from_filelike(arquivo)
+        planilha = livro.get_sheet_by_index(0)
+        yield planilha.total_height, planilha.iter_rows()
+        return
+
+    livro = load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        planilha = livro.worksheets[0]
+        yield planilha.max_row or 0, planilha.iter_rows(values_only=True)
+    finally:
+        livro.close()
+
+def ler_excel(arquivo, progresso=None) -> pd.DataFrame:
+    """Lê a primeira planilha do .xlsx linha a linha, em modo somente leitura.
+
+    Só as colunas do COLUMN_MAPPING são extraídas; cada uma recebe o tipo
+    do ESQUEMA e datas seriais viram datetime diretamente. progresso, se
+    informado, recebe a fração lida (0 a 1).
+    """
+    with _abrir_planilha(arquivo) as (total, linhas):
+        cabecalho = next(linhas, None) or ()
+        indices = [i for i, c in enumerate(cabecalho) if c is not None and str(c).strip() in COLUMN_MAPPING]
+        if not indices:
+            return pd.DataFrame()
+
+        nomes = [str(cabecalho[i]) for i in indices]
+        extrair = itemgetter(*indices) if len(indices) > 1 else (lambda linha: (linha[indices[0]],))
+        largura = indices[-1] + 1
+        total = max(total - 1, 1)
+        registros = []
+        for n, linha in enumerate(linhas, 1):
+            if len(linha) < largura:
+                linha = tuple(linha) + (None,) * (largura - len(linha))
+            registros.append(extrair(linha))
+            if progresso and n % _PASSO_PROGRESSO == 0:
+                progresso(min(n / total, 1.0))
+
+    # linhas vazias no fim da planilha não são dados
+    while registros and all(v is None or v == '' for v in registros[-1]):
+        registros.pop()
+
+    colunas = list(zip(*registros)) if registros else [()] * len(nomes)
+    df = pd.DataFrame({nome: pd.Series(valores, dtype=object) for nome, valores in zip(nomes, colunas)})
+    for nome in nomes:
+        valores = df[nome].where(~df[nome].isin(VALORES_AUSENTES))
+        tipo = ESQUEMA[COLUMN_MAPPING[nome.strip()]]
+        if tipo == 'data':
+            df[nome] = _datas_excel(valores)
+        elif tipo == 'numero':
+            # float64 como na leitura de CSV, mesmo com só números inteiros
+            df[nome] = pd.to_numeric(valores, errors='coerce').astype('float64')
+        elif tipo in ('categoria', 'booleano'):
+            df[nome] = valores.astype('category')
+        else:
+            df[nome] = _texto_excel(valores)
+
+    if progresso:
+        progresso(1.0)
+    return df
+
+def load_uploaded_file(file, progresso=None, motor: str = None) -> pd.DataFrame:
+    """Lê CSV ou Excel enviado pelo usuário, só com as colunas do ESQUEMA."""
+    if file.name.endswith(".csv"):
+        try:
+            df = ler_csv(file, motor=motor)
+        except ValueError:
+            # número fora do padrão: lê como texto e preparar_dados converte
+            file.seek(0)
+            df = ler_csv(file, numeros_tipados=False, motor=motor)
+    else:
+        df = ler_excel(file, progresso)
+    df.attrs['ausentes_tratados'] = True
+    return df
+
+def hash_conteudo(conteudo: bytes) -> str:
+    """Hash do conteúdo do arquivo, usado como chave do dataset."""
+    return hashlib.blake2b(conteudo, digest_size=16).hexdigest()
+
+def versao_pipeline() -> str:
+    """Identifica a versão do mapeamento de colunas e das colunas derivadas."""
+    assinatura = json.dumps([COLUMN_MAPPING, ESQUEMA], sort_keys=True) + f"|{VERSAO_PREPARO}"
+    return hashlib.sha1(assinatura.encode('utf-8')).hexdigest()[:12]
+
+def ordenar_prioridade(serie: pd.Series) -> pd.Series:
+    """Prioridade como categórica ordenada por ORDEM_PRIORIDADE."""
+    serie = serie.astype('category')
+    extras = sorted(c for c in serie.cat.categories if c not in ORDEM_PRIORIDADE)
+    return serie.cat.set_categories(ORDEM_PRIORIDADE + extras, ordered=True)
+
+def preparar_dados(df: pd.DataFrame, formatos_data: dict = None) -> pd.DataFrame:
+    """Limpa e padroniza colunas básicas conforme o ESQUEMA.
+
+    Colunas que já chegam com o tipo do esquema (leitura por ler_csv) não
+    são convertidas de novo. formatos_data fixa o formato de cada coluna de
+    data; as demais têm o formato detectado. Os formatos usados e a
+    quantidade de datas descartadas por coluna ficam em df.attrs
+    ('formatos_data' e 'datas_coagidas').
+    """
+    formatos_data = formatos_data or {}
+    ausentes_tratados = df.attrs.get('ausentes_tratados', False)
+    df = df.copy()
+    df.columns = df.columns.str.strip()
+    df = df.rename(columns=COLUMN_MAPPING)
+
+    # remove colunas totalmente vazias
+    df = df.dropna(axis=1, how='all')
+
+    # trata valores estranhos (na leitura pelo esquema o parser já fez isso)
+    if not ausentes_tratados:
+        df = df.replace(VALORES_AUSENTES, np.nan)
+
+    # datas
+    formatos = dict(formatos_data)
+    coagidas = {}
+    for col in COLUNAS_DATA:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col], formato, coagidas[col] = converter_datas(df[col], formatos.get(col))
+            if formato is not None:
+                formatos[col] = formato
+    df.attrs['formatos_data'] = formatos
+    df.attrs['datas_coagidas'] = coagidas
+
+    # numéricos
+    for col in COLUNAS_NUMERICAS:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    # booleanos
+    for col in COLUNAS_BOOLEANAS:
+        if col in df.columns and not pd.api.types.is_bool_dtype(df[col]):
+            df[col] = df[col].eq('Sim')
+
+    # dimensões como categóricas
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+
+    # Prioridade - converter para categórica ordenada
+    if 'Prioridade' in df.columns:
+        df['Prioridade'] = ordenar_prioridade(df['Prioridade'])
+    
+    return df
+
+def adicionar_colunas_analise(df: pd.DataFrame, copiar: bool = True) -> pd.DataFrame:
+    """Adiciona colunas específicas das análises obrigatórias.
+
+    Com copiar=False o próprio DataFrame recebe as colunas, evitando uma
+    cópia integral em datasets grandes.
+    """
+    if copiar:
+        df = df.copy()
+
+    # Lead time em dias (Criada × Fechada), calculado uma vez para todas as análises
+    if {'Tarefa_Criada', 'Tarefa_Fechada'}.issubset(df.columns):
+        df['Lead_Time_Dias'] = (df['Tarefa_Fechada'] - df['Tarefa_Criada']).dt.days
+
+    # SLA / Distância em dias (Entrega desejada × Fechada)
+    if {'Tarefa_Entrega_Desejada', 'Tarefa_Fechada'}.issubset(df.columns):
+        df['SLA_Dias'] = (df['Tarefa_Fechada'] - df['Tarefa_Entrega_Desejada']).dt.days
+        df['Distancia_Dias'] = df['SLA_Dias']
+        
+        # Classificar SLA (códigos de CATEGORIAS_SLA, sem texto por linha)
+        codigos = np.where(
+            df['SLA_Dias'] > 0,
+            1,
+            np.where(df['SLA_Dias'].isna(), 2, 0)
+        ).astype(np.int8)
+        df['SLA_Status'] = pd.Categorical.from_codes(codigos, CATEGORIAS_SLA)
+
+    # Eficiência de esforço (%)
+    if {'Tarefa_Esforco_Registradas', 'Tarefa_Esforco_Estimado'}.issubset(df.columns):
+        df['Eficiencia'] = (
+            df['Tarefa_Esforco_Registradas'] / df['Tarefa_Esforco_Estimado']
+        ) * 100
+        
+        # Classificar eficiência
+        conditions = [
+            df['Eficiencia'] < 50,
+            df['Eficiencia'] <= 100,
+            df['Eficiencia'] > 100
+        ]
+        codigos = np.select(conditions, [0, 1, 2], default=1).astype(np.int8)
+        df['Eficiencia_Categoria'] = pd.Categorical.from_codes(
+            codigos, CATEGORIAS_EFICIENCIA, ordered=True
+        )
+
+    return df
+
+# -------------------------------------------------
+# Ingestão em blocos (memória limitada)
+# -------------------------------------------------
+# Orçamento de memória de trabalho, em MB, para cada bloco lido do CSV
+ORCAMENTO_MEMORIA_MB = int(os.environ.get('DASHBOARD_ORCAMENTO_MB', '256'))
+
+# CSVs maiores que este tamanho, em MB, são lidos em blocos
+LIMITE_BLOCOS_MB = int(os.environ.get('DASHBOARD_LIMITE_BLOCOS_MB', '100'))
+
+# Um bloco coexiste em até três formas: bruto, tratado e em Arrow
+_COPIAS_POR_BLOCO = 3
+
+def usar_ingestao_em_blocos(nome: str, tamanho: int) -> bool:
+    """Indica se o arquivo deve ser lido em blocos."""
+    return nome.endswith('.csv') and tamanho > LIMITE_BLOCOS_MB * 1024 ** 2
+
+def linhas_por_bloco(arquivo, orcamento_mb: int = None) -> int:
+    """Estima, por uma amostra, quantas linhas do CSV cabem no orçamento."""
+    amostra = ler_csv(arquivo, numeros_tipados=False, nrows=1000)
+    if hasattr(arquivo, 'seek'):
+        arquivo.seek(0)
+    bytes_por_linha = max(amostra.memory_usage(deep=True).sum() / max(len(amostra), 1), 1)
+    orcamento = (orcamento_mb or ORCAMENTO_MEMORIA_MB) * 1024 ** 2
+    return max(1000, int(orcamento / (_COPIAS_POR_BLOCO * bytes_por_linha)))
+
+def _bytes_por_linha(arquivo) -> float:
+    """Tamanho médio das linhas no primeiro MB do arquivo."""
+    if isinstance(arquivo, (str, os.PathLike)):
+        with open(arquivo, 'rb') as leitura:
+            inicio = leitura.read(1024 ** 2)
+    else:
+        inicio = arquivo.read(1024 ** 2)
+        arquivo.seek(0)
+    return len(inicio) / max(inicio.count(b'\n'), 1)
+
+def _blocos_arrow(arquivo, linhas: int):
+    """Blocos de cerca de `linhas` linhas lidos em fluxo pelo pyarrow."""
+    argumentos = _argumentos_esquema(_cabecalho(arquivo), numeros_tipados=False)
+    # o pyarrow divide o arquivo por bytes, não por linhas
+    tamanho = int(min(max(linhas * _bytes_por_linha(arquivo), 1024 ** 2), 1024 ** 3))
+    with pa_csv.open_csv(
+        arquivo,
+        read_options=pa_csv.ReadOptions(block_size=tamanho),
+        convert_options=_opcoes_arrow(argumentos),
+    ) as leitor:
+        for lote in leitor:
+            yield lote.to_pandas(split_blocks=True)
+
+def _bloco_para_arrow(bloco: pd.DataFrame) -> pa.Table:
+    """Converte um bloco tratado para Arrow, com categóricas como texto.
+
+    Cada bloco tem seu próprio dicionário de categorias; elas só são
+    recodificadas depois que todos os blocos foram unidos.
+    """
+    tabela = pa.Table.from_pandas(bloco, preserve_index=False)
+    for posicao, campo in enumerate(tabela.schema):
+        if pa.types.is_dictionary(campo.type):
+            tabela = tabela.set_column(posicao, campo.name, tabela.column(posicao).cast(pa.large_string()))
+    return tabela
+
+def _concatenar_blocos(tabelas: list) -> pa.Table:
+    """Junta os blocos Arrow, unificando tipos que variam entre blocos."""
+    try:
+        return pa.concat_tables(tabelas, promote_options='permissive')
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+
+    # coluna numérica em um bloco e texto em outro: vira texto em todos
+    tipos = {}
+    for tabela in tabelas:
+        for campo in tabela.schema:
+            if not pa.types.is_null(campo.type):
+                tipos.setdefault(campo.name, set()).add(campo.type)
+    conflitos = [nome for nome, t in tipos.items() if len(t) > 1]
+    for i, tabela in enumerate(tabelas):
+        for nome in conflitos:
+            if nome in tabela.column_names:
+                posicao = tabela.schema.get_field_index(nome)
+                tabela = tabela.set_column(posicao, nome, tabela[nome].cast(pa.string()))
+        tabelas[i] = tabela
+    return pa.concat_tables(tabelas, promote_options='permissive')
+
+def carregar_csv_em_blocos(arquivo, orcamento_mb: int = None,
+                           acumulador: 'AcumuladorMetricas' = None,
+                           motor: str = None) -> pd.DataFrame:
+    """Lê e prepara um CSV bloco a bloco, com memória de trabalho limitada.
+
+    Cada bloco passa por preparar_dados e é acumulado em Arrow, formato
+    colunar compacto. Colunas vazias em todos os blocos somem, como em
+    preparar_dados; as colunas de análise são adicionadas uma única vez
+    sobre o resultado final. Com acumulador, as métricas gerais são
+    acumuladas bloco a bloco durante a leitura.
+    """
+    linhas = linhas_por_bloco(arquivo, orcamento_mb)
+    if _motor(motor) == 'arrow':
+        # acumulado à parte, para poder recomeçar pelo pandas
+        parcial = AcumuladorMetricas(acumulador.lead_time.precisao) if acumulador is not None else None
+        try:
+            df = _preparar_blocos(_blocos_arrow(arquivo, linhas), parcial, inferir_texto=True)
+        except pa.ArrowInvalid:
+            # recusas do pyarrow (ex.: UTF-8 inválido): relê tudo pelo pandas
+            if hasattr(arquivo, 'seek'):
+                arquivo.seek(0)
+        else:
+            if acumulador is not None:
+                acumulador.mesclar(parcial)
+            return df
+    return _preparar_blocos(ler_csv(arquivo, numeros_tipados=False, chunksize=linhas), acumulador)
+
+def _preparar_blocos(leitor, acumulador: 'AcumuladorMetricas' = None,
+                     inferir_texto: bool = False) -> pd.DataFrame:
+    """Prepara e junta os blocos de carregar_csv_em_blocos.
+
+    inferir_texto infere, na tabela final, o tipo das colunas de texto
+    que o leitor do pyarrow entrega sem conversão.
+    """
+    ordem = []
+    formatos = {}
+    coagidas = {}
+    tabelas = []
+    for bloco in leitor:
+        if not ordem:
+            ordem = [COLUMN_MAPPING.get(c, c) for c in bloco.columns.str.strip()]
+        bloco.attrs['ausentes_tratados'] = True
+        tratado = preparar_dados(bloco, formatos)
+        # o formato detectado no primeiro bloco vale para os seguintes
+        formatos.update(tratado.attrs['formatos_data'])
+        for col, n in tratado.attrs['datas_coagidas'].items():
+            coagidas[col] = coagidas.get(col, 0) + n
+        if acumulador is not None:
+            acumulador.atualizar(tratado)
+        tabelas.append(_bloco_para_arrow(tratado))
+        del bloco, tratado
+
+    if not tabelas:
+        return adicionar_colunas_analise(pd.DataFrame(), copiar=False)
+
+    tabela = _concatenar_blocos(tabelas)
+    tabelas.clear()
+    tabela = tabela.select([c for c in ordem if c in tabela.column_names])
+    if inferir_texto:
+        tabela = _inferir_texto(tabela, [c for c in tabela.column_names if ESQUEMA.get(c) == 'texto'])
+    for posicao, nome in enumerate(tabela.column_names):
+        if ESQUEMA.get(nome) == 'numero':
+            # como na leitura inteira, que lê os números como float64
+            tabela = tabela.set_column(posicao, nome, tabela.column(posicao).cast(pa.float64()))
+        elif nome in COLUNAS_CATEGORICAS:
+            tabela = tabela.set_column(posicao, nome, tabela.column(posicao).dictionary_encode())
+    df = _tabela_para_pandas(tabela)
+    del tabela
+    if 'Prioridade' in df.columns:
+        df['Prioridade'] = ordenar_prioridade(df['Prioridade'])
+    df.attrs['ausentes_tratados'] = True
+    df.attrs['formatos_data'] = formatos
+    df.attrs['datas_coagidas'] = coagidas
+    return adicionar_colunas_analise(df, copiar=False)
+
+# -------------------------------------------------
+# Ingestão incremental
+# -------------------------------------------------
+# Identifica a mesma tarefa em exportações diferentes
+CHAVE_TAREFA = 'ID_Tarefa_Secundaria'
+
+# Abaixo desta fração de linhas reaproveitadas, preparar tudo sai mais barato
+MINIMO_REAPROVEITADO = 0.5
+
+def hashes_linhas(bronze: pd.DataFrame) -> pd.DataFrame:
+    """ID e hash do conteúdo de cada linha da exportação, como lida.
+
+    O hash cobre todas as colunas e muda também quando o conjunto de
+    colunas ou seus tipos mudam. Retorna None se a exportação não tiver
+    CHAVE_TAREFA preenchida e única em todas as linhas.
+    """
+    df = bronze.rename(columns=lambda c: COLUMN_MAPPING.get(str(c).strip(), c))
+    if CHAVE_TAREFA not in df.columns:
+        return None
+    ids = df[CHAVE_TAREFA]
+    if ids.isna().any() or ids.duplicated().any():
+        return None
+
+    colunas = sorted(df.columns)
+    assinatura = json.dumps([[c, str(df[c].dtype)] for c in colunas])
+    sal = np.uint64(int(hash_conteudo(assinatura.encode('utf-8'))[:16], 16))
+    hashes = pd.util.hash_pandas_object(df[colunas], index=False, categorize=False).to_numpy() ^ sal
+    return pd.DataFrame({CHAVE_TAREFA: ids.to_numpy(), 'hash_linha': hashes})
+
+def _coluna_vazia(dtype, index: pd.Index) -> pd.Series:
+    """Coluna sem valores, como preparar_dados a deixaria, no tipo da prata."""
+    if pd.api.types.is_bool_dtype(dtype):
+        return pd.Series(False, index=index)
+    vazia = pd.Series(np.nan, index=index)
+    try:
+        return vazia.astype(dtype)
+    except (TypeError, ValueError):
+        return vazia
+
+def _unir_categorias(partes: list, col: str) -> None:
+    """Deixa a coluna categórica das partes com as mesmas categorias, em ordem."""
+    categorias = partes[0][col].cat.categories
+    if all(parte[col].cat.categories.equals(categorias) for parte in partes[1:]):
+        return
+    for parte in partes[1:]:
+        categorias = categorias.union(parte[col].cat.categories)
+    for parte in partes:
+        parte[col] = parte[col].cat.set_categories(categorias)
+
+def _sem_categorias_vazias(serie: pd.Series) -> pd.Series:
+    """remove_unused_categories por contagem dos códigos, sem ordenar as linhas."""
+    codigos = serie.cat.codes.to_numpy()
+    usadas = np.bincount(codigos[codigos >= 0], minlength=len(serie.cat.categories)) > 0
+    if usadas.all():
+        return serie
+    novos = np.cumsum(usadas) - 1
+    codigos = np.where(codigos >= 0, novos[codigos], -1)
+    return pd.Series(
+        pd.Categorical.from_codes(codigos, serie.cat.categories[usadas], ordered=serie.cat.ordered),
+        index=serie.index, name=serie.name
+    )
+
+def preparar_incremental(bronze: pd.DataFrame, hashes: pd.DataFrame,
+                         prata_anterior: pd.DataFrame, hashes_anteriores: pd.DataFrame) -> pd.DataFrame:
+    """Prepara a exportação reaproveitando as tarefas inalteradas da prata anterior.
+
+    Tarefas novas ou com hash diferente (hashes_linhas) passam por
+    preparar_dados e adicionar_colunas_analise; as demais são copiadas da
+    prata anterior, e as que sumiram da exportação ficam de fora. O
+    resultado segue a ordem da exportação, como num preparo completo, e
+    df.attrs['incremental'] resume a diferença. Retorna None quando o
+    incremental não se aplica (bases desalinhadas, colunas novas ou menos
+    de MINIMO_REAPROVEITADO das linhas reaproveitadas).
+    """
+    if len(prata_anterior) != len(hashes_anteriores):
+        return None
+    posicao = pd.Index(hashes_anteriores[CHAVE_TAREFA]).get_indexer(hashes[CHAVE_TAREFA])
+    existentes = posicao >= 0
+    iguais = existentes.copy()
+    iguais[existentes] = (
+        hashes_anteriores['hash_linha'].to_numpy()[posicao[existentes]]
+        == hashes['hash_linha'].to_numpy()[existentes]
+    )
+    if iguais.sum() < MINIMO_REAPROVEITADO * len(hashes):
+        return None
+
+    linhas_delta = np.flatnonzero(~iguais)
+    delta = preparar_dados(bronze.iloc[linhas_delta], prata_anterior.attrs.get('formatos_data'))
+    # colunas vazias só no delta continuam existindo, como no preparo completo
+    for col in prata_anterior.columns:
+        if col in ESQUEMA and col not in delta.columns:
+            delta[col] = _coluna_vazia(prata_anterior[col].dtype, delta.index)
+    delta = adicionar_colunas_analise(delta, copiar=False)
+    if set(delta.columns) != set(prata_anterior.columns):
+        return None
+
+    # prata anterior seguida do delta; uma única cópia reordena na ordem da exportação
+    partes = [prata_anterior.copy(deep=False), delta[list(prata_anterior.columns)]]
+    for col in COLUNAS_CATEGORICAS:
+        if col in prata_anterior.columns and all(
+            isinstance(parte[col].dtype, pd.CategoricalDtype) for parte in partes
+        ):
+            _unir_categorias(partes, col)
+    origem = posicao.copy()
+    origem[linhas_delta] = len(prata_anterior) + np.arange(len(linhas_delta))
+    df = pd.concat(partes, ignore_index=True).take(origem).reset_index(drop=True)
+    del partes
+
+    # categorias como no preparo completo: só as presentes na exportação
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = _sem_categorias_vazias(df[col])
+    if 'Prioridade' in df.columns:
+        df['Prioridade'] = ordenar_prioridade(df['Prioridade'])
+
+    formatos = dict(prata_anterior.attrs.get('formatos_data', {}))
+    formatos.update(delta.attrs.get('formatos_data', {}))
+    # descartadas: preenchidas na exportação e sem data após o preparo
+    bruto = bronze.rename(columns=lambda c: COLUMN_MAPPING.get(str(c).strip(), c))
+    coagidas = {
+        col: int((bruto[col].notna().to_numpy() & df[col].isna().to_numpy()).sum())
+        for col in COLUNAS_DATA
+        if col in df.columns and col in bruto.columns
+    }
+    df.attrs['formatos_data'] = formatos
+    df.attrs['datas_coagidas'] = coagidas
+    df.attrs['incremental'] = {
+        'novas': int((~existentes).sum()),
+        'alteradas': int((existentes & ~iguais).sum()),
+        'removidas': int(len(hashes_anteriores) - existentes.sum()),
+        'reaproveitadas': int(iguais.sum()),
+    }
+    return df
+
+# -------------------------------------------------
+# Métricas (camada ouro)
+# -------------------------------------------------
+def lead_time(df: pd.DataFrame) -> pd.Series:
+    """Dias entre criação e fechamento; None se faltar alguma das datas."""
+    if 'Lead_Time_Dias' in df.columns:
+        return df['Lead_Time_Dias']
+    if {'Tarefa_Criada', 'Tarefa_Fechada'}.issubset(df.columns):
+        return (df['Tarefa_Fechada'] - df['Tarefa_Criada']).dt.days
+    return None
+
+def calcular_metricas(df: pd.DataFrame) -> dict:
+    """Calcula métricas gerais e tempos por tipo/cliente."""
+    m = {}
+
+    m['total_tarefas'] = len(df)
+    
+    if 'Tarefa_Reaberta' in df.columns:
+        m['tarefas_reabertas'] = df['Tarefa_Reaberta'].sum()
+        m['perc_reabertas'] = df['Tarefa_Reaberta'].mean() * 100
+    else:
+        m['tarefas_reabertas'] = 0
+        m['perc_reabertas'] = 0
+
+    if 'Tarefa_Esforco_Registradas' in df.columns:
+        m['total_horas'] = df['Tarefa_Esforco_Registradas'].sum()
+        m['media_horas_por_tarefa'] = df['Tarefa_Esforco_Registradas'].mean()
+    else:
+        m['total_horas'] = 0
+        m['media_horas_por_tarefa'] = 0
+    
+    if 'Eficiencia' in df.columns:
+        m['eficiencia_media'] = df['Eficiencia'].mean()
+        m['outliers_eficiencia'] = len(df[(df['Eficiencia'] > 100) | (df['Eficiencia'] < 50)])
+    
+    if 'SLA_Status' in df.columns:
+        sla_stats = df['SLA_Status'].value_counts(normalize=True) * 100
+        m['sla_no_prazo'] = sla_stats.get("No prazo", 0)
+        m['sla_atrasadas'] = sla_stats.get("Atrasada", 0)
+
+    # tempo médio geral (Criada x Fechada)
+    m['tempo_medio_dias'] = None
+    dias = lead_time(df)
+    if dias is not None:
+        dias = dias.dropna()
+        if not dias.empty:
+            m['tempo_medio_dias'] = dias.mean()
+            m['tempo_mediano_dias'] = dias.median()
+            m['tempo_p90_dias'], m['tempo_p95_dias'] = dias.quantile([0.9, 0.95])
+
+    if 'SLA_Dias' in df.columns and df['SLA_Dias'].notna().any():
+        m['sla_mediano_dias'] = df['SLA_Dias'].median()
+
+    return m
+
+# Dimensões com agregados gravados na camada ouro
+DIMENSOES_OURO = ['Cliente', 'Tipo_Tarefa', 'Equipe']
+
+def calcular_agregados(df: pd.DataFrame) -> dict:
+    """Calcula tarefas, horas, reabertas e tempo médio por dimensão.
+
+    Inclui, sob as chaves 'cubo' e 'quantis', os agregados parciais de
+    calcular_cubo e calcular_quantis_cubo.
+    """
+    agregados = {}
+    dias = lead_time(df)
+
+    for dim in DIMENSOES_OURO:
+        if dim not in df.columns:
+            continue
+        grupos = df.groupby(dim, observed=True)
+        tabela = grupos.size().rename('tarefas').to_frame()
+        if 'Tarefa_Esforco_Registradas' in df.columns:
+            tabela['horas'] = grupos['Tarefa_Esforco_Registradas'].sum()
+        if 'Tarefa_Reaberta' in df.columns:
+            tabela['reabertas'] = grupos['Tarefa_Reaberta'].sum()
+        if dias is not None:
+            tabela['tempo_medio_dias'] = dias.groupby(df[dim], observed=True).mean()
+        agregados[dim] = tabela.reset_index()
+
+    agregados['cubo'] = calcular_cubo(df)
+    quantis = calcular_quantis_cubo(df)
+    if quantis is not None:
+        agregados['quantis'] = quantis
+    return agregados
+
+# Erro relativo dos quantis aproximados (mediana e percentis por sketch)
+PRECISAO_QUANTIS = 0.01
+
+# Dimensões do cubo da visão geral; combinações de filtros são roll-ups dele
+DIMENSOES_CUBO = ['Cliente', 'Tipo_Tarefa', 'Prioridade', 'Equipe']
+
+def _soma_e_contagem(medidas: pd.DataFrame, nome: str, serie: pd.Series) -> None:
+    """Guarda soma e quantidade de valores válidos, que somam entre grupos."""
+    valores = serie.astype('float64')
+    medidas[f'{nome}_soma'] = valores.fillna(0).to_numpy()
+    medidas[f'{nome}_n'] = valores.notna().to_numpy(dtype=np.int64)
+
+def medidas_por_tarefa(df: pd.DataFrame) -> pd.DataFrame:
+    """Contagens e somas parciais de cada tarefa, que somam entre grupos e blocos."""
+    medidas = pd.DataFrame({'tarefas': np.ones(len(df), dtype=np.int64)}, index=df.index)
+    if 'Tarefa_Reaberta' in df.columns:
+        _soma_e_contagem(medidas, 'reabertas', df['Tarefa_Reaberta'])
+    if 'Tarefa_Esforco_Registradas' in df.columns:
+        _soma_e_contagem(medidas, 'horas', df['Tarefa_Esforco_Registradas'])
+    if 'Eficiencia' in df.columns:
+        _soma_e_contagem(medidas, 'eficiencia', df['Eficiencia'])
+        medidas['outliers_eficiencia'] = (
+            (df['Eficiencia'] > 100) | (df['Eficiencia'] < 50)
+        ).to_numpy(dtype=np.int64)
+    if 'SLA_Status' in df.columns:
+        status = df['SLA_Status']
+        medidas['sla_no_prazo'] = status.eq('No prazo').to_numpy(dtype=np.int64)
+        medidas['sla_atrasadas'] = status.eq('Atrasada').to_numpy(dtype=np.int64)
+        medidas['sla_n'] = status.notna().to_numpy(dtype=np.int64)
+    dias = lead_time(df)
+    if dias is not None:
+        _soma_e_contagem(medidas, 'dias', dias)
+    return medidas
+
+def calcular_cubo(df: pd.DataFrame) -> pd.DataFrame:
+    """Agregados parciais e aditivos por combinação de DIMENSOES_CUBO.
+
+    Cada linha guarda contagens e somas de uma combinação de dimensões;
+    médias e percentuais são recompostos em metricas_do_cubo.
+    """
+    medidas = medidas_por_tarefa(df)
+    dims = [dim for dim in DIMENSOES_CUBO if dim in df.columns]
+    if not dims:
+        return medidas.sum().to_frame().T
+    return (
+        medidas.groupby([df[dim] for dim in dims], observed=True, dropna=False)
+        .sum()
+        .reset_index()
+    )
+
+def calcular_quantis_cubo(df: pd.DataFrame, precisao: float = None) -> pd.DataFrame:
+    """Contagens por faixa dos sketches de lead time e SLA, por combinação de DIMENSOES_CUBO.
+
+    A coluna 'medida' indica o sketch de cada linha ('lead_time' ou 'sla').
+    Somar as linhas das combinações filtradas e montar um SketchQuantis
+    dá mediana e percentis do recorte sem voltar às tarefas.
+    """
+    medidas = {'lead_time': lead_time(df), 'sla': df.get('SLA_Dias')}
+    sketch = SketchQuantis(precisao or PRECISAO_QUANTIS)
+    dims = [dim for dim in DIMENSOES_CUBO if dim in df.columns]
+    partes = []
+    for medida, valores in medidas.items():
+        if valores is None:
+            continue
+        valores = valores.to_numpy(dtype='float64', na_value=np.nan)
+        linhas = np.flatnonzero(np.isfinite(valores))
+        sinal, faixa = sketch.faixas_dos_valores(valores[linhas])
+        parte = pd.DataFrame({dim: df[dim].iloc[linhas].reset_index(drop=True) for dim in dims})
+        parte['medida'] = medida
+        parte['sinal'] = sinal
+        parte['faixa'] = faixa
+        partes.append(parte)
+    if not partes:
+        return None
+    return (
+        pd.concat(partes, ignore_index=True)
+        .groupby(dims + ['medida', 'sinal', 'faixa'], observed=True, dropna=False)
+        .size()
+        .rename('quantidade')
+        .reset_index()
+    )
+
+def _media(soma, n):
+    return soma / n if n else np.nan
+
+def _mascara_filtros(tabela: pd.DataFrame, filtros: dict) -> np.ndarray:
+    mascara = np.ones(len(tabela), dtype=bool)
+    for dim, valor in (filtros or {}).items():
+        if dim in tabela.columns:
+            valores = list(valor) if isinstance(valor, (list, tuple, set)) else [valor]
+            mascara &= tabela[dim].isin(valores).to_numpy(dtype=bool, na_value=False)
+    return mascara
+
+def _metricas_dos_totais(t: pd.Series) -> dict:
+    """Métricas gerais a partir dos totais das colunas de medidas_por_tarefa."""
+    m = {}
+
+    m['total_tarefas'] = int(t.get('tarefas', 0))
+
+    if 'reabertas_soma' in t:
+        m['tarefas_reabertas'] = int(t['reabertas_soma'])
+        m['perc_reabertas'] = _media(t['reabertas_soma'], t['reabertas_n']) * 100
+    else:
+        m['tarefas_reabertas'] = 0
+        m['perc_reabertas'] = 0
+
+    if 'horas_soma' in t:
+        m['total_horas'] = t['horas_soma']
+        m['media_horas_por_tarefa'] = _media(t['horas_soma'], t['horas_n'])
+    else:
+        m['total_horas'] = 0
+        m['media_horas_por_tarefa'] = 0
+
+    if 'eficiencia_soma' in t:
+        m['eficiencia_media'] = _media(t['eficiencia_soma'], t['eficiencia_n'])
+        m['outliers_eficiencia'] = int(t['outliers_eficiencia'])
+
+    if 'sla_n' in t:
+        m['sla_no_prazo'] = _media(t['sla_no_prazo'], t['sla_n']) * 100
+        m['sla_atrasadas'] = _media(t['sla_atrasadas'], t['sla_n']) * 100
+
+    m['tempo_medio_dias'] = None
+    if t.get('dias_n', 0):
+        m['tempo_medio_dias'] = t['dias_soma'] / t['dias_n']
+
+    return m
+
+def _quantis_lead_time(m: dict, sketch: SketchQuantis) -> dict:
+    """Acrescenta mediana, p90 e p95 do lead time estimados pelo sketch."""
+    if sketch.contagem:
+        m['tempo_mediano_dias'], m['tempo_p90_dias'], m['tempo_p95_dias'] = sketch.quantis([0.5, 0.9, 0.95])
+    return m
+
+def _mediana_sla(m: dict, sketch: SketchQuantis) -> dict:
+    """Acrescenta a mediana do SLA estimada pelo sketch."""
+    if sketch.contagem:
+        m['sla_mediano_dias'] = sketch.quantil(0.5)
+    return m
+
+def metricas_do_cubo(cubo: pd.DataFrame, filtros: dict = None, quantis: pd.DataFrame = None) -> dict:
+    """Métricas gerais, como em calcular_metricas, a partir do cubo filtrado.
+
+    filtros é um dicionário {dimensão: valor} ou {dimensão: [valores]}; o
+    custo depende do número de grupos do cubo, não do número de tarefas.
+    Com a tabela de calcular_quantis_cubo, inclui mediana, p90 e p95
+    aproximados do lead time e a mediana aproximada do SLA.
+    """
+    medidas = [col for col in cubo.columns if col not in DIMENSOES_CUBO]
+    m = _metricas_dos_totais(cubo.loc[_mascara_filtros(cubo, filtros), medidas].sum())
+    if quantis is not None:
+        faixas = (
+            quantis.loc[_mascara_filtros(quantis, filtros)]
+            .groupby(['medida', 'sinal', 'faixa'])['quantidade'].sum()
+            .reset_index()
+        )
+        _quantis_lead_time(m, SketchQuantis.de_tabela(faixas[faixas['medida'] == 'lead_time'], PRECISAO_QUANTIS))
+        _mediana_sla(m, SketchQuantis.de_tabela(faixas[faixas['medida'] == 'sla'], PRECISAO_QUANTIS))
+    return m
+
+def contar_combinacoes(df: pd.DataFrame) -> pd.DataFrame:
+    """Tarefas por combinação de DIMENSOES_CUBO, como a coluna 'tarefas' do cubo.
+
+    Versão só com contagens do cubo, para recortes que ele não cobre (períodos).
+    """
+    dims = [dim for dim in DIMENSOES_CUBO if dim in df.columns]
+    if not dims:
+        return pd.DataFrame({'tarefas': [len(df)]})
+    return (
+        df.groupby([df[dim] for dim in dims], observed=True, dropna=False)
+        .size()
+        .rename('tarefas')
+        .reset_index()
+    )
+
+# Colunas lidas por AcumuladorMetricas para recompor as colunas de análise
+_COLUNAS_METRICAS = [
+    'Tarefa_Criada', 'Tarefa_Fechada', 'Tarefa_Entrega_Desejada',
+    'Tarefa_Esforco_Registradas', 'Tarefa_Esforco_Estimado', 'Tarefa_Reaberta',
+]
+
+class AcumuladorMetricas:
+    """Métricas gerais acumuladas por partes, com atualização e mescla.
+
+    Contagens, somas e médias se combinam de forma exata (somas de
+    medidas_por_tarefa); mediana e percentis do lead time e a mediana do
+    SLA vêm de SketchQuantis, com erro relativo de até `precisao`. Serve
+    para blocos da ingestão, processos paralelos e dados acrescentados
+    depois, sem manter as tarefas em memória.
+    """
+
+    def __init__(self, precisao: float = None):
+        self.totais = pd.Series(dtype='float64')
+        self.lead_time = SketchQuantis(precisao or PRECISAO_QUANTIS)
+        self.sla = SketchQuantis(precisao or PRECISAO_QUANTIS)
+
+    def atualizar(self, df: pd.DataFrame) -> 'AcumuladorMetricas':
+        """Acrescenta as tarefas de df (preparado, com ou sem colunas de análise)."""
+        base = adicionar_colunas_analise(df[[c for c in _COLUNAS_METRICAS if c in df.columns]], copiar=False)
+        self.totais = self.totais.add(medidas_por_tarefa(base).sum(), fill_value=0)
+        dias = lead_time(base)
+        if dias is not None:
+            self.lead_time.atualizar(dias)
+        if 'SLA_Dias' in base.columns:
+            self.sla.atualizar(base['SLA_Dias'])
+        return self
+
+    def mesclar(self, outro: 'AcumuladorMetricas') -> 'AcumuladorMetricas':
+        """Soma ao acumulador as tarefas resumidas em outro."""
+        self.totais = self.totais.add(outro.totais, fill_value=0)
+        self.lead_time.mesclar(outro.lead_time)
+        self.sla.mesclar(outro.sla)
+        return self
+
+    def metricas(self) -> dict:
+        """Mesmas chaves de calcular_metricas, com quantis aproximados."""
+        return _mediana_sla(_quantis_lead_time(_metricas_dos_totais(self.totais), self.lead_time), self.sla)
+
+    def para_dict(self) -> dict:
+        """Representação serializável em JSON."""
+        return {
+            'totais': {nome: float(valor) for nome, valor in self.totais.items()},
+            'lead_time': self.lead_time.para_dict(),
+            'sla': self.sla.para_dict(),
+        }
+
+    @classmethod
+    def de_dict(cls, dados: dict) -> 'AcumuladorMetricas':
+        acumulador = cls(dados['lead_time']['precisao'])
+        acumulador.totais = pd.Series(dados['totais'], dtype='float64')
+        acumulador.lead_time = SketchQuantis.de_dict(dados['lead_time'])
+        acumulador.sla = SketchQuantis.de_dict(dados['sla'])
+        return acumulador